@@ -7,6 +7,10 @@ import sys
 import time
 import datetime
 import lib.nmea
+import lib.bus
+import lib.scheduler
+import lib.connection
+import lib.sources
 import lib.gps
 import lib.geomath
 import lib.alarm
@@ -22,9 +26,19 @@ class NAVSTAT():
 		#Switches for autopilot, routing, and AIS
 		self.auto                = False
 		self.ais                 = False
-		self.aismap_data         = None
+		#Range of the AIS map in nautical miles
+		self.aismap_range        = 20
 		#Location and baudrate of serial device
 		self.serial_info         = [None,None]
+		#Serial, TCP, UDP and file inputs read together in place of the serial device, if any are set
+		self.sources             = []
+		#Log every raw sentence is recorded in, for replaying later, if set
+		self.record              = None
+		#Processes decoding AIS messages, the most waiting, and which are dropped when too many are
+		self.ais_info            = [1, 500, 'positions']
+		#The background serial connection, and whether routing and tracking were started for the current fix
+		self.connection          = None
+		self.navigating          = False
 
 		self.eng_tach_rose_1     = [[395,263,'0'],[273,152,'10'],[389,38,'20'],[506,152,'30']]
 		self.eng_tach_rose_2     = [[312,232,'5'],[298,75,'15'],[476,71,'25'],[475,232,'35']]
@@ -32,8 +46,14 @@ class NAVSTAT():
 		self.alarm               = lib.alarm.ALARM()
 		self.gui                 = lib.gui.GUI()
 		self.cache               = lib.nmea.CACHE()
+		#Hands each new gps fix to the cache, and to the scheduler running the route and track jobs
+		self.bus                 = lib.bus.BUS()
+		self.bus.subscribe(self.cache.cache_fix)
+		#Wakes the main loop to draw each new fix
+		self.bus.subscribe(self.gui.frames.fix)
+		self.scheduler           = lib.scheduler.SCHEDULER(self.bus)
 
-		self.gps                 = lib.gps.GPS(self.gui, self.cache, self.unit)
+		self.gps                 = lib.gps.GPS(self.gui, self.cache, self.unit, self.scheduler)
 		#Get settings
 		self.settings()
 
@@ -42,23 +62,33 @@ class NAVSTAT():
 		#Checks to enable fullscreen and colours
 		self.gui.night_mode()
 		self.gui.mini_mode()
-		#Attempts to create a serial NMEA connection
+		#Starts connecting to the serial NMEA device in the background
 		self.connect()
 		#Throws splash on screen
 		self.gui.splash()
 		self.gps.track.distance_start()
+		self.scheduler.start()
+		self.gui.frames.start()
 		#Main program loop - continue until quit
 		while self.exit == False:
+			#Sleeps until a new fix, a key press, or the minimum frame rate
+			events = self.gui.frames.wait()
 			#Checks if buttons have been pressed
-			self.keyevents()
+			self.keyevents(events)
 			#Checks if any alarms have been activated
 			self.alarm.check()
-			#Displays the common menu
-			self.gui.menu()
+			#Starts or stops routing and tracking as the gps fix comes and goes
+			self.navigation()
+			#Displays the common menu, and the static graphics of the gps screen
+			if self.navstat_mode == 0 and self.connection.state == lib.connection.FIX:
+				self.gui.menu(self.gps.background)
+			else:
+				#Screens without panels are redrawn whole on every frame
+				self.gui.invalidate()
+				self.gui.menu()
 			#GPS mode enabled
 			if self.navstat_mode == 0:
-				if self.nmea.exit == False:
-					self.cache.cache_gps(self.nmea.data_gps['lat'], self.nmea.data_gps['lon'], self.nmea.data_gps['speed'], self.nmea.data_gps['track'], self.nmea.data_gps['utc'], self.nmea.data_gps['status'])
+				if self.connection.state == lib.connection.FIX:
 					self.gps.interface()
 					self.gps.latlong()
 					self.gps.speedometer()
@@ -68,20 +98,18 @@ class NAVSTAT():
 					self.error()
 			#AIS mode enabled
 			elif self.navstat_mode == 1:
-				self.cache.cache_gps(self.nmea_connection.data_gps['lat'], self.nmea_connection.data_gps['lon'], self.nmea_connection.data_gps['speed'], self.nmea_connection.data_gps['track'], self.nmea_connection.data_gps['utc'], self.nmea_connection.data_gps['status'])
 				self.map_interface()
-			elif self.navstat_mode == 2:
-				self.cache.cache_gps(self.nmea.data_gps['lat'], self.nmea.data_gps['lon'], self.nmea.data_gps['speed'], self.nmea.data_gps['track'], self.nmea.data_gps['utc'], self.nmea.data_gps['status'])
 			elif self.navstat_mode == 3:
-				self.aismap(self.nmea_connection.track)
+				self.aismap(self.cache.gps.track)
 			elif self.navstat_mode == 4:
 				self.eng_interface()
 				self.eng_tachometer()
-			self.gui.clock.tick(self.gui.frame_rate)
-			#Updates the screen
-			pygame.display.update()
-			#Reduces CPU utilization with no significant performance decrease
-			time.sleep(0.3)
+			elif self.navstat_mode == 5:
+				self.stats()
+			#Updates only the parts of the screen that changed
+			self.gui.update()
+			#Holds to the maximum frame rate
+			self.gui.frames.done()
 		self.quit()
 
 	def settings(self):
@@ -126,8 +154,12 @@ class NAVSTAT():
 						self.gps.track.location = str(settings_item[1])
 					elif settings_item[0] == 'track_maxsize':
 						self.gps.track.maxsize = int(settings_item[1])
+					elif settings_item[0] == 'track_fsync':
+						self.gps.track.fsync = str(settings_item[1])
 					elif settings_item[0] == 'route_location':
 						self.gps.route.location = str(settings_item[1])
+					elif settings_item[0] == 'route_file':
+						self.gps.route.file = str(settings_item[1])
 					elif settings_item[0] == 'unit_distance':
 						if str(settings_item[1]) == 'KM':
 							self.unit.measure[0] = 0
@@ -148,43 +180,64 @@ class NAVSTAT():
 						self.serial_info[0] = str(settings_item[1])
 					elif settings_item[0] == 'gps_baudrate':
 						self.serial_info[1] = int(settings_item[1])
+					elif settings_item[0] == 'nmea_sources':
+						self.sources = [source.strip() for source in settings_item[1].split(',') if source.strip()]
+					elif settings_item[0] == 'ais_processes':
+						self.ais_info[0] = int(settings_item[1])
+					elif settings_item[0] == 'ais_queue':
+						self.ais_info[1] = int(settings_item[1])
+					elif settings_item[0] == 'ais_drop':
+						self.ais_info[2] = str(settings_item[1]).strip()
+					elif settings_item[0] == 'nmea_record':
+						self.record = str(settings_item[1]).strip() or None
+					elif settings_item[0] == 'frame_max':
+						self.gui.frames.max_rate = int(settings_item[1])
+					elif settings_item[0] == 'frame_min':
+						self.gui.frames.min_rate = int(settings_item[1])
 					elif settings_item[0] == 'version':
 						self.gui.version = settings_item[1]
+					elif settings_item[0] == 'eta_secs':
+						self.gps.route.eta_secs = float(settings_item[1])
+					elif settings_item[0] == 'xte_secs':
+						self.gps.route.xte_secs = float(settings_item[1])
 					elif settings_item[0] == 'xte_alarm':
 						self.xte_alarm = settings_item[1]
 		settings.close()
 
 	def connect(self):
-		'''Determines whether a serial connection is available.'''
-		x = 0
-		connection = False
-		#Readies a serial connection for NMEA GPS data
-		self.nmea = lib.nmea.NMEA0183(self.serial_info[0], self.serial_info[1], 5)
-		while connection == False:
-			try:
-				#Attempts to make a serial connection
-				self.nmea.read()
-				connection = True
-				failed = False
-				#Waits until a proper data stream is available
-				while self.nmea.data_gps['lat'] == 0 and self.nmea.data_gps['lon'] == 0:
-					pass
-				#Turns on tracking and routing if activated
+		'''Starts a background serial connection, which keeps reconnecting until NAVSTAT quits.'''
+		self.connection = lib.connection.CONNECTION(self.serial_info[0], self.serial_info[1], self.bus, inputs=self.sources, ais_processes=self.ais_info[0], ais_queue=self.ais_info[1], ais_drop=self.ais_info[2])
+		if self.record:
+			self.connection.recorder = lib.sources.RECORDER(self.record)
+		self.connection.start()
+
+	def navigation(self):
+		'''Turns on tracking and routing once there is a gps fix, and off again when the connection is lost.'''
+		if self.connection.state == lib.connection.FIX and self.navigating == False:
+			self.navigating = True
+			#Turns on tracking and routing if activated
+			self.gps.track.switch()
+			self.gps.route.switch()
+		elif self.connection.state == lib.connection.CONNECTING and self.navigating == True:
+			self.navigating = False
+			#Turns off track and route jobs
+			if self.gps.track.mode == True:
 				self.gps.track.switch()
+			if self.gps.route.mode == True:
 				self.gps.route.switch()
-			except:
-				#Try 5 times - no serial connection - shut down
-				if x == 5:
-					self.nmea.exit = True
-					connection = True
-					#Returns tracking and routing to OFF
-					self.gps.track.mode = False
-					self.gps.route.mode = False
-				x = x + 1
+			#Clears the current cache
+			self.cache.clear()
+			#Reload settings, so routing and tracking start as configured on the next fix
+			self.settings()
 
-	def keyevents(self):
-		'''Checks whether a key has been pressed and activates event if so.'''
-		for event in pygame.event.get():
+	def keyevents(self, events):
+		'''Checks whether a key has been pressed and activates event if so.
+		
+		Keyword arguments:
+		events -- the pygame events waiting since the last frame
+		
+		'''
+		for event in events:
 			#Only KEYDOWN events
 			if event.type == pygame.KEYDOWN:
 				#Pressed 'Escape' to quit
@@ -214,24 +267,37 @@ class NAVSTAT():
 					self.navstat_mode = 1
 				elif event.key == pygame.K_F4:
 					self.navstat_mode = 3
+				elif event.key == pygame.K_F5:
+					self.navstat_mode = 5
 			elif event.type == pygame.QUIT:
 				self.quit()
 
 	def error(self):
+		'''Shows the state of the gps connection while there is no fix.'''
 		if self.navstat_mode == 0:
-			self.gui.txt_out((self.gui.font_2.render('There is currently no GPS connected.', True, self.gui.colour_2)),323,472)
-			#Turns off track and route threads
-			if self.gps.track.mode == True:
-				self.gps.track.switch()
-			if self.gps.route.mode == True:
-				self.gps.route.switch()
-			#Clears the current cache
-			self.cache.gps = {'lat': 0, 'lon': 0, 'speed': 0, 'track': 0, 'utc': 0, 'status': ''}
-			#Reload settings
-			self.settings()
-			#Attempt to reconect to serial data
-			self.connect()
-			time.sleep(1)
+			if self.connection.state == lib.connection.NO_FIX:
+				text = 'Waiting for a GPS fix.'
+			elif self.connection.attempts > 1:
+				text = 'There is currently no GPS connected.'
+			else:
+				text = 'Connecting to the GPS.'
+			self.gui.txt_out(self.gui.text(self.gui.font_2, text, self.gui.colour_2),323,472)
+
+	def reports(self):
+		'''Returns the lines of the timing reports.'''
+		lines = [self.gui.frames.report()] + self.scheduler.report()
+		#How long the current route took to read
+		if self.gps.route.gpx_route:
+			lines.append(self.gps.route.gpx_route.report())
+		return lines
+
+	def stats(self):
+		'''Shows the timing reports.'''
+		y = 20
+		for line in self.reports():
+			#Rendered without the text cache, as the numbers change every frame
+			self.gui.txt_out(self.gui.font_1.render(line, True, self.gui.colour_2),20,y)
+			y = y + 20
 
 
 	##############################################################
@@ -276,20 +342,26 @@ class NAVSTAT():
 	##############################################################
 
 	def aismap(self,compass_out):
-		self.ui_screen.fill(self.ui_colour_1)
-		self.aismap_data = [[121334543,44.54204,-80.03334, 175.0],[12123232,44.50679,-79.84108, 228.0],[12123232,44.42924,-79.97292, 115.0],[12123232,44.50471,-80.19505, 10.0]]
-		for vessel in self.aismap_data:
-			vessel_data = self.haversine(self.nmea_connection.lat,self.nmea_connection.lon,vessel[1],vessel[2])
-			if vessel_data[0] < 20:
-				vessel_distance = round(vessel_data[0]*10,1)
-				vessel_position = self.calc_line(vessel_data[1],vessel_distance,400,225)
-				vessel_cog = self.calc_line(vessel[3],12,vessel_position[0],vessel_position[1])
-				pygame.draw.circle(self.ui_screen, self.ui_colour_2, (vessel_position[0],vessel_position[1]), 2)
-				pygame.draw.circle(self.ui_screen, self.ui_colour_2, (vessel_position[0],vessel_position[1]), 12, 1)
-				pygame.draw.lines(self.ui_screen, self.ui_colour_2, False, [(vessel_position[0],vessel_position[1]),(vessel_cog[0],vessel_cog[1])], 1)
-		compass_main = self.calc_line(compass_out,200,400,225)
-		pygame.draw.circle(self.ui_screen, self.ui_colour_2, (400,225), 200,1)
-		pygame.draw.lines(self.ui_screen, self.ui_colour_2, False, [(400,225),(compass_main[0],compass_main[1])], 3)
+		'''Draws every AIS target within range of the current position.
+		
+		Keyword arguments:
+		compass_out -- the current course over ground
+		
+		'''
+		#Pixels per nautical mile
+		scale = 200.0 / self.aismap_range
+		fix = self.cache.gps
+		for vessel, vessel_distance, vessel_bearing in self.connection.fleet.within(fix.lat, fix.lon, self.aismap_range):
+			vessel_position = lib.geomath.calc_line(vessel_bearing,round(vessel_distance*scale,1),400,225)
+			pygame.draw.circle(self.gui.screen, self.gui.colour_2, (vessel_position[0],vessel_position[1]), 2)
+			pygame.draw.circle(self.gui.screen, self.gui.colour_2, (vessel_position[0],vessel_position[1]), 12, 1)
+			#Course line, if the vessel has reported one
+			if vessel.get('cog') is not None:
+				vessel_cog = lib.geomath.calc_line(float(vessel['cog']),12,vessel_position[0],vessel_position[1])
+				pygame.draw.lines(self.gui.screen, self.gui.colour_2, False, [(vessel_position[0],vessel_position[1]),(vessel_cog[0],vessel_cog[1])], 1)
+		compass_main = lib.geomath.calc_line(compass_out,200,400,225)
+		pygame.draw.circle(self.gui.screen, self.gui.colour_2, (400,225), 200,1)
+		pygame.draw.lines(self.gui.screen, self.gui.colour_2, False, [(400,225),(compass_main[0],compass_main[1])], 3)
 	
 	def ais_start(self):
 		while self.ais == True:
@@ -334,12 +406,13 @@ class NAVSTAT():
 		self.gui.screen.fill(self.gui.colour_1)
 		self.gui.txt_out((self.gui.font_3.render('Exiting cleanly...', True, self.gui.colour_2)),355,128)
 		pygame.display.flip()
-		try:
-			#Closes GPS serial connection
-			self.nmea.quit()
-		except:
-			pass
-		#Closes any open track files
+		#Closes GPS serial connection
+		self.connection.stop()
+		#Logs the timing reports, while the jobs are still listed
+		for line in self.reports():
+			print line
+		#Stops the navigation jobs, and closes any open track files
+		self.scheduler.stop()
 		self.gps.track.off()
 		time.sleep(2)
 		pygame.quit()
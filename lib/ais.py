@@ -27,10 +27,14 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 # THE SOFTWARE.
 
-import binascii
+import sys
+import gzip
+import time
 import datetime
 import math
 import decimal
+import collections
+from checksum import makechecksum, checksum
 
 def jointelegrams(inputstring):
 	# Creates an AIVDM-message combined of several sentences with a
@@ -52,11 +56,88 @@ def jointelegrams(inputstring):
 	fullphrase = fullphrase + csum[2:]
 	return fullphrase
 
-def telegramparser(inputstring):
+class REASSEMBLER():
+	# Joins the fragments of multi-sentence AIVDM messages as they
+	# arrive and decodes the joined payload directly, without building
+	# and checksumming a new sentence. Partial messages are keyed by
+	# (sequence id, channel), at most maxsize are held, and any older
+	# than timeout seconds are dropped
+
+	def __init__(self, timeout=10, maxsize=64, fast=False):
+		self.timeout = timeout
+		self.maxsize = maxsize
+		self.fast = fast
+		# Partial messages in arrival order, as [started, count, payloads]
+		self.partial = collections.OrderedDict()
+		# Number of partial messages dropped before they completed
+		self.dropped = 0
+
+	def feed(self, sentence, now=None):
+		# Takes one checksummed AIVDM sentence and returns the decoded
+		# message once its last fragment arrives, or None until then
+		payload = self.join(sentence, now)
+		if payload is None:
+			return None
+		return payloadparser(payload, self.fast)
+
+	def join(self, sentence, now=None):
+		# Takes one checksummed AIVDM sentence and returns the whole
+		# payload once its last fragment arrives, or None until then.
+		# Own ship AIVDO reports are not targets, and return None
+		telegram = sentence.split(',')
+		if telegram[0][-3:] != 'VDM':
+			return None
+		try:
+			count = int(telegram[1])
+			number = int(telegram[2])
+			payload = telegram[5]
+		except (ValueError, IndexError):
+			return None
+		# Single sentence messages need no reassembly
+		if count == 1:
+			return payload
+		if now is None:
+			now = time.time()
+		self.expire(now)
+		key = (telegram[3], telegram[4])
+		if number == 1:
+			# A first fragment restarts the message, and moves to the back
+			if self.partial.pop(key, None) is not None:
+				self.dropped += 1
+			self.partial[key] = [now, count, [payload]]
+			if len(self.partial) > self.maxsize:
+				self.partial.popitem(last=False)
+				self.dropped += 1
+			return None
+		entry = self.partial.get(key)
+		# A fragment that does not follow on from the one before
+		if entry is None or entry[1] != count or len(entry[2]) != number - 1:
+			if entry is not None:
+				del self.partial[key]
+				self.dropped += 1
+			return None
+		entry[2].append(payload)
+		if number < count:
+			return None
+		del self.partial[key]
+		return ''.join(entry[2])
+
+	def expire(self, now):
+		# Drops partial messages older than timeout, oldest first
+		for key in list(self.partial):
+			if now - self.partial[key][0] <= self.timeout:
+				break
+			del self.partial[key]
+			self.dropped += 1
+
+def telegramparser(inputstring, fast=False):
 	# This function decodes certain types of messages from the
 	# receiver and returns the interesting data as a dictionary where
 	# each key describes the information of each message part
 
+	# Coordinates, speeds and other tenths are returned as exact
+	# decimal.Decimal values, or as plain floats when fast is set
+
 	# Observe that the navigational status is set as an integer
 	# according to ITU-R M.1371, and is thus converted for SAAB
 	# PAIS messages to these values
@@ -113,15 +194,15 @@ def telegramparser(inputstring):
 			elif navstatus == '5': navstatus = None # (MAYDAY?) sets to N/A
 			else: navstatus = None # N/A
 			# Latitude in decimal degrees (DD)
-			latitude = calclatitude(tobin(int(telegram[5],16),27))
+			latitude = calclatitude(tobin(int(telegram[5],16),27), fast)
 			# Longitude in decimal degrees (DD)
-			longitude = calclongitude(tobin(int(telegram[6],16),28))
+			longitude = calclongitude(tobin(int(telegram[6],16),28), fast)
 			# Speed over ground in 1/10 knots
-			sog = decimal.Decimal(int(telegram[7],16)) / 10
-			if sog > decimal.Decimal("102.2"):
+			sog = tenth(int(telegram[7],16), fast)
+			if sog > 102.2:
 				sog = None # N/A
 			# Course over ground in 1/10 degrees where 0=360
-			cog = decimal.Decimal(int(telegram[8],16)) / 10
+			cog = tenth(int(telegram[8],16), fast)
 			if cog > 360: # 360 and above means 360=N/A
 				cog = None
 			# Heading in whole degrees between 0-359 and 511=N/A
@@ -184,7 +265,7 @@ def telegramparser(inputstring):
 			dac = int(appid[0:10],2)
 			fi = int(appid[10:16],2)
 			# Try to decode message payload
-			decoded = binaryparser(dac,fi,payload)
+			decoded = binaryparser(dac,fi,payload,fast)
 			# Return a dictionary with descriptive keys
 			return {'mmsi': mmsi,
 					'to_mmsi': to_mmsi,
@@ -210,7 +291,7 @@ def telegramparser(inputstring):
 			dac = int(appid[0:10],2)
 			fi = int(appid[10:16],2)
 			# Try to decode message payload
-			decoded = binaryparser(dac,fi,payload)
+			decoded = binaryparser(dac,fi,payload,fast)
 			# Return a dictionary with descriptive keys
 			return {'mmsi': mmsi,
 					'dac': dac,
@@ -223,15 +304,15 @@ def telegramparser(inputstring):
 		# aviation, or message 11 - SAR Standard Position
 		elif message == 'S0D' or message == 'S11':
 			# Latitude in decimal degrees (DD)
-			latitude = calclatitude(tobin(int(telegram[3],16),27))
+			latitude = calclatitude(tobin(int(telegram[3],16),27), fast)
 			# Longitude in decimal degrees (DD)
-			longitude = calclongitude(tobin(int(telegram[4],16),28))
+			longitude = calclongitude(tobin(int(telegram[4],16),28), fast)
 			# Speed over ground in knots
 			sog = int(telegram[5],16)
 			if sog > 1022:
 				sog = None # N/A
 			# Course over ground in 1/10 degrees where 0=360
-			cog = decimal.Decimal(int(telegram[6],16)) / 10
+			cog = tenth(int(telegram[6],16), fast)
 			if cog > 360: # 360 and above means 360=N/A
 				cog = None
 			# Altitude in meters, 4095=N/A
@@ -273,7 +354,7 @@ def telegramparser(inputstring):
 			if type == 0:
 				type = None # N/A
 			# Draught in 1/10 meters, where 0.0 = N/A
-			draught = decimal.Decimal(int(telegram[4],16)) / 10
+			draught = tenth(int(telegram[4],16), fast)
 			if draught == 0:
 				draught = None
 			# Calculate ship width and length in meters from
@@ -313,373 +394,8 @@ def telegramparser(inputstring):
 		if not checksum(inputstring):
 			return
 
-		# Convert the 6-bit string to a binary string
-		bindata = sixtobin(telegram[5])
-
-		# Extract the message type number
-		message = str(int(bindata[0:6],2))
-
-		# Get the source MMSI number
-		mmsi = int(bindata[8:38],2)
-
-		# Get current computer time to timestamp messages
-		timestamp = datetime.datetime.now()
-
-		# If the sentence contains message 1, 2 or 3 - Position Report:
-		if message == '1' or message == '2' or message == '3':
-			# Navigation status according to ITU-R M.1371
-			navstatus = int(bindata[38:42],2)
-			if navstatus == 0: navstatus = 0 # Under Way
-			elif navstatus == 1: navstatus = 1 # At Anchor
-			elif navstatus == 2: navstatus = 2 # Not Under Command
-			elif navstatus == 3: navstatus = 3 # Restricted Manoeuvrability
-			elif navstatus == 4: navstatus = 4 # Constrained by her draught
-			elif navstatus == 5: navstatus = 5 # Moored
-			elif navstatus == 6: navstatus = 6 # Aground
-			elif navstatus == 7: navstatus = 7 # Engaged in Fishing
-			elif navstatus == 8: navstatus = 8 # Under way sailing
-			else: navstatus = None # N/A
-			# Rate of turn in degrees/minute from -127 to +127 where 128=N/A
-			sign_rateofturn = int(bindata[42])
-			rateofturn = int(bindata[43:50],2)
-			if rateofturn > 126:
-				rateofturn = None # N/A
-			elif sign_rateofturn and rateofturn > 1:
-				# Turning left
-				rateofturn = 128 - rateofturn
-				# Convert between ROTais and ROTind
-				rateofturn = -int(math.pow((rateofturn/4.733), 2))
-				if rateofturn < -720:
-					rateofturn = -720 # Full
-			else:
-				# Turning right
-				# Convert between ROTais and ROTind
-				rateofturn = int(math.pow((rateofturn/4.733), 2))
-				if rateofturn > 720:
-					rateofturn = 720 # Full
-			# Speed over ground in 1/10 knots
-			sog = decimal.Decimal(int(bindata[50:60],2)) / 10
-			if sog > decimal.Decimal("102.2"):
-				sog = None # N/A
-			# Position accuracy where 0=bad and 1=good/DGPS
-			posacc = int(bindata[60],2)
-			# Longitude in decimal degrees (DD)
-			longitude = calclongitude(bindata[61:89])
-			# Latitude in decimal degrees (DD)
-			latitude = calclatitude(bindata[89:116])
-			# Course over ground in 1/10 degrees between 0-359
-			cog = decimal.Decimal(int(bindata[116:128],2)) / 10
-			if cog > 360: # 360 and above means 360=N/A
-				cog = None
-			# Heading in whole degrees between 0-359 and 511=N/A
-			heading = int(bindata[128:137],2)
-			if heading > 359:
-				heading = None # N/A
-			# Return a dictionary with descriptive keys
-			return {'mmsi': mmsi,
-					'rot': rateofturn,
-					'navstatus': navstatus,
-					'latitude': latitude,
-					'longitude': longitude,
-					'sog': sog,
-					'cog': cog,
-					'heading': heading,
-					'posacc': posacc,
-					'time': timestamp,
-					'message': message}
-
-		# If the sentence contains message 4 - Base Station Report:
-		elif message == '4':
-			# Bits 38-78 contains current station time in UTC
-			try:
-				station_time = datetime.datetime(int(bindata[38:52],2),
-												 int(bindata[52:56],2),
-												 int(bindata[56:61],2),
-												 int(bindata[61:66],2),
-												 int(bindata[66:72],2),
-												 int(bindata[72:78],2))
-			except ValueError:
-				station_time = None # N/A
-			# Position accuracy where 0=bad and 1=good/DGPS
-			posacc = int(bindata[78],2)
-			# Longitude in decimal degrees (DD)
-			longitude = calclongitude(bindata[79:107])
-			# Latitude in decimal degrees (DD)
-			latitude = calclatitude(bindata[107:134])
-			# Return a dictionary with descriptive keys
-			return {'mmsi': mmsi,
-					'station_time': station_time,
-					'posacc': posacc,
-					'latitude': latitude,
-					'longitude': longitude,
-					'time': timestamp,
-					'message': message}
-
-		# If the sentence contains message 5 - Ship Static and Voyage
-		# Related Data:
-		elif message == '5' and int(bindata[38:40],2) == 0:
-			# IMO number where 00000000=N/A
-			imo = int(bindata[40:70],2)
-			if imo == 0:
-				imo = None # N/A
-			# Callsign, removes the characters @, ' ' and "
-			callsign = bintoascii(bindata[70:112]).strip('''@ ''').replace('''"''',"'")
-			# Name, removes the characters @, ' ' and "
-			name = bintoascii(bindata[112:232]).strip('''@ ''').replace('''"''',"'")
-			# Ship type, a two-digit code where 00=N/A
-			type = int(bindata[232:240],2)
-			if type == 0:
-				type = None # N/A
-			# Ship length calculated from antenna position
-			length = (int(bindata[240:249],2) + int(bindata[249:258],2))
-			# Ship width calculated from antenna position
-			width = (int(bindata[258:264],2) + int(bindata[264:270],2))
-			# Received estimated time of arrival in format
-			# month-day-hour-minute: MMDDHHMM where 00000000=N/A
-			eta = (str(int(bindata[274:278],2)).zfill(2) +
-				  str(int(bindata[278:283],2)).zfill(2) +
-				  str(int(bindata[283:288],2)).zfill(2) +
-				  str(int(bindata[288:294],2)).zfill(2))
-			if eta == '00000000':
-				eta = None
-			# Draught in 1/10 meters, where 0.0 == N/A
-			draught = decimal.Decimal(int(bindata[294:302],2)) / 10
-			if draught == 0:
-				draught = None
-			# Destination, removes the characters @, ' ' and "
-			destination = bintoascii(bindata[302:422]).strip('''@ ''').replace('''"''',"'")
-			# Return a dictionary with descriptive keys
-			return {'mmsi': mmsi,
-					'imo': imo,
-					'callsign': callsign,
-					'name': name,
-					'type': type,
-					'length': length,
-					'width': width,
-					'eta': eta,
-					'destination': destination,
-					'draught': draught,
-					'time': timestamp,
-					'message': message}
-
-		# If the sentence contains message 6 - Addressed Binary Message:
-		elif message == '6':
-			# Sequence number
-			sequence = int(bindata[38:40],2)
-			# Destination MMSI number
-			to_mmsi = int(bindata[40:70],2)
-			# Application ID (Designated Area Code, DAC) + (Function
-			# Identification, FI)
-			dac = int(bindata[72:82],2)
-			fi = int(bindata[82:88],2)
-			# Binary data payload
-			payload = bindata[88:1048]
-			# Try to decode message payload
-			decoded = binaryparser(dac,fi,payload)
-			# Return a dictionary with descriptive keys
-			return {'mmsi': mmsi,
-					'sequence': sequence,
-					'to_mmsi': to_mmsi,
-					'dac': dac,
-					'fi': fi,
-					'decoded': decoded,
-					'time': timestamp,
-					'message': message}
-
-		# If the sentence contains message 8 - Binary Broadcast Message:
-		elif message == '8':
-			# Application ID (Designated Area Code, DAC) + (Function
-			# Identification, FI)
-			dac = int(bindata[40:50],2)
-			fi = int(bindata[50:56],2)
-			# Binary data payload
-			payload = bindata[56:1008]
-			# Try to decode message payload
-			decoded = binaryparser(dac,fi,payload)
-			# Return a dictionary with descriptive keys
-			return {'mmsi': mmsi,
-					'dac': dac,
-					'fi': fi,
-					'decoded': decoded,
-					'time': timestamp,
-					'message': message}
-
-		# If the sentence contains message 9 - SAR Aircraft position
-		# report:
-		elif message == '9':
-			# Altitude in meters, 4095=N/A, 4094=>4094
-			altitude = int(bindata[38:50],2)
-			if altitude == 4095:
-				altitude = None # N/A
-			# Speed over ground in knots, 1023=N/A, 1022=>1022
-			sog = int(bindata[50:60],2)
-			if sog == 1023:
-				sog = None # N/A
-			# Position accuracy where 0=bad and 1=good/DGPS
-			posacc = int(bindata[60],2)
-			# Longitude in decimal degrees (DD)
-			longitude = calclongitude(bindata[61:89])
-			# Latitude in decimal degrees (DD)
-			latitude = calclatitude(bindata[89:116])
-			# Course over ground in 1/10 degrees between 0-359
-			cog = decimal.Decimal(int(bindata[116:128],2)) / 10
-			if cog > 360: # 360 and above means 360=N/A
-				cog = None
-			# Return a dictionary with descriptive keys
-			return {'mmsi': mmsi,
-					'altitude': altitude,
-					'sog': sog,
-					'posacc': posacc,
-					'latitude': latitude,
-					'longitude': longitude,
-					'cog': cog,
-					'time': timestamp,
-					'message': message}
-
-		# If the sentence contains message 12 - Addressed safety
-		# related message:
-		elif message == '12':
-			# Sequence number
-			sequence = int(bindata[38:40],2)
-			# Destination MMSI number
-			to_mmsi = int(bindata[40:70],2)
-			# Content of message in ASCII (replace any " with ')
-			content = bintoascii(bindata[72:1008]).replace('''"''',"'")
-			# Return a dictionary with descriptive keys
-			return {'mmsi': mmsi,
-					'sequence': sequence,
-					'to_mmsi': to_mmsi,
-					'content': content,
-					'time': timestamp,
-					'message': message}
-
-		# If the sentence contains message 14 - Safety related
-		# Broadcast Message:
-		elif message == '14':
-			# Content of message in ASCII (replace any " with ')
-			content = bintoascii(bindata[40:1008]).replace('''"''',"'")
-			# Return a dictionary with descriptive keys
-			return {'mmsi': mmsi,
-					'content': content,
-					'time': timestamp,
-					'message': message}
-
-		# If the sentence contains message 18 - Standard Class B CS
-		# Position Report:
-		elif message == '18':
-			# Speed over ground in 1/10 knots
-			sog = decimal.Decimal(int(bindata[46:56],2)) / 10
-			if sog > decimal.Decimal("102.2"):
-				sog = None # N/A
-			# Position accuracy where 0=bad and 1=good/DGPS
-			posacc = int(bindata[56],2)
-			# Longitude in decimal degrees (DD)
-			longitude = calclongitude(bindata[57:85])
-			# Latitude in decimal degrees (DD)
-			latitude = calclatitude(bindata[85:112])
-			# Course over ground in 1/10 degrees between 0-359
-			cog = decimal.Decimal(int(bindata[112:124],2)) / 10
-			if cog > 360: # 360 and above means 360=N/A
-				cog = None
-			# Heading in whole degrees between 0-359 and 511=N/A
-			heading = int(bindata[124:133],2)
-			if heading > 359:
-				heading = None # N/A
-			# Return a dictionary with descriptive keys
-			return {'mmsi': mmsi,
-					'latitude': latitude,
-					'longitude': longitude,
-					'sog': sog,
-					'cog': cog,
-					'heading': heading,
-					'posacc': posacc,
-					'time': timestamp,
-					'message': message}
-
-		# If the sentence contains message 19 - Extended Class B
-		# Equipment Position Report:
-		elif message == '19':
-			# Speed over ground in 1/10 knots
-			sog = decimal.Decimal(int(bindata[46:56],2)) / 10
-			if sog > decimal.Decimal("102.2"):
-				sog = None # N/A
-			# Position accuracy where 0=bad and 1=good/DGPS
-			posacc = int(bindata[56],2)
-			# Longitude in decimal degrees (DD)
-			longitude = calclongitude(bindata[57:85])
-			# Latitude in decimal degrees (DD)
-			latitude = calclatitude(bindata[85:112])
-			# Course over ground in 1/10 degrees between 0-359
-			cog = decimal.Decimal(int(bindata[112:124],2)) / 10
-			if cog > 360: # 360 and above means 360=N/A
-				cog = None
-			# Heading in whole degrees between 0-359 and 511=N/A
-			heading = int(bindata[124:133],2)
-			if heading > 359:
-				heading = None # N/A
-			# Name, removes the characters @, ' ' and "
-			name = bintoascii(bindata[143:263]).strip('''@ ''').replace('''"''',"'")
-			# Ship type, a two-digit code where 00=N/A
-			type = int(bindata[263:271],2)
-			if type == 0:
-				type = None # N/A
-			# Ship length calculated from antenna position
-			length = (int(bindata[271:280],2) + int(bindata[280:289],2))
-			# Ship width calculated from antenna position
-			width = (int(bindata[289:295],2) + int(bindata[295:301],2))
-			# Return a dictionary with descriptive keys
-			return {'mmsi': mmsi,
-					'latitude': latitude,
-					'longitude': longitude,
-					'sog': sog,
-					'cog': cog,
-					'heading': heading,
-					'posacc': posacc,
-					'name': name,
-					'type': type,
-					'length': length,
-					'width': width,
-					'time': timestamp,
-					'message': message}
-
-		# If the sentence contains message 24 - Class B CS Static Data
-		# Report:
-		elif message == '24':
-			# See if it is message part A or B
-			if int(bindata[38:40]) == 0: # Part A
-				# Name, removes the characters @, ' ' and "
-				name = bintoascii(bindata[40:160]).strip('''@ ''').replace('''"''',"'")
-				# Return a dictionary with descriptive keys
-				return {'mmsi': mmsi,
-						'name': name,
-						'time': timestamp,
-						'message': message}
-			else: # Part B
-				# Ship type, a two-digit code where 00=N/A
-				type = int(bindata[40:48],2)
-				if type == 0:
-					type = None # N/A
-				# Vendor ID, removes the characters @, ' ' and "
-				vendor = bintoascii(bindata[48:90]).strip('''@ ''').replace('''"''',"'")
-				# Callsign, removes the characters @, ' ' and "
-				callsign = bintoascii(bindata[90:132]).strip('''@ ''').replace('''"''',"'")
-				# Ship length calculated from antenna position
-				length = (int(bindata[132:141],2) + int(bindata[141:150],2))
-				# Ship width calculated from antenna position
-				width = (int(bindata[150:156],2) + int(bindata[156:162],2))
-				# Return a dictionary with descriptive keys
-				return {'mmsi': mmsi,
-						'type': type,
-						'vendor': vendor,
-						'callsign': callsign,
-						'length': length,
-						'width': width,
-						'time': timestamp,
-						'message': message}
-
-		else:
-			# If we don't decode the message, at least return message type
-			return {'mmsi': mmsi, 'time': timestamp, 'message': message, 'decoded': False}
+		# Decode the armored payload through the registered decoders
+		return payloadparser(telegram[5], fast)
 
 
 	# If the sentence contains NMEA-compliant position data (from own GPS):
@@ -689,30 +405,425 @@ def telegramparser(inputstring):
 			return
 		# Latitude
 		degree = int(telegram[2][0:2])
-		minutes = decimal.Decimal(telegram[2][2:9])
+		if fast:
+			minutes = float(telegram[2][2:9])
+		else:
+			minutes = decimal.Decimal(telegram[2][2:9])
 		if telegram[3] == 'N':
 			latitude = degree + (minutes / 60)
 		else:
 			latitude = -(degree + (minutes / 60))
-		latitude = latitude.quantize(decimal.Decimal('1E-6'))
+		if not fast:
+			latitude = latitude.quantize(decimal.Decimal('1E-6'))
 		# Longitude
 		degree = int(telegram[4][0:3])
-		minutes = decimal.Decimal(telegram[4][3:10])
+		if fast:
+			minutes = float(telegram[4][3:10])
+		else:
+			minutes = decimal.Decimal(telegram[4][3:10])
 		if telegram[5] == 'E':
 			longitude = degree + (minutes / 60)
 		else:
 			longitude = -(degree + (minutes / 60))
-		longitude = longitude.quantize(decimal.Decimal('1E-6'))
+		if not fast:
+			longitude = longitude.quantize(decimal.Decimal('1E-6'))
 		# Timestamp the message with local time
 		timestamp = datetime.datetime.now()
 		# Return a dictionary with descriptive keys
 		return {'ownlatitude': latitude, 'ownlongitude': longitude, 'time': timestamp}
 
 
-def binaryparser(dac,fi,data):
+# The decoder registered for each integer message type
+DECODERS = {}
+
+# The fields of each message type whose decoder returns a tuple of
+# their values, in this order, rather than a dictionary
+FIELDS = {}
+
+# The fewest bits a payload of each message type must hold for every
+# number its decoder reads to be present, rather than padded with zeros
+LENGTHS = {}
+
+# Bits up to the end of the MMSI, which every message has
+HEADER_LENGTH = 38
+
+# The message type numbers as strings, for the returned dictionaries
+MESSAGES = [str(message) for message in range(64)]
+
+def register(message, decoder, fields=None, length=HEADER_LENGTH):
+	# Registers decoder for an integer message type, replacing any
+	# earlier one. The decoder is called as decoder(bits, fast) with a
+	# BITS reader over the whole payload, and returns a dictionary of
+	# the decoded fields, or None if it cannot decode the message.
+	# With fields, a tuple of field names, the decoder returns a tuple
+	# of their values instead, which decode_many appends straight to
+	# its columns. The decoder is only called for payloads of at least
+	# length bits - the end of the last number it reads - so a
+	# truncated message is never decoded to made up values. The mmsi,
+	# time and message keys are added by payloadparser
+	DECODERS[message] = decoder
+	LENGTHS[message] = length
+	if fields is None:
+		FIELDS.pop(message, None)
+	else:
+		FIELDS[message] = fields
+
+def payloadparser(payload, fast=False):
+	# This function decodes an armored ITU-R M.1371 payload with the
+	# decoder registered for its message type, and returns the data
+	# as a dictionary like telegramparser, or None if the payload is
+	# too short to hold an MMSI
+	retdict = payloadfields(payload, fast)
+	if retdict is None:
+		return None
+
+	# Get current computer time to timestamp messages
+	retdict['time'] = datetime.datetime.now()
+	return retdict
+
+def payloadfields(payload, fast=False):
+	# Decodes a payload like payloadparser, without the time key
+
+	# Convert the 6-bit string to a bit reader
+	bits = BITS(payload)
+
+	# Without a whole MMSI there is nothing to put the message under
+	if bits.length < HEADER_LENGTH:
+		return None
+
+	# Extract the message type number
+	message = bits.uint(0,6)
+
+	# Get the source MMSI number
+	mmsi = bits.uint(8,38)
+
+	decoder = DECODERS.get(message)
+	# A payload cut short is not decoded, rather than read as zeros
+	if decoder is not None and bits.length >= LENGTHS[message]:
+		retdict = decoder(bits, fast)
+		fields = FIELDS.get(message)
+		if fields is not None and retdict is not None:
+			retdict = dict(zip(fields, retdict))
+		if retdict is not None:
+			retdict['mmsi'] = mmsi
+			retdict['message'] = MESSAGES[message]
+			return retdict
+
+	# If we don't decode the message, at least return message type
+	return {'mmsi': mmsi, 'message': MESSAGES[message], 'decoded': False}
+
+def decode_position(bits, fast=False):
+	# Decodes message 1, 2 or 3 - Position Report
+	# Navigation status according to ITU-R M.1371
+	navstatus = bits.uint(38,42)
+	if navstatus == 0: navstatus = 0 # Under Way
+	elif navstatus == 1: navstatus = 1 # At Anchor
+	elif navstatus == 2: navstatus = 2 # Not Under Command
+	elif navstatus == 3: navstatus = 3 # Restricted Manoeuvrability
+	elif navstatus == 4: navstatus = 4 # Constrained by her draught
+	elif navstatus == 5: navstatus = 5 # Moored
+	elif navstatus == 6: navstatus = 6 # Aground
+	elif navstatus == 7: navstatus = 7 # Engaged in Fishing
+	elif navstatus == 8: navstatus = 8 # Under way sailing
+	else: navstatus = None # N/A
+	# Rate of turn in degrees/minute from -127 to +127 where 128=N/A
+	sign_rateofturn = bits.uint(42,43)
+	rateofturn = bits.uint(43,50)
+	if rateofturn > 126:
+		rateofturn = None # N/A
+	elif sign_rateofturn and rateofturn > 1:
+		# Turning left
+		rateofturn = 128 - rateofturn
+		# Convert between ROTais and ROTind
+		rateofturn = -int(math.pow((rateofturn/4.733), 2))
+		if rateofturn < -720:
+			rateofturn = -720 # Full
+	else:
+		# Turning right
+		# Convert between ROTais and ROTind
+		rateofturn = int(math.pow((rateofturn/4.733), 2))
+		if rateofturn > 720:
+			rateofturn = 720 # Full
+	# Speed over ground in 1/10 knots
+	sog = tenth(bits.uint(50,60), fast)
+	if sog > 102.2:
+		sog = None # N/A
+	# Position accuracy where 0=bad and 1=good/DGPS
+	posacc = bits.uint(60,61)
+	# Longitude in decimal degrees (DD)
+	longitude = inttolongitude(bits.uint(61,89), 28, fast)
+	# Latitude in decimal degrees (DD)
+	latitude = inttolatitude(bits.uint(89,116), 27, fast)
+	# Course over ground in 1/10 degrees between 0-359
+	cog = tenth(bits.uint(116,128), fast)
+	if cog > 360: # 360 and above means 360=N/A
+		cog = None
+	# Heading in whole degrees between 0-359 and 511=N/A
+	heading = bits.uint(128,137)
+	if heading > 359:
+		heading = None # N/A
+	# Return the values in the order of POSITION_FIELDS
+	return (rateofturn, navstatus, latitude, longitude, sog, cog, heading, posacc)
+
+def decode_base_station(bits, fast=False):
+	# Decodes message 4 - Base Station Report
+	# Bits 38-78 contains current station time in UTC
+	try:
+		station_time = datetime.datetime(bits.uint(38,52),
+										 bits.uint(52,56),
+										 bits.uint(56,61),
+										 bits.uint(61,66),
+										 bits.uint(66,72),
+										 bits.uint(72,78))
+	except ValueError:
+		station_time = None # N/A
+	# Position accuracy where 0=bad and 1=good/DGPS
+	posacc = bits.uint(78,79)
+	# Longitude in decimal degrees (DD)
+	longitude = inttolongitude(bits.uint(79,107), 28, fast)
+	# Latitude in decimal degrees (DD)
+	latitude = inttolatitude(bits.uint(107,134), 27, fast)
+	# Return the values in the order of BASE_STATION_FIELDS
+	return (station_time, posacc, latitude, longitude)
+
+def decode_static_voyage(bits, fast=False):
+	# Decodes message 5 - Ship Static and Voyage
+	# Related Data
+	# Only version 0 of the message is known
+	if bits.uint(38,40) != 0:
+		return None
+	# IMO number where 00000000=N/A
+	imo = bits.uint(40,70)
+	if imo == 0:
+		imo = None # N/A
+	# Callsign, removes the characters @, ' ' and "
+	callsign = bits.text(70,112).strip('''@ ''').replace('''"''',"'")
+	# Name, removes the characters @, ' ' and "
+	name = bits.text(112,232).strip('''@ ''').replace('''"''',"'")
+	# Ship type, a two-digit code where 00=N/A
+	type = bits.uint(232,240)
+	if type == 0:
+		type = None # N/A
+	# Ship length calculated from antenna position
+	length = (bits.uint(240,249) + bits.uint(249,258))
+	# Ship width calculated from antenna position
+	width = (bits.uint(258,264) + bits.uint(264,270))
+	# Received estimated time of arrival in format
+	# month-day-hour-minute: MMDDHHMM where 00000000=N/A
+	eta = (str(bits.uint(274,278)).zfill(2) +
+		  str(bits.uint(278,283)).zfill(2) +
+		  str(bits.uint(283,288)).zfill(2) +
+		  str(bits.uint(288,294)).zfill(2))
+	if eta == '00000000':
+		eta = None
+	# Draught in 1/10 meters, where 0.0 == N/A
+	draught = tenth(bits.uint(294,302), fast)
+	if draught == 0:
+		draught = None
+	# Destination, removes the characters @, ' ' and "
+	destination = bits.text(302,422).strip('''@ ''').replace('''"''',"'")
+	# Return the values in the order of STATIC_VOYAGE_FIELDS
+	return (imo, callsign, name, type, length, width, eta, destination, draught)
+
+def decode_addressed_binary(bits, fast=False):
+	# Decodes message 6 - Addressed Binary Message
+	# Sequence number
+	sequence = bits.uint(38,40)
+	# Destination MMSI number
+	to_mmsi = bits.uint(40,70)
+	# Application ID (Designated Area Code, DAC) + (Function
+	# Identification, FI)
+	dac = bits.uint(72,82)
+	fi = bits.uint(82,88)
+	# Binary data payload
+	payload = bits.binary(88,1048)
+	# Try to decode message payload
+	decoded = binaryparser(dac,fi,payload,fast)
+	# Return a dictionary with descriptive keys
+	return {'sequence': sequence,
+			'to_mmsi': to_mmsi,
+			'dac': dac,
+			'fi': fi,
+			'decoded': decoded}
+
+def decode_broadcast_binary(bits, fast=False):
+	# Decodes message 8 - Binary Broadcast Message
+	# Application ID (Designated Area Code, DAC) + (Function
+	# Identification, FI)
+	dac = bits.uint(40,50)
+	fi = bits.uint(50,56)
+	# Binary data payload
+	payload = bits.binary(56,1008)
+	# Try to decode message payload
+	decoded = binaryparser(dac,fi,payload,fast)
+	# Return a dictionary with descriptive keys
+	return {'dac': dac,
+			'fi': fi,
+			'decoded': decoded}
+
+def decode_sar_position(bits, fast=False):
+	# Decodes message 9 - SAR Aircraft position
+	# report
+	# Altitude in meters, 4095=N/A, 4094=>4094
+	altitude = bits.uint(38,50)
+	if altitude == 4095:
+		altitude = None # N/A
+	# Speed over ground in knots, 1023=N/A, 1022=>1022
+	sog = bits.uint(50,60)
+	if sog == 1023:
+		sog = None # N/A
+	# Position accuracy where 0=bad and 1=good/DGPS
+	posacc = bits.uint(60,61)
+	# Longitude in decimal degrees (DD)
+	longitude = inttolongitude(bits.uint(61,89), 28, fast)
+	# Latitude in decimal degrees (DD)
+	latitude = inttolatitude(bits.uint(89,116), 27, fast)
+	# Course over ground in 1/10 degrees between 0-359
+	cog = tenth(bits.uint(116,128), fast)
+	if cog > 360: # 360 and above means 360=N/A
+		cog = None
+	# Return the values in the order of SAR_POSITION_FIELDS
+	return (altitude, sog, posacc, latitude, longitude, cog)
+
+def decode_addressed_safety(bits, fast=False):
+	# Decodes message 12 - Addressed safety
+	# related message
+	# Sequence number
+	sequence = bits.uint(38,40)
+	# Destination MMSI number
+	to_mmsi = bits.uint(40,70)
+	# Content of message in ASCII (replace any " with ')
+	content = bits.text(72,1008).replace('''"''',"'")
+	# Return a dictionary with descriptive keys
+	return {'sequence': sequence,
+			'to_mmsi': to_mmsi,
+			'content': content}
+
+def decode_broadcast_safety(bits, fast=False):
+	# Decodes message 14 - Safety related
+	# Broadcast Message
+	# Content of message in ASCII (replace any " with ')
+	content = bits.text(40,1008).replace('''"''',"'")
+	# Return a dictionary with descriptive keys
+	return {'content': content}
+
+def decode_class_b_position(bits, fast=False):
+	# Decodes message 18 - Standard Class B CS
+	# Position Report
+	# Speed over ground in 1/10 knots
+	sog = tenth(bits.uint(46,56), fast)
+	if sog > 102.2:
+		sog = None # N/A
+	# Position accuracy where 0=bad and 1=good/DGPS
+	posacc = bits.uint(56,57)
+	# Longitude in decimal degrees (DD)
+	longitude = inttolongitude(bits.uint(57,85), 28, fast)
+	# Latitude in decimal degrees (DD)
+	latitude = inttolatitude(bits.uint(85,112), 27, fast)
+	# Course over ground in 1/10 degrees between 0-359
+	cog = tenth(bits.uint(112,124), fast)
+	if cog > 360: # 360 and above means 360=N/A
+		cog = None
+	# Heading in whole degrees between 0-359 and 511=N/A
+	heading = bits.uint(124,133)
+	if heading > 359:
+		heading = None # N/A
+	# Return the values in the order of CLASS_B_POSITION_FIELDS
+	return (latitude, longitude, sog, cog, heading, posacc)
+
+def decode_class_b_extended(bits, fast=False):
+	# Decodes message 19 - Extended Class B
+	# Equipment Position Report
+	# Speed over ground in 1/10 knots
+	sog = tenth(bits.uint(46,56), fast)
+	if sog > 102.2:
+		sog = None # N/A
+	# Position accuracy where 0=bad and 1=good/DGPS
+	posacc = bits.uint(56,57)
+	# Longitude in decimal degrees (DD)
+	longitude = inttolongitude(bits.uint(57,85), 28, fast)
+	# Latitude in decimal degrees (DD)
+	latitude = inttolatitude(bits.uint(85,112), 27, fast)
+	# Course over ground in 1/10 degrees between 0-359
+	cog = tenth(bits.uint(112,124), fast)
+	if cog > 360: # 360 and above means 360=N/A
+		cog = None
+	# Heading in whole degrees between 0-359 and 511=N/A
+	heading = bits.uint(124,133)
+	if heading > 359:
+		heading = None # N/A
+	# Name, removes the characters @, ' ' and "
+	name = bits.text(143,263).strip('''@ ''').replace('''"''',"'")
+	# Ship type, a two-digit code where 00=N/A
+	type = bits.uint(263,271)
+	if type == 0:
+		type = None # N/A
+	# Ship length calculated from antenna position
+	length = (bits.uint(271,280) + bits.uint(280,289))
+	# Ship width calculated from antenna position
+	width = (bits.uint(289,295) + bits.uint(295,301))
+	# Return the values in the order of CLASS_B_EXTENDED_FIELDS
+	return (latitude, longitude, sog, cog, heading, posacc, name, type, length, width)
+
+def decode_class_b_static(bits, fast=False):
+	# Decodes message 24 - Class B CS Static Data
+	# Report
+	# See if it is message part A or B
+	if bits.uint(38,40) == 0: # Part A
+		# Name, removes the characters @, ' ' and "
+		name = bits.text(40,160).strip('''@ ''').replace('''"''',"'")
+		# Return a dictionary with descriptive keys
+		return {'name': name}
+	else: # Part B
+		# Part B is longer than part A, which sets the registered length
+		if bits.length < 162:
+			return None
+		# Ship type, a two-digit code where 00=N/A
+		type = bits.uint(40,48)
+		if type == 0:
+			type = None # N/A
+		# Vendor ID, removes the characters @, ' ' and "
+		vendor = bits.text(48,90).strip('''@ ''').replace('''"''',"'")
+		# Callsign, removes the characters @, ' ' and "
+		callsign = bits.text(90,132).strip('''@ ''').replace('''"''',"'")
+		# Ship length calculated from antenna position
+		length = (bits.uint(132,141) + bits.uint(141,150))
+		# Ship width calculated from antenna position
+		width = (bits.uint(150,156) + bits.uint(156,162))
+		# Return a dictionary with descriptive keys
+		return {'type': type,
+				'vendor': vendor,
+				'callsign': callsign,
+				'length': length,
+				'width': width}
+
+# The fields of the messages decoded to tuples, the most common in a log
+POSITION_FIELDS = ('rot', 'navstatus', 'latitude', 'longitude', 'sog', 'cog', 'heading', 'posacc')
+BASE_STATION_FIELDS = ('station_time', 'posacc', 'latitude', 'longitude')
+STATIC_VOYAGE_FIELDS = ('imo', 'callsign', 'name', 'type', 'length', 'width', 'eta', 'destination', 'draught')
+SAR_POSITION_FIELDS = ('altitude', 'sog', 'posacc', 'latitude', 'longitude', 'cog')
+CLASS_B_POSITION_FIELDS = ('latitude', 'longitude', 'sog', 'cog', 'heading', 'posacc')
+CLASS_B_EXTENDED_FIELDS = ('latitude', 'longitude', 'sog', 'cog', 'heading', 'posacc', 'name', 'type', 'length', 'width')
+
+register(1, decode_position, POSITION_FIELDS, 137)
+register(2, decode_position, POSITION_FIELDS, 137)
+register(3, decode_position, POSITION_FIELDS, 137)
+register(4, decode_base_station, BASE_STATION_FIELDS, 134)
+register(5, decode_static_voyage, STATIC_VOYAGE_FIELDS, 302)
+register(6, decode_addressed_binary, None, 88)
+register(8, decode_broadcast_binary, None, 56)
+register(9, decode_sar_position, SAR_POSITION_FIELDS, 128)
+register(12, decode_addressed_safety, None, 70)
+register(14, decode_broadcast_safety, None, 40)
+register(18, decode_class_b_position, CLASS_B_POSITION_FIELDS, 133)
+register(19, decode_class_b_extended, CLASS_B_EXTENDED_FIELDS, 301)
+register(24, decode_class_b_static, None, 40)
+
+def binaryparser(dac,fi,data,fast=False):
 	# This function decodes known binary messages and returns the
 	# interesting data as a dictionary where each key describes
-	# the information of each message part.
+	# the information of each message part. With fast set, tenths
+	# and coordinates are returned as floats
 
 	# For each value where we have a N/A-state None is returned
 
@@ -727,9 +838,9 @@ def binaryparser(dac,fi,data):
 	# as specified in IMO SN/Circ. 236, Annex 2, Application 1:
 	elif dac == 1 and fi == 11:
 		# Latitude in decimal degrees (DD)
-		retdict['latitude'] = calclatitude(data[0:24])
+		retdict['latitude'] = calclatitude(data[0:24], fast)
 		# Longitude in decimal degrees (DD)
-		retdict['longitude'] = calclongitude(data[24:49])
+		retdict['longitude'] = calclongitude(data[24:49], fast)
 		# Bits 49-65 contains current station time in UTC (ddhhmm)
 		# We use computer time as a baseline for year and month
 		try:
@@ -751,46 +862,46 @@ def binaryparser(dac,fi,data):
 		# Wind gust direction in whole degrees
 		retdict['wind_gust_direction'] = standard_int_field(data[88:97])
 		# Air temperature in 0.1 degrees Celsius from -60.0 to +60.0
-		retdict['air_temperature'] = standard_decimal_tenth_signed_field(data[97:108])
+		retdict['air_temperature'] = standard_decimal_tenth_signed_field(data[97:108], fast)
 		# Relative humidity in percent
 		retdict['relative_humidity'] = standard_int_field(data[108:115])
 		# Dew point in 0.1 degrees Celsius from -20.0 to +50.0
-		retdict['dew_point'] = standard_decimal_tenth_signed_field(data[115:125])
+		retdict['dew_point'] = standard_decimal_tenth_signed_field(data[115:125], fast)
 		# Air pressure in whole hPa
 		retdict['air_pressure'] = standard_int_field(data[125:134])
 		# Air pressure tendency where 0=steady, 1=decreasing, 2=increasing
 		retdict['air_pressure_tendency'] = standard_int_field(data[134:136])
 		# Horizontal visibility in 0.1 NM steps
-		retdict['horizontal_visibility'] = standard_decimal_tenth_field(data[136:144])
+		retdict['horizontal_visibility'] = standard_decimal_tenth_field(data[136:144], fast)
 		# Water level including tide, deviation from local chart datum,
 		# in 0.1 m from -10.0 to 30.0 m
-		retdict['water_level_incl_tide'] = standard_decimal_tenth_signed_field(data[144:153])
+		retdict['water_level_incl_tide'] = standard_decimal_tenth_signed_field(data[144:153], fast)
 		# Water level trend where 0=steady, 1=decreasing, 2=increasing
 		retdict['water_level_trend'] = standard_int_field(data[153:155])
 		# Surface current speed including tide in 0.1 kt steps
-		retdict['surface_current_speed_incl_tide'] = standard_decimal_tenth_field(data[155:163])
+		retdict['surface_current_speed_incl_tide'] = standard_decimal_tenth_field(data[155:163], fast)
 		# Surface current direction in whole degrees
 		retdict['surface_current_direction'] = standard_int_field(data[163:172])
 		# Current speed #2, chosen below sea surface, in 0.1 kt steps
-		retdict['current_speed_2'] = standard_decimal_tenth_field(data[172:180])
+		retdict['current_speed_2'] = standard_decimal_tenth_field(data[172:180], fast)
 		# Current direction #2, chosen below sea surface in whole degrees
 		retdict['current_direction_2'] = standard_int_field(data[180:189])
 		# Current measuring level #2, whole meters below sea surface
 		retdict['current_measuring_level_2'] = standard_int_field(data[189:194])
 		# Current speed #3, chosen below sea surface, in 0.1 kt steps
-		retdict['current_speed_3'] = standard_decimal_tenth_field(data[194:202])
+		retdict['current_speed_3'] = standard_decimal_tenth_field(data[194:202], fast)
 		# Current direction #3, chosen below sea surface in whole degrees
 		retdict['current_direction_3'] = standard_int_field(data[202:211])
 		# Current measuring level #3, whole meters below sea surface
 		retdict['current_measuring_level_3'] = standard_int_field(data[211:216])
 		# Significant wave height in 0.1 m steps
-		retdict['significant_wave_height'] = standard_decimal_tenth_field(data[216:224])
+		retdict['significant_wave_height'] = standard_decimal_tenth_field(data[216:224], fast)
 		# Wave period in whole seconds
 		retdict['wave_period'] = standard_int_field(data[224:230])
 		# Wave direction in whole degrees
 		retdict['wave_direction'] = standard_int_field(data[230:239])
 		# Swell height in 0.1 m steps
-		retdict['swell_height'] = standard_decimal_tenth_field(data[239:247])
+		retdict['swell_height'] = standard_decimal_tenth_field(data[239:247], fast)
 		# Swell period in whole seconds
 		retdict['swell_period'] = standard_int_field(data[247:253])
 		# Swell direction in whole degrees
@@ -798,11 +909,11 @@ def binaryparser(dac,fi,data):
 		# Sea state according to Beaufort scale (0-12)
 		retdict['sea_state'] = standard_int_field(data[262:266])
 		# Water temperature in 0.1 degrees Celsius from -10.0 to +50.0
-		retdict['water_temperature'] = standard_decimal_tenth_signed_field(data[266:276])
+		retdict['water_temperature'] = standard_decimal_tenth_signed_field(data[266:276], fast)
 		# Precipitation type according to WMO
 		retdict['precipitation_type'] = standard_int_field(data[276:279])
 		# Salinity in parts per thousand from 0.0 to 50.0
-		retdict['salinity'] = standard_decimal_tenth_field(data[279:288])
+		retdict['salinity'] = standard_decimal_tenth_field(data[279:288], fast)
 		# Ice, Yes/No
 		retdict['ice'] = standard_int_field(data[288:290])
 		# Return a dictionary with descriptive keys
@@ -834,60 +945,36 @@ def standard_int_signed_field(data):
 			# Negative
 			return -int(data[1:],2)
 
-def standard_decimal_tenth_field(data):
+def standard_decimal_tenth_field(data, fast=False):
 	# This function simplifies in checking for N/A-values
-	# and returns a decimal.Decimal devided by 10
+	# and returns a decimal.Decimal (or a float if fast) devided by 10
 	# Check if just ones, then return N/A (Nonetype)
 	if data.count('1') == len(data):
 		return None
 	else:
-		return decimal.Decimal(int(data,2)) / 10
+		return tenth(int(data,2), fast)
 
-def standard_decimal_tenth_signed_field(data):
+def standard_decimal_tenth_signed_field(data, fast=False):
 	# This function simplifies in checking for N/A-values and signs
-	# and returns a decimal.Decimal devided by 10
+	# and returns a decimal.Decimal (or a float if fast) devided by 10
 	integer = standard_int_signed_field(data)
 	if integer is None:
 		return None
 	else:
-		return decimal.Decimal(integer) / 10
+		return tenth(integer, fast)
+
+def tenth(integer, fast=False):
+	# Divides an integer field by 10, returning a float when fast is
+	# set and an exact decimal.Decimal otherwise
+	if fast:
+		return integer / 10.0
+	return decimal.Decimal(integer) / 10
 
 def tobin(x, count=8):
 	# Convert the integer x to a binary representation where count is
 	# the number of bits
 	return "".join(map(lambda y:str((x>>y)&1), range(count-1, -1, -1)))
 
-def makechecksum(s):
-	# Calculate a checksum from sentence
-	csum = 0
-	i = 0
-	s = s[1:s.rfind('*')] # Remove ! or $ and *xx in the sentence
-
-	while (i < len(s)):
-		inpt = binascii.b2a_hex(s[i])
-		inpt = int(inpt,16)
-		csum = csum ^ inpt #xor
-		i += 1
-
-	return csum
-
-def checksum(s):
-	# Create a checksum and compare it with the supplied checksum
-	# If they are identical return 1, if not return 0
-	try:
-		# Create an integer of the two characters after the *, to the right
-		supplied_csum = int(s[s.rfind('*')+1:s.rfind('*')+3], 16)
-	except: return ''
-
-	# Create the checksum
-	csum = makechecksum(s)
-
-	# Compare and return
-	if csum == supplied_csum:
-		return True
-	else:
-		return False
-
 def sixtobin(encstring):
 	# Converts encstring from coded 6-bit symbols to a binary string
 	totalbin = ''
@@ -924,13 +1011,21 @@ def bintoascii(binstring):
 			inc = ''
 	return totalascii
 
-def calclatitude(binary_latitude):
-	# Calculates latitude
+def calclatitude(binary_latitude, fast=False):
+	# Calculates latitude from a binary string
+	return inttolatitude(int(binary_latitude,2), len(binary_latitude), fast)
+
+def calclongitude(binary_longitude, fast=False):
+	# Calculates longitude from a binary string
+	return inttolongitude(int(binary_longitude,2), len(binary_longitude), fast)
+
+def inttolatitude(value, nr_bits, fast=False):
+	# Calculates latitude from an integer field of nr_bits bits, as a
+	# float when fast is set
 	# First look at the signed bit
-	sign = int(binary_latitude[0])
-	latitude = int(binary_latitude[1:],2)
+	sign = value >> (nr_bits - 1)
+	latitude = value & ((1 << (nr_bits - 1)) - 1)
 	# See how many bits we're looking at
-	nr_bits = len(binary_latitude)
 	if nr_bits == 24:
 		factor = 60000 # 1000 * 60
 		power = 23
@@ -945,20 +1040,19 @@ def calclatitude(binary_latitude):
 		return None # N/A
 	# Else, calculate the latitude
 	if sign: # Negative == South
-		latitude = pow(2,power) - latitude
-		degree = -decimal.Decimal(latitude) / factor
-	else: # Positive == North
-		degree = decimal.Decimal(latitude) / factor
+		latitude = latitude - pow(2,power)
+	if fast:
+		return float(latitude) / factor
 	# Return a value quantized to six decimal digits
-	return degree.quantize(decimal.Decimal('1E-6'))
+	return (decimal.Decimal(latitude) / factor).quantize(decimal.Decimal('1E-6'))
 
-def calclongitude(binary_longitude):
-	# Calculates longitude
+def inttolongitude(value, nr_bits, fast=False):
+	# Calculates longitude from an integer field of nr_bits bits, as a
+	# float when fast is set
 	# First look at the signed bit
-	sign = int(binary_longitude[0])
-	longitude = int(binary_longitude[1:],2)
+	sign = value >> (nr_bits - 1)
+	longitude = value & ((1 << (nr_bits - 1)) - 1)
 	# See how many bits we're looking at
-	nr_bits = len(binary_longitude)
 	if nr_bits == 25:
 		factor = 60000 # 1000 * 60
 		power = 24
@@ -973,18 +1067,216 @@ def calclongitude(binary_longitude):
 		return None # N/A
 	# Else, calculate the longitude
 	if sign: # Negative == West
-		longitude = pow(2,power) - longitude
-		degree = -decimal.Decimal(longitude) / factor
-	else: # Positive == East
-		degree = decimal.Decimal(longitude) / factor
+		longitude = longitude - pow(2,power)
+	if fast:
+		return float(longitude) / factor
 	# Return a value quantized to six decimal digits
-	return degree.quantize(decimal.Decimal('1E-6'))
+	return (decimal.Decimal(longitude) / factor).quantize(decimal.Decimal('1E-6'))
+
+# Two octal digits for each armored 6-bit symbol, so that a whole
+# payload becomes one integer with a single int(x, 8) call
+SIXBIT_OCTAL = {}
+for symbol in range(48, 120):
+	SIXBIT_OCTAL[chr(symbol)] = '%02o' % (symbol - 48 if symbol < 88 else symbol - 56)
 
+# The ASCII character for each 6-bit text symbol
+SIXBIT_ASCII = [chr(symbol + 64 if symbol < 32 else symbol) for symbol in range(64)]
 
+class BITS():
+	# Reads fields from an armored 6-bit payload by shift and mask,
+	# without expanding it into a string of ones and zeros. Fields
+	# are addressed with the same [start:end] bit offsets as ITU-R
+	# M.1371. Bits missing from a short payload read as zero, so the
+	# decoders are only called on payloads of their registered length
 
+	def __init__(self, encstring):
+		try:
+			digits = ''.join(map(SIXBIT_OCTAL.__getitem__, encstring))
+		except KeyError:
+			# Like sixtobin, stop at the first symbol outside the table
+			digits = ''
+			for x in encstring:
+				if x not in SIXBIT_OCTAL: break
+				digits = digits + SIXBIT_OCTAL[x]
+		self.value = int(digits or '0', 8)
+		self.length = len(digits) * 3
+
+	def uint(self, start, end):
+		# Returns the unsigned integer held in bits start to end
+		# The payload is a long, int() narrows each field back down
+		shift = self.length - end
+		if shift >= 0:
+			return int((self.value >> shift) & ((1 << (end - start)) - 1))
+		return int((self.value << -shift) & ((1 << (end - start)) - 1))
+
+	def text(self, start, end):
+		# Returns the 6-bit ASCII text held in bits start to end,
+		# cut to the whole symbols actually present in the payload
+		end = min(end, self.length)
+		count = (end - start) // 6
+		if count <= 0:
+			return ''
+		value = self.uint(start, start + count * 6)
+		return ''.join([SIXBIT_ASCII[(value >> shift) & 63] for shift in range((count - 1) * 6, -1, -6)])
+
+	def binary(self, start, end):
+		# Returns bits start to end as a binary string, for binaryparser
+		end = min(end, self.length)
+		if end <= start:
+			return ''
+		return tobin(self.uint(start, end), end - start)
+
+
+
+def logline(line):
+	# Splits a line of an AIS log into its time in epoch seconds, or
+	# None if it has none, and its sentence, or None if it has none.
+	# Handles plain sentences, sentences after an epoch time and a
+	# space as written by sources.RECORDER, and NMEA 4.0 tag blocks
+	# like \c:1357000000*hh\!AIVDM,...
+	start = line.find('!')
+	if start == -1:
+		return None, None
+	stamp = None
+	if start:
+		if line[0] == '\\':
+			stamp = tagtime(line[1:start])
+		else:
+			# Anything else ahead of the sentence is a time or noise
+			try:
+				stamp = float(line[:start])
+			except ValueError:
+				pass
+	if line[start + 3:start + 6] != 'VDM' and line[start + 3:start + 6] != 'VDO':
+		return stamp, None
+	return stamp, line[start:].rstrip()
+
+def tagtime(block):
+	# Returns the c: time of a tag block in epoch seconds, or None
+	end = block.rfind('*')
+	if end == -1:
+		end = len(block)
+	for tag in block[:end].split(','):
+		if tag[0:2] == 'c:':
+			try:
+				stamp = float(tag[2:])
+			except ValueError:
+				return None
+			# Some receivers give milliseconds
+			if stamp > 1e11:
+				stamp = stamp / 1000
+			return stamp
+	return None
+
+def decode_many(lines, fast=True):
+	# Streams AIS log lines through checksum, reassembly and decode,
+	# and returns the messages as columns - a dictionary of each
+	# message type, holding a list per field, all of the same length.
+	# A field a message does not have is None. The time column holds
+	# the log time of the last fragment in epoch seconds, or None
+	join = REASSEMBLER(fast=fast).join
+	columns = {}
+	# The lists of each message type decoded to tuples, in the order
+	# of its fields, then mmsi, message and time
+	ordered = {}
+	for line in lines:
+		stamp, sentence = logline(line)
+		if sentence is None or not checksum(sentence):
+			continue
+		payload = join(sentence, stamp)
+		if payload is None:
+			continue
+		bits = BITS(payload)
+		message = bits.uint(0,6)
+		fields = FIELDS.get(message)
+		if fields is not None and bits.length >= LENGTHS[message]:
+			values = DECODERS[message](bits, fast)
+			if values is not None:
+				lists = ordered.get(message)
+				if lists is None:
+					lists = ordered[message] = addlists(columns.setdefault(MESSAGES[message], {}), fields + ('mmsi', 'message', 'time'))
+				# Each value goes straight to the end of its column
+				map(list.append, lists, values + (bits.uint(8,38), MESSAGES[message], stamp))
+				continue
+		# Any other message is decoded to a dictionary, a row at a time
+		retdict = payloadfields(payload, fast)
+		if retdict is None:
+			continue
+		retdict['time'] = stamp
+		addrow(columns.setdefault(retdict['message'], {}), retdict)
+	for table in columns.itervalues():
+		fill(table)
+	return columns
+
+def addlists(table, keys):
+	# Returns the columns of table for keys, in order, adding any it
+	# does not have yet
+	fill(table)
+	rows = len(table.get('message', ()))
+	for key in keys:
+		if key not in table:
+			table[key] = [None] * rows
+	return [table[key] for key in keys]
+
+def addrow(table, retdict):
+	# Appends a decoded dictionary to the end of the columns of table
+	fill(table)
+	rows = len(table.get('message', ()))
+	for key in retdict:
+		if key not in table:
+			table[key] = [None] * rows
+	for key in table:
+		table[key].append(retdict.get(key))
+
+def fill(table):
+	# Pads the columns only some messages of a type have with None,
+	# up to the number of messages in the table
+	rows = len(table.get('message', ()))
+	for column in table.itervalues():
+		if len(column) < rows:
+			column.extend([None] * (rows - len(column)))
+
+def addcolumns(columns, more):
+	# Appends the columns of another decode to the end of the first
+	for message in more:
+		table = more[message]
+		added = len(table['message'])
+		existing = columns.get(message)
+		if existing is None:
+			columns[message] = table
+			continue
+		rows = len(existing['message'])
+		for key in table:
+			if key not in existing:
+				existing[key] = [None] * rows
+			existing[key].extend(table[key])
+		for key in existing:
+			if key not in table:
+				existing[key].extend([None] * added)
+	return columns
+
+def openlog(path):
+	# Opens an AIS log, plain or gzipped
+	log = open(path, 'rb')
+	magic = log.read(2)
+	log.seek(0)
+	if magic == '\x1f\x8b':
+		log.close()
+		return gzip.open(path, 'rb')
+	return log
+
+def decode_file(path, fast=True):
+	# Decodes a whole AIS log, plain or gzipped, and returns its
+	# messages as columns like decode_many. The log is streamed a
+	# line at a time, so only the columns are held in memory
+	log = openlog(path)
+	try:
+		return decode_many(log, fast)
+	finally:
+		log.close()
 
-'''
-s = ["!AIVDO,1,1,,,B3P;s:@007vPcA7@dEaD?wP5wP06,0*3A",
+# Sample sentences from a live receiver, used by bench.py
+SAMPLES = ["!AIVDO,1,1,,,B3P;s:@007vPcA7@dEaD?wP5wP06,0*3A",
 "!AIVDM,1,1,,A,33P7jRP000wqsvTM5bhdibB>00wP,0*08",
 "!AIVDM,1,1,,B,13P7ee@000wqsc:M5aeVrb0@0`5E,0*76",
 "!AIVDM,1,1,,B,33QbwT1001Os;=PM0vp=360@0lkr,0*29",
@@ -1114,11 +1406,19 @@ s = ["!AIVDO,1,1,,,B3P;s:@007vPcA7@dEaD?wP5wP06,0*3A",
 "!AIVDM,1,1,,A,13P9<@hrQpwrl4@M3B99W7Tv00Rm,0*56",
 "!AIVDM,1,1,,B,402=aTiuaNFjQOrrkDM4E`Q028Cl,0*2D",
 "!AIVDM,1,1,,B,15R<5l0000wqqITM5qf<dTK20@Cw,0*22"]
-x=0
-for p in s:
-	x=x+1
-	print x
-	print telegramparser(p)
-	print ''
-	print ''
-'''
+
+if __name__ == '__main__' and len(sys.argv) > 1:
+	# Summarises a log - python ais.py <log>
+	start = time.time()
+	columns = decode_file(sys.argv[1])
+	for message in sorted(columns, key=int):
+		print 'message %2s %10d' % (message, len(columns[message]['message']))
+	print '%.2f seconds' % (time.time() - start)
+elif __name__ == '__main__':
+	x=0
+	for p in SAMPLES:
+		x=x+1
+		print x
+		print telegramparser(p)
+		print ''
+		print ''
@@ -0,0 +1,318 @@
+#!/usr/bin/env python
+#-*- coding: utf-8 -*-
+'''Benchmarks for the NAVSTAT parsers.
+
+Run from the lib directory as: python bench.py [name ...]
+With no names given, every benchmark is run.
+
+'''
+
+import sys
+import time
+import binascii
+import random
+import math
+import ais
+import checksum
+import geomath
+
+
+def timed(function, items, repeat):
+	'''Runs a function over every item, and returns the number handled per second.
+	
+	Keyword arguments:
+	function -- the function to call with each item
+	items -- the items to hand to the function
+	repeat -- the number of times to run over the items
+	
+	'''
+	start = time.time()
+	for x in xrange(repeat):
+		for item in items:
+			function(item)
+	return (len(items) * repeat) / (time.time() - start)
+
+def report(name, rate, unit):
+	'''Prints a single benchmark result.'''
+	print '%-40s %12.0f %s/s' % (name, rate, unit)
+
+def legacy_makechecksum(data):
+	'''The per-character checksum the NMEA and AIS parsers used before checksum.py.'''
+	csum = 0
+	i = 0
+	data = data[1:data.rfind('*')]
+	while (i < len(data)):
+		input = binascii.b2a_hex(data[i])
+		input = int(input,16)
+		csum = csum ^ input
+		i += 1
+	return csum
+
+def legacy_nmea2dec(fields, type):
+	'''The fixed offset position conversion the NMEA parser used before conversion.py.'''
+	x = type*2
+	data = float(fields[3+x][0:2+type]) + float(fields[3+x][2+type:9+type])/60
+	if fields[4+x] == 'S': data = data*(-1)
+	elif fields[4+x] == 'W': data = data*(-1)
+	return data
+
+def legacy_nmea2utc(fields):
+	'''The string built time the NMEA parser used before conversion.py.'''
+	time = fields[1][0:2] + ':' + fields[1][2:4] + ':' + fields[1][4:6]
+	date = '20' + fields[9][4:6] + '-' + fields[9][2:4] + '-' + fields[9][0:2]
+	return date + 'T' + time + 'Z'
+
+def bench_checksum():
+	'''Sentences checksummed per second, before and after the shared checksum module.'''
+	report('checksum (before)', timed(legacy_makechecksum, ais.SAMPLES, 200), 'sentences')
+	report('checksum', timed(checksum.makechecksum, ais.SAMPLES, 200), 'sentences')
+	start = time.time()
+	for x in xrange(200):
+		checksum.checksum_many(ais.SAMPLES)
+	report('checksum batch' + ('' if checksum.numpy else ' (no numpy)'), (len(ais.SAMPLES) * 200) / (time.time() - start), 'sentences')
+
+def bench_payload():
+	'''Position report payloads unpacked per second, as bit strings and as integers.'''
+	payloads = [sentence.split(',')[5] for sentence in ais.SAMPLES if sentence.startswith('!AIVDM,1,1')]
+	report('payload sixtobin', timed(ais.sixtobin, payloads, 200), 'payloads')
+	report('payload BITS', timed(ais.BITS, payloads, 200), 'payloads')
+
+def bench_decode():
+	'''AIS sentences decoded per second through telegramparser.'''
+	report('telegramparser', timed(ais.telegramparser, ais.SAMPLES, 50), 'sentences')
+	report('telegramparser fast', timed(lambda sentence: ais.telegramparser(sentence, fast=True), ais.SAMPLES, 50), 'sentences')
+
+def bench_dispatch():
+	'''Payloads decoded per second through the message type registry.'''
+	payloads = [sentence.split(',')[5] for sentence in ais.SAMPLES if sentence.startswith('!AIVDM,1,1')]
+	report('payloadparser fast', timed(lambda payload: ais.payloadparser(payload, True), payloads, 50), 'payloads')
+	for message in sorted(ais.DECODERS):
+		typed = [payload for payload in payloads if ais.BITS(payload).uint(0,6) == message]
+		if typed:
+			report('payloadparser fast, type %d' % message, timed(lambda payload: ais.payloadparser(payload, True), typed, 200), 'payloads')
+
+def bench_conversion():
+	'''RMC positions and times converted per second, before and after conversion.py, and the precision kept.'''
+	import conversion
+	import journal
+	fields = '$GPRMC,123519.20,A,4807.0382914,N,01131.0004718,E,022.4,084.4,230394,003.1,W'.split(',')
+	report('position (before)', timed(lambda fields: (legacy_nmea2dec(fields, 0), legacy_nmea2dec(fields, 1)), [fields] * 1000, 200), 'fixes')
+	report('position', timed(lambda fields: (conversion.degrees(fields[3], fields[4]), conversion.degrees(fields[5], fields[6])), [fields] * 1000, 200), 'fixes')
+	report('time (before)', timed(legacy_nmea2utc, [fields] * 1000, 200), 'fixes')
+	report('time to epoch (before)', timed(lambda fields: journal.epoch(legacy_nmea2utc(fields)), [fields] * 1000, 20), 'fixes')
+	report('time', timed(lambda fields: conversion.epoch(fields[1], fields[9]), [fields] * 1000, 200), 'fixes')
+	#Metres lost to the fixed offsets of the old conversion, for a receiver giving seven decimals of a minute
+	print '%-40s %12.4f m' % ('position truncated (before)', abs(legacy_nmea2dec(fields, 1) - conversion.degrees(fields[5], fields[6])) * 60 * 1852 * math.cos(math.radians(48.1)))
+
+def bench_bulk():
+	'''A day of AIS log lines decoded per second, one dict at a time and as columns, from plain and gzipped files.'''
+	import os
+	import gzip
+	import tempfile
+	path = tempfile.mktemp('.log')
+	lines = ['%.3f %s\n' % (1357000000 + x * 0.1, ais.SAMPLES[x % len(ais.SAMPLES)]) for x in xrange(200000)]
+	log = open(path, 'wb')
+	log.writelines(lines)
+	log.close()
+	log = gzip.open(path + '.gz', 'wb')
+	log.writelines(lines)
+	log.close()
+	#Before - a dict per message, through the reassembler the NMEA reader uses
+	reassembler = ais.REASSEMBLER(fast=True)
+	messages = []
+	start = time.time()
+	for line in lines:
+		sentence = line.split(' ', 1)[1].strip()
+		if checksum.checksum(sentence):
+			data = reassembler.feed(sentence)
+			if data:
+				messages.append(data)
+	report('REASSEMBLER dicts', len(lines) / (time.time() - start), 'lines')
+	del messages
+	start = time.time()
+	ais.decode_file(path)
+	report('decode_file', len(lines) / (time.time() - start), 'lines')
+	start = time.time()
+	ais.decode_file(path + '.gz')
+	report('decode_file gzip', len(lines) / (time.time() - start), 'lines')
+	os.remove(path)
+	os.remove(path + '.gz')
+
+def bench_geomath():
+	'''Range and bearing to every leg of a 10k point route, one pair at a time and in one batch.'''
+	lats = [random.uniform(-60, 60) for x in xrange(10000)]
+	lons = [random.uniform(-180, 180) for x in xrange(10000)]
+	start = time.time()
+	for x in xrange(len(lats) - 1):
+		geomath.haversine(lats[x], lons[x], lats[x+1], lons[x+1])
+	report('haversine', (len(lats) - 1) / (time.time() - start), 'legs')
+	start = time.time()
+	geomath.haversine_legs(lats, lons)
+	report('haversine_legs' + ('' if geomath.numpy else ' (no numpy)'), (len(lats) - 1) / (time.time() - start), 'legs')
+
+def bench_track():
+	'''A week of one second track points written in batches, checking file sizes against track_size.'''
+	#gps needs pygame, so it is only imported when this benchmark runs
+	import os
+	import shutil
+	import tempfile
+	import gps
+	location = tempfile.mkdtemp() + '/'
+	track = gps.GPX(location)
+	track.track_maxsize = 2097152
+	track.track_fsync = 'never'
+	sizes = []
+	points = 604800
+	start = time.time()
+	track.track_start()
+	for x in xrange(points):
+		track.track_point(49.0 + x * 1e-6, -123.0 - x * 1e-6, 0, '2013-01-01T00:00:00Z')
+		if x % 6 == 5:
+			track.track_flush()
+	track.track_close()
+	report('track points', points / (time.time() - start), 'points')
+	for name in os.listdir(location):
+		sizes.append(os.path.getsize(location + name))
+	print '%-40s %12d files, largest %d bytes, last matches track_size: %s' % ('track files', len(sizes), max(sizes), os.path.getsize(location + track.gpx_file) == track.track_size)
+	shutil.rmtree(location)
+
+def bench_journal():
+	'''A week of one second points appended to a track journal, then written out as gpx.'''
+	import os
+	import tempfile
+	import journal
+	path = tempfile.mktemp('.trk')
+	points = 604800
+	track = journal.JOURNAL(path)
+	start = time.time()
+	for x in xrange(points):
+		track.append(1357000000 + x, 49.0 + x * 1e-6, -123.0 - x * 1e-6, 5.5, 270.0)
+	track.close()
+	report('journal append', points / (time.time() - start), 'points')
+	print '%-40s %12.1f bytes/point' % ('journal size', (os.path.getsize(path) - len(journal.MAGIC)) / float(points))
+	output = open(os.devnull, 'wb')
+	start = time.time()
+	journal.gpx(path, output)
+	report('journal to gpx', points / (time.time() - start), 'points')
+	output.close()
+	os.remove(path)
+
+def bench_scheduler():
+	'''A day of one second fixes through the scheduler, with jobs due on every fix and on intervals.'''
+	import bus
+	import scheduler
+	jobs = scheduler.SCHEDULER(bus.BUS())
+	for name, interval in [('waypoint', 0), ('xte', 0), ('eta', 4), ('track', 10), ('distance', 2)]:
+		jobs.add(name, lambda fix: None, interval)
+	fix = bus.FIX(49.0, -123.0, 0.0, 0.0, 1356998400, 'A')
+	fixes = 86400
+	start = time.time()
+	for x in xrange(fixes):
+		jobs.tick(fix, 1357000000 + x)
+	report('scheduler ticks', fixes / (time.time() - start), 'fixes')
+	for line in jobs.report():
+		print line
+
+def bench_records():
+	'''Size of a fix held as a dict and as a FIX, and fixes published to the cache and read back per second, each way.'''
+	import bus
+	import nmea
+	values = (49.0, -123.0, 5.5, 270.0, 1356998400, 'A')
+	names = ('lat', 'lon', 'speed', 'track', 'utc', 'status')
+	print '%-40s %12d bytes' % ('fix as dict', sys.getsizeof(dict(zip(names, values))))
+	print '%-40s %12d bytes' % ('fix as FIX', sys.getsizeof(bus.FIX(*values)))
+	fixes = 200000
+	#Before - the decoder and the cache each filled a shared dict key by key, and frames read it key by key
+	decoded = dict(zip(names, values))
+	cached = dict(zip(names, values))
+	start = time.time()
+	for x in xrange(fixes):
+		decoded['lat'], decoded['lon'], decoded['speed'], decoded['track'], decoded['utc'], decoded['status'] = values
+		fix = bus.FIX(decoded['lat'], decoded['lon'], decoded['speed'], decoded['track'], decoded['utc'], decoded['status'])
+		cached['lat'] = fix.lat
+		cached['lon'] = fix.lon
+		cached['speed'] = fix.speed
+		cached['track'] = fix.track
+		cached['utc'] = fix.utc
+		cached['status'] = fix.status
+		cached['lat'], cached['lon'], cached['speed'], cached['track']
+	report('publish and read (dicts)', fixes / (time.time() - start), 'fixes')
+	#After - a single FIX is made, swapped in, and read whole
+	cache = nmea.CACHE()
+	start = time.time()
+	for x in xrange(fixes):
+		cache.cache_fix(bus.FIX(*values))
+		fix = cache.gps
+		fix.lat, fix.lon, fix.speed, fix.track
+	report('publish and read (FIX)', fixes / (time.time() - start), 'fixes')
+
+def recording(path, seconds, ais_rate):
+	'''Writes a log like a RECORDER would, with a gps fix every second and AIS sentences in between.
+	
+	Keyword arguments:
+	path -- the location of the log
+	seconds -- the number of seconds recorded
+	ais_rate -- the number of AIS sentences each second
+	
+	'''
+	log = open(path, 'wb')
+	start = 1357000000
+	x = 0
+	for second in xrange(seconds):
+		stamp = start + second
+		#Heads south down the example route at six knots
+		sentence = '$GPRMC,%s,A,3355.%04d,N,07801.4346,W,6.0,180.0,%s,,,A*' % (time.strftime('%H%M%S', time.gmtime(stamp)), 100000 - second % 100000, time.strftime('%d%m%y', time.gmtime(stamp)))
+		sentence = '%s%02X' % (sentence, checksum.makechecksum(sentence))
+		log.write('%.3f %s\n' % (stamp, sentence))
+		for y in xrange(ais_rate):
+			log.write('%.3f %s\n' % (stamp + (y + 1.0) / (ais_rate + 1), ais.SAMPLES[x % len(ais.SAMPLES)]))
+			x = x + 1
+	log.close()
+
+def bench_replay():
+	'''A recorded log replayed through the decoders and route jobs, as fast as the decoder can go and at ten times real time.'''
+	import os
+	import tempfile
+	import replay
+	path = tempfile.mktemp('.nmea')
+	route = ('../Routes/', 'Example.gpx')
+	recording(path, 3600, 20)
+	#Waits for the decoder, to find how fast it can go
+	for line in replay.report(replay.replay(path, 0, route=route, block=True)):
+		print line
+	recording(path, 30, 20)
+	for line in replay.report(replay.replay(path, 10, route=route)):
+		print line
+	os.remove(path)
+
+def bench_stage():
+	'''Reader time per AIS message decoding inline and handing payloads to a DECODER, and what a burst into a small queue drops.'''
+	import decoder
+	payloads = []
+	reassembler = ais.REASSEMBLER(fast=True)
+	for sentence in ais.SAMPLES:
+		payload = reassembler.join(sentence)
+		if payload:
+			payloads.append(payload)
+	report('reader decoding inline', timed(lambda payload: ais.payloadparser(payload, True), payloads, 200), 'messages')
+	stage = decoder.DECODER(lambda data: None, 0, len(payloads) * 200)
+	report('reader queueing to stage', timed(stage.put, payloads, 200), 'messages')
+	#A burst ten times the queue size, into a stage with a worker process
+	for policy in decoder.POLICIES:
+		stage = decoder.DECODER(lambda data: None, 1, 100, policy)
+		stage.start()
+		for x in xrange(10):
+			for payload in payloads:
+				stage.put(payload)
+		while not stage.idle():
+			time.sleep(0.01)
+		stage.stop()
+		print '%-40s %s' % ('burst, drop ' + policy, stage.report()[1].strip())
+
+BENCHMARKS = [('checksum', bench_checksum), ('conversion', bench_conversion), ('payload', bench_payload), ('decode', bench_decode), ('dispatch', bench_dispatch), ('bulk', bench_bulk), ('geomath', bench_geomath), ('track', bench_track), ('journal', bench_journal), ('scheduler', bench_scheduler), ('records', bench_records), ('replay', bench_replay), ('stage', bench_stage)]
+
+if __name__ == '__main__':
+	names = sys.argv[1:]
+	for name, function in BENCHMARKS:
+		if not names or name in names:
+			function()
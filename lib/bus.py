@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+#-*- coding: utf-8 -*-
+
+import threading
+import collections
+
+
+#A single GPS fix as decoded from one RMC sentence, its utc in whole epoch seconds - never changed, only replaced
+FIX = collections.namedtuple('FIX', 'lat lon speed track utc status')
+#The fix shown before any has been heard
+EMPTY = FIX(0.0, 0.0, 0.0, 0.0, 0, '')
+
+
+class BUS():
+
+	def __init__(self):
+		'''Readies a bus that hands each new GPS fix to whoever is waiting on it.'''
+		#The latest fix and the number of fixes published so far
+		self.fix = None
+		self.sequence = 0
+		#Functions called with every fix, on the thread that publishes it
+		self.listeners = []
+		self.condition = threading.Condition()
+
+	def subscribe(self, listener):
+		'''Calls a function with every fix published from now on.
+		
+		Keyword arguments:
+		listener -- the function to call with each fix
+		
+		'''
+		self.listeners.append(listener)
+
+	def publish(self, fix):
+		'''Makes a fix the latest, and wakes everything waiting for one.
+		
+		Keyword arguments:
+		fix -- the FIX to publish
+		
+		'''
+		with self.condition:
+			self.fix = fix
+			self.sequence = self.sequence + 1
+			self.condition.notify_all()
+		for listener in self.listeners:
+			listener(fix)
+
+	def wait(self, sequence, timeout=None):
+		'''Blocks until a fix newer than the one given is published, and returns its sequence and fix.
+		
+		Returns early with the same sequence when woken by wake(), or after the timeout.
+		
+		Keyword arguments:
+		sequence -- the sequence of the last fix seen, or 0 for none
+		timeout -- the longest number of seconds to wait, or None to wait until woken
+		
+		'''
+		with self.condition:
+			if self.sequence == sequence:
+				self.condition.wait(timeout)
+			return self.sequence, self.fix
+
+	def wake(self):
+		'''Wakes everything waiting for a fix, without publishing one.'''
+		with self.condition:
+			self.condition.notify_all()
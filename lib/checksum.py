@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+#-*- coding: utf-8 -*-
+
+try:
+	import numpy
+except ImportError:
+	numpy = None
+
+
+def makechecksum(data):
+	'''Calculates the XOR checksum of a NMEA sentence.
+	
+	Keyword arguments:
+	data -- the NMEA sentence, including its ! or $ and *xx
+	
+	'''
+	csum = 0
+	#Remove ! or $ and *xx in the sentence - a bytearray gives ints without a lookup per byte
+	for byte in bytearray(data[1:data.rfind('*')]):
+		csum ^= byte
+	return csum
+
+def supplied(data):
+	'''Returns the checksum written after the * of a NMEA sentence, or None if there is none.
+	
+	Keyword arguments:
+	data -- the NMEA sentence to read
+	
+	'''
+	star = data.rfind('*')
+	try:
+		return int(data[star+1:star+3], 16)
+	except ValueError:
+		return None
+
+def checksum(data):
+	'''Creates a checksum and compares it with the supplied checksum.
+	
+	Keyword arguments:
+	data -- the NMEA sentence to check
+	
+	'''
+	supplied_csum = supplied(data)
+	if supplied_csum is None:
+		return ''
+	return makechecksum(data) == supplied_csum
+
+def checksum_many(sentences):
+	'''Checks a batch of NMEA sentences, returning a list of True/False results.
+	
+	Keyword arguments:
+	sentences -- a list of NMEA sentences to check
+	
+	'''
+	if numpy is None:
+		return [checksum(data) is True for data in sentences]
+	bodies = []
+	supplied_csums = []
+	for data in sentences:
+		bodies.append(data[1:data.rfind('*')])
+		supplied_csums.append(supplied(data))
+	#reduceat cannot express an empty sentence body
+	if not bodies or not all(bodies):
+		return [checksum(data) is True for data in sentences]
+	#XORs every sentence body in one pass over the joined bytes
+	starts = numpy.cumsum([0] + [len(body) for body in bodies[:-1]])
+	joined = numpy.frombuffer(''.join(bodies), dtype=numpy.uint8)
+	csums = numpy.bitwise_xor.reduceat(joined, starts)
+	return [csum == supplied_csum for csum, supplied_csum in zip(csums.tolist(), supplied_csums)]
@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+#-*- coding: utf-8 -*-
+
+import os
+import time
+import threading
+import serial
+import fleet
+import nmea
+import sources
+import decoder
+
+
+#Connection states shown to the interface
+CONNECTING = 'connecting'
+NO_FIX = 'no-fix'
+FIX = 'fix'
+
+
+class CONNECTION():
+
+	def __init__(self, location, baud_rate, fix_bus, timeout=5, backoff=1, backoff_max=60, fix_age=5, inputs=None, ais_processes=1, ais_queue=500, ais_drop='positions'):
+		'''Readies a connection manager that keeps a serial NMEA connection open in the background.
+		
+		Keyword arguments:
+		location -- the location of the serial connection
+		baud_rate -- the baud rate of the connection
+		fix_bus -- the BUS gps fixes are published to
+		timeout -- the timeout of the connection
+		backoff -- the number of seconds waited after the first failed attempt, doubled after each one after
+		backoff_max -- the most seconds waited between attempts
+		fix_age -- the number of seconds a fix counts as current
+		inputs -- source settings like serial:/dev/ttyUSB1:38400 or udp:10110, read together instead of the single serial connection
+		ais_processes -- the number of processes decoding AIS messages, or 0 to decode them on a thread
+		ais_queue -- the most AIS messages waiting to be decoded before some are dropped
+		ais_drop -- which AIS messages a full queue drops - positions, oldest or newest
+		
+		'''
+		self.location = location
+		self.baud_rate = baud_rate
+		self.bus = fix_bus
+		self.timeout = timeout
+		self.backoff = backoff
+		self.backoff_max = backoff_max
+		self.fix_age = fix_age
+		self.inputs = inputs
+		#The RECORDER every raw sentence is written to, if set
+		self.recorder = None
+		self.state = CONNECTING
+		self.running = False
+		#Merges every input when there is more than the single serial connection
+		self.mux = None
+		#The current NMEA connection, or None between attempts
+		self.nmea = None
+		#AIS targets are kept across reconnects
+		self.fleet = fleet.FLEET()
+		#Decodes AIS messages away from the reading thread, across reconnects
+		self.stage = decoder.DECODER(self.fleet.update, ais_processes, ais_queue, ais_drop)
+		#Number of attempts since the last fix, and the seconds waited before the last one
+		self.attempts = 0
+		self.delay = 0
+		#Time and status of the last fix heard
+		self.fix_time = 0
+		self.fix_status = ''
+		self.bus.subscribe(self.fixed)
+
+	def start(self):
+		'''Starts the thread that connects, and reconnects when the connection is lost.'''
+		if not self.running:
+			self.running = True
+			self.stage.start()
+			thread = threading.Thread(None, self.run, None, ())
+			thread.daemon = True
+			thread.start()
+
+	def stop(self):
+		'''Stops reconnecting, and closes the current connection.'''
+		self.running = False
+		if self.nmea:
+			self.nmea.quit()
+		if self.mux:
+			self.mux.stop()
+		if self.recorder:
+			self.recorder.close()
+		self.stage.stop()
+
+	def fixed(self, fix):
+		'''Records a newly published fix.'''
+		self.fix_time = time.time()
+		self.fix_status = fix.status
+		self.attempts = 0
+		if fix.status == 'A':
+			self.state = FIX
+
+	def run(self):
+		'''Opens the connection, watches it, and reopens it with backoff when lost - run as thread.'''
+		while self.running:
+			if self.inputs:
+				self.watch()
+			elif self.nmea is None or self.nmea.exit:
+				self.state = CONNECTING
+				self.connect()
+			else:
+				#The device was unplugged - the reader may sit in a read until its timeout
+				if not self.present():
+					self.nmea.quit()
+					self.nmea = None
+					continue
+				if time.time() - self.fix_time > self.fix_age or self.fix_status != 'A':
+					self.state = NO_FIX
+				else:
+					self.state = FIX
+				time.sleep(1)
+
+	def watch(self):
+		'''Starts every input the first time, restarts the decoder if it stops, and keeps the state up to date - each input reconnects itself.'''
+		if self.mux is None:
+			self.mux = sources.MUX()
+			self.mux.recorder = self.recorder
+			for spec in self.inputs:
+				self.mux.add(sources.parse(spec))
+		if self.running and (self.nmea is None or self.nmea.exit):
+			last = self.nmea
+			self.nmea = nmea.NMEA0183(None, None, self.timeout, self.bus, self.fleet, self.stage)
+			#Carries on from the last fix and error count rather than starting over
+			if last:
+				self.nmea.fix = last.fix
+				self.nmea.errors = last.errors
+			self.nmea.read_mux(self.mux)
+		if not self.mux.connected():
+			self.state = CONNECTING
+		elif time.time() - self.fix_time > self.fix_age or self.fix_status != 'A':
+			self.state = NO_FIX
+		else:
+			self.state = FIX
+		time.sleep(1)
+
+	def connect(self):
+		'''Makes a single attempt to connect, after waiting longer for each attempt without a fix.'''
+		self.nmea = None
+		if self.attempts:
+			self.delay = min(self.backoff * 2 ** (self.attempts - 1), self.backoff_max)
+			self.wait(self.delay)
+		self.attempts = self.attempts + 1
+		#Does not try a device that is not plugged in
+		if self.running and self.present():
+			try:
+				connection = nmea.NMEA0183(self.location, self.baud_rate, self.timeout, self.bus, self.fleet, self.stage)
+				connection.recorder = self.recorder
+				connection.read()
+				self.nmea = connection
+				self.fix_time = 0
+				self.state = NO_FIX
+			except (serial.SerialException, IOError, OSError, ValueError):
+				pass
+
+	def wait(self, seconds):
+		'''Waits before the next attempt, ending early when a missing device is plugged in.
+		
+		Keyword arguments:
+		seconds -- the longest number of seconds to wait
+		
+		'''
+		present = self.present()
+		end = time.time() + seconds
+		while self.running and time.time() < end:
+			time.sleep(max(0, min(0.5, end - time.time())))
+			if not present and self.present():
+				#Gives the device a moment to settle before opening it
+				time.sleep(0.5)
+				return
+
+	def present(self):
+		'''Checks whether the device is plugged in - a location that is not a device file always counts as present.'''
+		if self.location and self.location.startswith('/dev/'):
+			return os.path.exists(self.location)
+		return True
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+#-*- coding: utf-8 -*-
+'''Conversions of NMEA0183 positions and times.
+
+Positions and times are decoded to numbers - a time is only formatted as text
+when something shows it.
+
+'''
+
+import time
+import calendar
+
+
+#The ddmmyy date last converted, and its midnight in epoch seconds - at first a date no field can match
+DAY = (None, None)
+
+
+def degrees(value, hemisphere=''):
+	'''Converts a ddmm.mmmm or dddmm.mmmm field of any precision to decimal degrees, or returns None if it is empty.
+	
+	Keyword arguments:
+	value -- the position field
+	hemisphere -- N, S, E or W - S and W are negative
+	
+	'''
+	if not value:
+		return None
+	#A single parse - the minutes are the last two whole digits and every decimal
+	value = float(value)
+	minutes = value % 100
+	value = (value - minutes) / 100 + minutes / 60
+	if hemisphere == 'S' or hemisphere == 'W':
+		return -value
+	return value
+
+def seconds(value):
+	'''Converts a hhmmss or hhmmss.ss field to whole seconds since midnight, or returns None if it is empty.'''
+	if len(value) < 6:
+		return None
+	value = int(value[0:6])
+	return value // 10000 * 3600 + value // 100 % 100 * 60 + value % 100
+
+def midnight(value):
+	'''Converts a ddmmyy field to the epoch seconds of that midnight, or returns None if it is empty.'''
+	global DAY
+	#Dates only change once a day, so the last one is kept - replaced whole, as it is shared between threads
+	day = DAY
+	if day[0] != value:
+		if len(value) < 6:
+			return None
+		date = int(value)
+		day = (value, calendar.timegm((2000 + date % 100, date // 100 % 100, date // 10000, 0, 0, 0)))
+		DAY = day
+	return day[1]
+
+def epoch(value, date):
+	'''Converts a hhmmss.ss field and a ddmmyy field to whole epoch seconds, or returns None if either is empty.
+	
+	Keyword arguments:
+	value -- the time field
+	date -- the date field
+	
+	'''
+	day = DAY
+	if day[0] == date:
+		day = day[1]
+	else:
+		day = midnight(date)
+		if day is None:
+			return None
+	if len(value) < 6:
+		return None
+	#Done here rather than through seconds, as it runs for every fix
+	value = int(value[0:6])
+	return day + value // 10000 * 3600 + value // 100 % 100 * 60 + value % 100
+
+def isotime(seconds):
+	'''Returns epoch seconds as YYYY-MM-DDTHH:MM:SSZ.'''
+	return time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(seconds))
+
+def clock(seconds):
+	'''Returns seconds, since midnight or the epoch, as HH:MM:SS.'''
+	seconds = int(seconds) % 86400
+	return '%02d:%02d:%02d' % (seconds // 3600, seconds // 60 % 60, seconds % 60)
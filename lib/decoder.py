@@ -0,0 +1,182 @@
+#!/usr/bin/env python
+#-*- coding: utf-8 -*-
+
+import time
+import threading
+import collections
+import multiprocessing
+import ais
+
+
+#Message types that are only a position report, dropped first when the queue is full
+POSITIONS = frozenset([1, 2, 3, 18, 27])
+#Message types holding static and voyage data - never dropped
+STATIC = frozenset([5, 19, 24])
+#How a full queue makes room - drop the oldest position first, the oldest of any droppable message, or the newest message
+POLICIES = ('positions', 'oldest', 'newest')
+
+#Kinds of queued payloads
+POSITION = 0
+OTHER = 1
+FIXED = 2
+
+
+def message(payload):
+	'''Returns the message type of an armored payload, from its first character.'''
+	value = ord(payload[0:1] or '0') - 48
+	if value > 40:
+		value = value - 8
+	return value
+
+def kind(payload):
+	'''Returns whether a payload is a POSITION, static data that is FIXED, or any OTHER message.'''
+	value = message(payload)
+	if value in POSITIONS:
+		return POSITION
+	if value in STATIC:
+		return FIXED
+	return OTHER
+
+def decode(payload):
+	'''Decodes a payload in a worker process, returning None if it can not be decoded.'''
+	try:
+		return ais.payloadparser(payload, True)
+	except Exception:
+		return None
+
+class DECODER():
+
+	def __init__(self, handler, processes=1, maxsize=500, policy='positions', batch=64):
+		'''Readies a stage that decodes AIS payloads away from the thread reading them.
+		
+		Keyword arguments:
+		handler -- the function called with each decoded message, on the stage thread
+		processes -- the number of worker processes decoding, or 0 to decode on the stage thread
+		maxsize -- the most droppable payloads waiting - static data is let in beyond it
+		policy -- how a full queue makes room, one of POLICIES
+		batch -- the most payloads handed to the workers at once
+		
+		'''
+		if policy not in POLICIES:
+			raise ValueError('Unknown drop policy: ' + policy)
+		self.handler = handler
+		self.processes = processes
+		self.maxsize = maxsize
+		self.policy = policy
+		self.batch = batch
+		self.running = False
+		self.pool = None
+		#Waiting payloads in arrival order, as (kind, payload, time queued)
+		self.queue = collections.deque()
+		self.condition = threading.Condition()
+		#Payloads queued, decoded, that could not be decoded, and dropped of each kind
+		self.received = 0
+		self.decoded = 0
+		self.failed = 0
+		self.dropped = [0, 0, 0]
+		#Most payloads waiting at once, times a payload arrived to a full queue, and the longest wait in seconds
+		self.high = 0
+		self.full = 0
+		self.wait = 0.0
+
+	def start(self):
+		'''Starts the worker processes, and the thread that hands them payloads.'''
+		if not self.running:
+			self.running = True
+			if self.processes:
+				self.pool = multiprocessing.Pool(self.processes)
+			thread = threading.Thread(None, self.run, None, ())
+			thread.daemon = True
+			thread.start()
+
+	def stop(self):
+		'''Stops the stage, and the worker processes.'''
+		with self.condition:
+			self.running = False
+			self.condition.notify_all()
+		if self.pool:
+			self.pool.terminate()
+			self.pool = None
+
+	def put(self, payload):
+		'''Queues a payload to be decoded, making room by the drop policy if the queue is full.
+		
+		Keyword arguments:
+		payload -- the armored payload of a whole message
+		
+		'''
+		item = (kind(payload), payload, time.time())
+		with self.condition:
+			self.received = self.received + 1
+			if len(self.queue) >= self.maxsize:
+				self.full = self.full + 1
+				if not self.room(item[0]):
+					self.dropped[item[0]] = self.dropped[item[0]] + 1
+					return
+			self.queue.append(item)
+			if len(self.queue) > self.high:
+				self.high = len(self.queue)
+			self.condition.notify()
+
+	def room(self, incoming):
+		'''Drops a waiting payload to make room for a new one, and returns whether the new one should be queued. Call with the lock held.'''
+		if self.policy == 'positions':
+			#Positions go first, as the next report replaces them anyway
+			if self.evict(POSITION) or self.evict(OTHER):
+				return True
+		elif self.policy == 'oldest':
+			if self.evict(None):
+				return True
+		#Static data is let in beyond the limit rather than dropped
+		return incoming == FIXED
+
+	def evict(self, dropping):
+		'''Drops the oldest waiting payload of a kind, or of any droppable kind for None, and returns whether one was found.'''
+		for x, item in enumerate(self.queue):
+			if item[0] == dropping or (dropping is None and item[0] != FIXED):
+				del self.queue[x]
+				self.dropped[item[0]] = self.dropped[item[0]] + 1
+				return True
+		return False
+
+	def take(self):
+		'''Waits for payloads, and returns up to a batch of them.'''
+		with self.condition:
+			while self.running and not self.queue:
+				self.condition.wait(1)
+			items = []
+			while self.queue and len(items) < self.batch:
+				items.append(self.queue.popleft())
+		if items:
+			self.wait = max(self.wait, time.time() - items[0][2])
+		return [item[1] for item in items]
+
+	def run(self):
+		'''Hands waiting payloads to the workers, and each decoded message to the handler - run as thread.'''
+		while self.running:
+			payloads = self.take()
+			if not payloads:
+				continue
+			try:
+				if self.pool:
+					results = self.pool.map(decode, payloads)
+				else:
+					results = map(decode, payloads)
+			except Exception:
+				#The pool was stopped
+				continue
+			for data in results:
+				if data:
+					self.decoded = self.decoded + 1
+					self.handler(data)
+				else:
+					self.failed = self.failed + 1
+
+	def idle(self):
+		'''Checks whether every payload queued so far has been decoded or dropped.'''
+		return self.decoded + self.failed + sum(self.dropped) >= self.received
+
+	def report(self):
+		'''Returns lines with the queue depth, decodes and drops of each kind.'''
+		return ['%-12s %6d waiting %6d most %6d max %6d full %8.3f s longest wait' % ('ais queue', len(self.queue), self.high, self.maxsize, self.full, self.wait),
+			'%-12s %8d received %8d decoded %6d failed %6d positions %6d other %6d static dropped' % ('ais decode', self.received, self.decoded, self.failed, self.dropped[POSITION], self.dropped[OTHER], self.dropped[FIXED])]
@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+#-*- coding: utf-8 -*-
+
+import math
+import time
+import threading
+import collections
+import geomath
+
+
+class FLEET():
+
+	def __init__(self, cell=0.25, max_age=1800, maxsize=5000):
+		'''Readies the vessel table and its spatial index.
+		
+		Keyword arguments:
+		cell -- the size in degrees of each square in the spatial grid
+		max_age -- the number of seconds a vessel is kept after it was last seen
+		maxsize -- the largest number of vessels held at once
+		
+		'''
+		self.cell = cell
+		self.max_age = max_age
+		self.maxsize = maxsize
+		#Merged AIS data for each vessel keyed by MMSI, in last seen order
+		self.vessels = collections.OrderedDict()
+		#The MMSI numbers of every positioned vessel in each grid square
+		self.grid = {}
+		#Number of grid columns around the globe
+		self.columns = int(math.ceil(360 / cell))
+		#Decoding and drawing run on separate threads
+		self.lock = threading.Lock()
+
+	def update(self, data, now=None):
+		'''Merges a decoded AIS message into the vessel it came from.
+		
+		Keyword arguments:
+		data -- the dictionary returned by the AIS decoder
+		now -- the time the message was received, in seconds
+		
+		'''
+		mmsi = data.get('mmsi')
+		if mmsi is None:
+			return
+		if now is None:
+			now = time.time()
+		with self.lock:
+			#Moves the vessel to the back of the last seen order
+			vessel = self.vessels.pop(mmsi, None)
+			if vessel is None:
+				vessel = {'mmsi': mmsi, 'cell': None}
+			self.vessels[mmsi] = vessel
+			#N/A fields do not overwrite what is already known
+			for key, value in data.iteritems():
+				if value is not None:
+					vessel[key] = value
+			vessel['seen'] = now
+			if data.get('latitude') is not None and data.get('longitude') is not None:
+				self.place(vessel, self.square(vessel['latitude'], vessel['longitude']))
+			self.expire(now)
+
+	def expire(self, now):
+		'''Drops vessels that have not been seen within max_age, or beyond maxsize. Call with the lock held.
+		
+		Keyword arguments:
+		now -- the current time, in seconds
+		
+		'''
+		#The least recently seen vessel is always first
+		while self.vessels:
+			mmsi, vessel = next(self.vessels.iteritems())
+			if now - vessel['seen'] <= self.max_age and len(self.vessels) <= self.maxsize:
+				break
+			del self.vessels[mmsi]
+			self.place(vessel, None)
+
+	def square(self, lat, lon):
+		'''Returns the grid square holding a position.
+		
+		Keyword arguments:
+		lat -- the latitude of the position
+		lon -- the longitude of the position
+		
+		'''
+		return (int(math.floor((float(lat) + 90) / self.cell)), int(math.floor((float(lon) + 180) / self.cell)) % self.columns)
+
+	def place(self, vessel, cell):
+		'''Moves a vessel from its current grid square to another, or out of the grid if cell is None.
+		
+		Keyword arguments:
+		vessel -- the vessel to move
+		cell -- the grid square to move to
+		
+		'''
+		if vessel['cell'] == cell:
+			return
+		if vessel['cell'] is not None:
+			members = self.grid[vessel['cell']]
+			members.discard(vessel['mmsi'])
+			if not members:
+				del self.grid[vessel['cell']]
+		if cell is not None:
+			self.grid.setdefault(cell, set()).add(vessel['mmsi'])
+		vessel['cell'] = cell
+
+	def within(self, lat, lon, radius):
+		'''Returns [vessel, distance, bearing] for every vessel within radius, nearest first.
+		
+		Keyword arguments:
+		lat -- the latitude of the centre
+		lon -- the longitude of the centre
+		radius -- the search radius in nautical miles
+		
+		'''
+		#One degree of latitude is 60 nautical miles
+		lat_span = radius / 60.0
+		cos_lat = math.cos(math.radians(lat))
+		row_1, col_1 = self.square(max(lat - lat_span, -90), lon)
+		row_2, col_2 = self.square(min(lat + lat_span, 90), lon)
+		#Near the poles every column is within range
+		if cos_lat < lat_span / 180:
+			columns = range(self.columns)
+		else:
+			col_span = int(math.ceil(lat_span / cos_lat / self.cell))
+			columns = [(col_1 + x) % self.columns for x in range(-col_span, col_span + 1)]
+		candidates = []
+		with self.lock:
+			for row in range(row_1, row_2 + 1):
+				for col in columns:
+					for mmsi in self.grid.get((row, col), ()):
+						candidates.append(dict(self.vessels[mmsi]))
+		if not candidates:
+			return []
+		#Ranges and bearings to every candidate in one call
+		distances, bearings = geomath.haversine_many(lat, lon, [float(vessel['latitude']) for vessel in candidates], [float(vessel['longitude']) for vessel in candidates])
+		targets = []
+		for vessel, distance, bearing in zip(candidates, distances, bearings):
+			if distance <= radius:
+				targets.append([vessel, float(distance), float(bearing)])
+		targets.sort(key=lambda target: target[1])
+		return targets
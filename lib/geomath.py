@@ -1,5 +1,13 @@
 import math
 
+try:
+	import numpy
+except ImportError:
+	numpy = None
+
+#Earth radius in nautical miles
+RADIUS = 3443.92
+
 
 class UNIT():
 
@@ -55,7 +63,7 @@ def haversine(lat_1,lon_1,lat_2,lon_2):
 	'''
 	#Earth radius
 	try:
-		radius = 3443.92
+		radius = RADIUS
 		lon_1, lat_1, lon_2, lat_2 = map(math.radians, [lon_1, lat_1, lon_2, lat_2])
 		dst_lon = lon_2 - lon_1
 		dst_lat = lat_2 - lat_1
@@ -70,6 +78,100 @@ def haversine(lat_1,lon_1,lat_2,lon_2):
 	except:
 		pass
 
+def haversine_pairs(lats_1,lons_1,lats_2,lons_2):
+	'''Calculates the distance and bearing between each pair of coordinates, without rounding.
+	
+	Returns a list of distances and a list of bearings, or NumPy arrays when NumPy is available.
+	
+	Keyword arguments:
+	lats_1 -- the base coordinate latitudes
+	lons_1 -- the base coordinate longitudes
+	lats_2 -- the alternate coordinate latitudes
+	lons_2 -- the alternate coordinate longitudes
+	
+	'''
+	if numpy is not None:
+		lat_1 = numpy.radians(numpy.asarray(lats_1, dtype=float))
+		lon_1 = numpy.radians(numpy.asarray(lons_1, dtype=float))
+		lat_2 = numpy.radians(numpy.asarray(lats_2, dtype=float))
+		lon_2 = numpy.radians(numpy.asarray(lons_2, dtype=float))
+		dst_lon = lon_2 - lon_1
+		cos_lat_2 = numpy.cos(lat_2)
+		a = numpy.sin((lat_2 - lat_1)/2)**2 + numpy.cos(lat_1) * cos_lat_2 * numpy.sin(dst_lon/2)**2
+		dis_out = 2 * RADIUS * numpy.arcsin(numpy.sqrt(numpy.minimum(a, 1.0)))
+		y = numpy.sin(dst_lon) * cos_lat_2
+		x = numpy.cos(lat_1) * numpy.sin(lat_2) - numpy.sin(lat_1) * cos_lat_2 * numpy.cos(dst_lon)
+		brg_out = (numpy.degrees(numpy.arctan2(y, x)) + 360) % 360
+		return dis_out, brg_out
+	#Pure python fallback - local names save a lookup per call
+	radians = math.radians
+	sin = math.sin
+	cos = math.cos
+	dis_out = []
+	brg_out = []
+	for lat_1, lon_1, lat_2, lon_2 in zip(lats_1, lons_1, lats_2, lons_2):
+		lat_1 = radians(lat_1)
+		lat_2 = radians(lat_2)
+		dst_lon = radians(lon_2) - radians(lon_1)
+		cos_lat_2 = cos(lat_2)
+		a = sin((lat_2 - lat_1)/2)**2 + cos(lat_1) * cos_lat_2 * sin(dst_lon/2)**2
+		dis_out.append(2 * RADIUS * math.asin(math.sqrt(min(a, 1.0))))
+		y = sin(dst_lon) * cos_lat_2
+		x = cos(lat_1) * sin(lat_2) - sin(lat_1) * cos_lat_2 * cos(dst_lon)
+		brg_out.append((math.degrees(math.atan2(y, x)) + 360) % 360)
+	return dis_out, brg_out
+
+def haversine_many(lat,lon,lats,lons):
+	'''Calculates the distance and bearing from one coordinate to each of many.
+	
+	Keyword arguments:
+	lat -- the base coordinate latitude
+	lon -- the base coordinate longitude
+	lats -- the alternate coordinate latitudes
+	lons -- the alternate coordinate longitudes
+	
+	'''
+	count = len(lats)
+	return haversine_pairs([lat]*count, [lon]*count, lats, lons)
+
+def haversine_legs(lats,lons):
+	'''Calculates the distance and bearing of each leg between consecutive coordinates.
+	
+	Keyword arguments:
+	lats -- the latitudes of the path
+	lons -- the longitudes of the path
+	
+	'''
+	return haversine_pairs(lats[:-1], lons[:-1], lats[1:], lons[1:])
+
+def unit_vector(lat,lon):
+	'''Returns the earth-centred unit vector of a coordinate.
+	
+	Keyword arguments:
+	lat -- the coordinate latitude
+	lon -- the coordinate longitude
+	
+	'''
+	lat = math.radians(lat)
+	lon = math.radians(lon)
+	return (math.cos(lat) * math.cos(lon), math.cos(lat) * math.sin(lon), math.sin(lat))
+
+def unit_normal(vector_1,vector_2):
+	'''Returns the unit normal of the great circle from one unit vector to another, or None if they are the same point.
+	
+	Keyword arguments:
+	vector_1 -- the unit vector the great circle starts from
+	vector_2 -- the unit vector the great circle heads to
+	
+	'''
+	x = vector_1[1] * vector_2[2] - vector_1[2] * vector_2[1]
+	y = vector_1[2] * vector_2[0] - vector_1[0] * vector_2[2]
+	z = vector_1[0] * vector_2[1] - vector_1[1] * vector_2[0]
+	length = math.sqrt(x*x + y*y + z*z)
+	if length < 1e-12:
+		return None
+	return (x / length, y / length, z / length)
+
 def calc_line(degree,radius,x,y):
 	'''Calculates the x,y coordinates of a point within a circle circumference based on degrees.
 	
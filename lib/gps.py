@@ -1,15 +1,35 @@
-import thread
 import time
 import datetime
 import geomath
+import journal
 import math
 import pygame
 import sys
+import os
+import collections
+import threading
+try:
+	import xml.etree.cElementTree as ElementTree
+except ImportError:
+	import xml.etree.ElementTree as ElementTree
+
+
+#Route records - never changed, only replaced, so the interface always reads a whole one
+#A route waypoint, with the distance and bearing of the leg to it
+WAYPOINT = collections.namedtuple('WAYPOINT', 'lat lon name distance bearing')
+#Distance and bearing from the current position to the waypoint
+COURSE = collections.namedtuple('COURSE', 'distance bearing')
+#Hours and minutes to the waypoint
+ETA = collections.namedtuple('ETA', 'hour min')
+#Crosstrack error, and the side of the course it is on - L, R or ''
+XTE = collections.namedtuple('XTE', 'distance side')
+#Position of the crosstrack angle, its track line, the degrees off the leg track, and its opposite line
+ANGLE = collections.namedtuple('ANGLE', 'position line degrees opposite')
 
 
 class GPS():
 
-	def __init__(self, gui, cache, unit):
+	def __init__(self, gui, cache, unit, scheduler):
 		#Degree character required for lat/long
 		self.degree              = chr(176)
 		#Top speed on the speedometer
@@ -28,36 +48,75 @@ class GPS():
 		self.gui                 = gui
 		#Holds cached GPS data
 		self.cache               = cache
-		self.route               = ROUTE(self.cache, ALARM())
-		self.track               = TRACK(self.cache)
+		self.route               = ROUTE(scheduler, ALARM())
+		self.track               = TRACK(scheduler)
 
-	def interface(self):
-		'''Draws all the basic gps interface graphics.'''
+	def background(self):
+		'''Draws the static gps interface graphics - rendered once by the gui, for each colour scheme.'''
 		#Draws the interface lines
 		pygame.draw.lines(self.gui.screen, self.gui.colour_2, False, [(250,0),(250,550)], 2)
 		pygame.draw.lines(self.gui.screen, self.gui.colour_2, False, [(550,0),(550,500)], 2)
-		#If tracking is on, draw it
+		#Draws the basic latlon interface
+		pygame.draw.rect(self.gui.screen, self.gui.colour_2, (0,0,250,20))
+		self.gui.txt_out(self.gui.text(self.gui.font_3, 'POS', self.gui.colour_1),107,0)
+		#Draws the basic speedometer interface
+		pygame.draw.rect(self.gui.screen, self.gui.colour_2, (0,128,250,20))
+		self.gui.txt_out(self.gui.text(self.gui.font_3, 'SOG', self.gui.colour_1),107,128)
+		pygame.draw.rect(self.gui.screen, self.gui.colour_2, (15,210,220,40), 1)
+		self.gui.txt_out(self.gui.text(self.gui.font_1, str(self.speed_top), self.gui.colour_2),220,253)
+		self.gui.txt_out(self.gui.text(self.gui.font_1, str(self.speed_top/2), self.gui.colour_2),116,253)
+		self.gui.txt_out(self.gui.text(self.gui.font_1, '0', self.gui.colour_2),15,253)
+		#Draws the basic compass interface and rose
+		pygame.draw.rect(self.gui.screen, self.gui.colour_2, (250,0,300,20))
+		self.gui.txt_out(self.gui.text(self.gui.font_3, 'COG', self.gui.colour_1),380,0)
+		for point in self.compass_rose_1:
+			self.gui.txt_out(self.gui.text(self.gui.font_2, point[2], self.gui.colour_2),point[0],point[1])
+		for point in self.compass_rose_2:
+			self.gui.txt_out(self.gui.text(self.gui.font_3, point[2], self.gui.colour_2),point[0],point[1])
+		for point in self.compass_rose_3:
+			pygame.draw.lines(self.gui.screen, self.gui.colour_2, False, point, 3)
+		pygame.draw.circle(self.gui.screen, self.gui.colour_2, (400,162), 100,1)
+		#Draws the basic route interface
+		pygame.draw.rect(self.gui.screen, self.gui.colour_2, (250,350,300,20))
+		pygame.draw.rect(self.gui.screen, self.gui.colour_2, (550,0,250,20))
+		pygame.draw.rect(self.gui.screen, self.gui.colour_2, (550,85,250,20))
+		pygame.draw.rect(self.gui.screen, self.gui.colour_2, (550,288,250,20))
+		pygame.draw.rect(self.gui.screen, self.gui.colour_2, (550,376,250,20))
+		self.gui.txt_out(self.gui.text(self.gui.font_3, 'WPT', self.gui.colour_1),385,350)
+		self.gui.txt_out(self.gui.text(self.gui.font_3, 'WTA', self.gui.colour_1),655,376)
+		self.gui.txt_out(self.gui.text(self.gui.font_3, 'XTE', self.gui.colour_1),655,0)
+		self.gui.txt_out(self.gui.text(self.gui.font_3, 'XTA', self.gui.colour_1),655,85)
+		self.gui.txt_out(self.gui.text(self.gui.font_3, 'RTA', self.gui.colour_1),655,288)
+
+	def interface(self):
+		'''Draws the tracking and routing status of the gps interface, when it changes.'''
 		if self.track.mode == True:
-			self.gui.txt_out(self.gui.font_1.render('Tracking - ' + self.track.gpx_track.gpx_file, True, self.gui.colour_2),10,477)
+			track_name = self.track.name
+		else:
+			track_name = None
 		if self.route.mode == True:
-			self.gui.txt_out(self.gui.font_1.render('Route - ' + self.route.gpx_route.gpx_file, True, self.gui.colour_2),560,477)
+			route_name = self.route.gpx_route.gpx_file
+		else:
+			route_name = None
+		self.gui.panel('track', (0,467,250,33), track_name, self.interface_track)
+		self.gui.panel('route', (551,467,249,33), route_name, self.interface_route)
+
+	def interface_track(self, track_name):
+		'''Draws the current track file name.'''
+		self.gui.txt_out(self.gui.text(self.gui.font_1, 'Tracking - ' + track_name, self.gui.colour_2),10,477)
+
+	def interface_route(self, route_name):
+		'''Draws the current route file name.'''
+		self.gui.txt_out(self.gui.text(self.gui.font_1, 'Route - ' + route_name, self.gui.colour_2),560,477)
 
 	def latlong(self):
-		'''Positions and draws the lat/long interface.
-		
-		Keyword arguments:
-		lat -- the current latitude position
-		lon -- the current longitude position
-		
-		'''
-		#Draws the basic latlon interface
-		pygame.draw.rect(self.gui.screen, self.gui.colour_2, (0,0,250,20))
-		self.gui.txt_out((self.gui.font_3.render('POS', True, self.gui.colour_1)),107,0)
-		#Cuts the decimal count down to 5
-		lat = self.cache.gps['lat']
-		lon = self.cache.gps['lon']
-		lat_out = ("%.5f" % self.cache.gps['lat'])
-		lon_out = ("%.5f" % self.cache.gps['lon'])
+		'''Positions the lat/long interface, and draws it when it changes.'''
+		#Cuts the decimal count down to 5 - both from the same fix
+		fix = self.cache.gps
+		lat = fix.lat
+		lon = fix.lon
+		lat_out = ("%.5f" % lat)
+		lon_out = ("%.5f" % lon)
 		#Applies N/S, W/E based on negative value
 		if lat < 0:
 			lat_out = lat_out[1:] + ' S'
@@ -83,262 +142,328 @@ class GPS():
 			ext_2 = 1
 		else:
 			ext_2 = 40
-		#Draws the lat/long interface text
-		self.gui.txt_out((self.gui.font_4.render(lat_out, True, self.gui.colour_2)),20 + ext_1,30)
-		self.gui.txt_out((self.gui.font_4.render(lon_out, True, self.gui.colour_2)),20 + ext_2,75)
+		self.gui.panel('pos', (0,20,250,108), (lat_out, ext_1, lon_out, ext_2), self.latlong_out)
 
-	def speedometer(self):
-		'''Positions and draws the speedometer interface.
+	def latlong_out(self, value):
+		'''Draws the lat/long interface text.
 		
 		Keyword arguments:
-		speed_out -- the current vessel speed
+		value -- the lat text, its offset, the lon text, and its offset
 		
 		'''
-		#Draws the basic speedometer interface
-		pygame.draw.rect(self.gui.screen, self.gui.colour_2, (0,128,250,20))
-		self.gui.txt_out((self.gui.font_3.render('SOG', True, self.gui.colour_1)),107,128)
+		self.gui.txt_out(self.gui.text(self.gui.font_4, value[0], self.gui.colour_2),20 + value[1],30)
+		self.gui.txt_out(self.gui.text(self.gui.font_4, value[2], self.gui.colour_2),20 + value[3],75)
+
+	def speedometer(self):
+		'''Positions the speedometer interface, and draws it when it changes.'''
 		#Rounds and converts speed to unit setting
-		speed_out = round(self.unit.convert(1,self.cache.gps['speed']),1)
+		speed_out = round(self.unit.convert(1,self.cache.gps.speed),1)
 		#Determines speedometer position based on top speed
 		speed_meter = (speed_out*220)/self.speed_top
 		if speed_meter > 220:
 			speed_meter = 220
 		ext = self.calc_size(speed_out)
-		#Draws the speedometer interface
-		pygame.draw.rect(self.gui.screen, self.gui.colour_2, (15,210,220,40), 1)
-		pygame.draw.rect(self.gui.screen, self.gui.colour_2, (15,210,speed_meter,40))
-		self.gui.txt_out((self.gui.font_4.render(str(speed_out) + ' ' + self.unit.text[1], True, self.gui.colour_2)),30 + ext,158)
-		self.gui.txt_out((self.gui.font_1.render(str(self.speed_top), True, self.gui.colour_2)),220,253)
-		self.gui.txt_out((self.gui.font_1.render(str(self.speed_top/2), True, self.gui.colour_2)),116,253)
-		self.gui.txt_out((self.gui.font_1.render('0', True, self.gui.colour_2)),15,253)
+		self.gui.panel('sog', (0,148,250,103), (speed_out, speed_meter, ext, self.unit.text[1]), self.speedometer_out)
+
+	def speedometer_out(self, value):
+		'''Draws the speedometer interface.
+		
+		Keyword arguments:
+		value -- the speed, the meter length, the text offset, and the unit text
+		
+		'''
+		pygame.draw.rect(self.gui.screen, self.gui.colour_2, (15,210,value[1],40))
+		self.gui.txt_out(self.gui.text(self.gui.font_4, str(value[0]) + ' ' + value[3], self.gui.colour_2),30 + value[2],158)
 
 	def compass(self):
-		'''Positions and draws the compass interface.'''
-		#Draws the basic compass interface
-		pygame.draw.rect(self.gui.screen, self.gui.colour_2, (250,0,300,20))
-		self.gui.txt_out((self.gui.font_3.render('COG', True, self.gui.colour_1)),380,0)
+		'''Positions the compass interface, and draws it when it changes.'''
+		compass_out = self.cache.gps.track
+		#If routing is enabled, the current destination is drawn too
+		if self.route.mode == True:
+			bearing = self.route.waypoint_calc.bearing
+		else:
+			bearing = None
+		self.gui.panel('cog', (251,20,298,330), (compass_out, bearing), self.compass_out)
+
+	def compass_out(self, value):
+		'''Draws the compass interface.
+		
+		Keyword arguments:
+		value -- the current track, and the bearing to the destination or None
+		
+		'''
 		#Determines the x,y position on compass circumference in relation to degrees
-		compass_out = self.cache.gps['track'] 
+		compass_out = value[0]
 		compass_main = self.calc_line(compass_out,100,400,162)
-		#Draws the compass rose
-		for point in self.compass_rose_1:
-			self.gui.txt_out(self.gui.font_2.render(point[2], True, self.gui.colour_2),point[0],point[1])
-		for point in self.compass_rose_2:
-			self.gui.txt_out(self.gui.font_3.render(point[2], True, self.gui.colour_2),point[0],point[1])
-		for point in self.compass_rose_3:
-			pygame.draw.lines(self.gui.screen, self.gui.colour_2, False, point, 3)
 		#Repositions degree text based on size
 		ext = self.calc_size(compass_out)
-		#If routing is enabled, draws the current destination line 
-		if self.route.mode == True:
-			compass_destination = self.calc_line(self.route.waypoint_calc['bearing'],100,400,162)
+		#Draws the current destination line
+		if value[1] is not None:
+			compass_destination = self.calc_line(value[1],100,400,162)
 			pygame.draw.lines(self.gui.screen, self.gui.colour_2, False, [(400,162),(compass_destination[0],compass_destination[1])], 1)
 		#Draws the compass interface
 		pygame.draw.circle(self.gui.screen, self.gui.colour_2, (400,162), 5)
-		pygame.draw.circle(self.gui.screen, self.gui.colour_2, (400,162), 100,1)
 		pygame.draw.lines(self.gui.screen, self.gui.colour_2, False, [(400,162),(compass_main[0],compass_main[1])], 5)
-		self.gui.txt_out((self.gui.font_4.render(str(round(compass_out)).replace('.0','') + self.degree, True, self.gui.colour_2)),342 + ext,290)
+		self.gui.txt_out(self.gui.text(self.gui.font_4, str(round(compass_out)).replace('.0','') + self.degree, self.gui.colour_2),342 + ext,290)
 
 	def destination(self):
-		'''Positions and draws destination interface.'''
-		#Positions and draws the route interface
-		pygame.draw.rect(self.gui.screen, self.gui.colour_2, (250,350,300,20))
-		pygame.draw.rect(self.gui.screen, self.gui.colour_2, (550,0,250,20))
-		pygame.draw.rect(self.gui.screen, self.gui.colour_2, (550,85,250,20))
-		pygame.draw.rect(self.gui.screen, self.gui.colour_2, (550,288,250,20))
-		pygame.draw.rect(self.gui.screen, self.gui.colour_2, (550,376,250,20))
-		self.gui.txt_out((self.gui.font_3.render('WPT', True, self.gui.colour_1)),385,350)
-		self.gui.txt_out((self.gui.font_3.render('WTA', True, self.gui.colour_1)),655,376)
-		self.gui.txt_out((self.gui.font_3.render('XTE', True, self.gui.colour_1)),655,0)
-		self.gui.txt_out((self.gui.font_3.render('XTA', True, self.gui.colour_1)),655,85)
-		self.gui.txt_out((self.gui.font_3.render('RTA', True, self.gui.colour_1)),655,288)
+		'''Positions the destination interface, and draws each part of it when it changes.'''
+		wpt = None
+		xte = None
+		xta = None
+		rta = None
+		wta = None
 		if self.route.mode == True:
 			#Gets current waypoint info for storage
-			wpt_distance = self.unit.convert(0,self.route.waypoint_calc['distance'])
-			wpt_xte = [self.unit.convert(0,self.route.waypoint_xte[0]),self.route.waypoint_xte[1]]
-			wpt_bearing = self.route.waypoint_calc['bearing']
+			calc = self.route.waypoint_calc
+			waypoint_xte = self.route.waypoint_xte
+			waypoint_eta = self.route.waypoint_eta
+			xte_angle = self.route.xte_angle
+			wpt_distance = self.unit.convert(0,calc.distance)
+			wpt_xte = [self.unit.convert(0,waypoint_xte.distance),waypoint_xte.side]
+			wpt_bearing = calc.bearing
 			#Positions destination distance and bearing text based on length
 			ext1 = self.calc_size(wpt_distance)
 			ext2 = self.calc_size(wpt_bearing)
 			ext3 = self.calc_size(wpt_xte[0])
-			#Draws the waypoint bearing info
-			self.gui.txt_out((self.gui.font_4.render(str(wpt_distance) + ' ' + self.unit.text[0], True, self.gui.colour_2)),300 + ext1,418)
-			self.gui.txt_out((self.gui.font_4.render(str(wpt_bearing).replace('.0','') + self.degree, True, self.gui.colour_2)),343 + ext2,378)
-			#Positions and draws crosstrack error interface
+			#The waypoint bearing info
+			wpt = (str(wpt_distance) + ' ' + self.unit.text[0], 300 + ext1, str(wpt_bearing).replace('.0','') + self.degree, 343 + ext2)
 			#Positions xte text based on length
-			self.gui.txt_out((self.gui.font_4.render(wpt_xte[1] + str(wpt_xte[0]) + ' ' + self.unit.text[0], True, self.gui.colour_2)),555 + ext3,30)
-			#Positions and draws the RTA info.
-			self.gui.txt_out((self.gui.font_2.render(self.route.total_eta, True, self.gui.colour_2)),600,325)
+			xte = (wpt_xte[1] + str(wpt_xte[0]) + ' ' + self.unit.text[0], 555 + ext3)
+			#The RTA info
+			rta = self.route.total_eta
 			#WTA hours too large to display
-			if self.route.waypoint_eta['hour'] == '1000':
-				self.gui.txt_out((self.gui.font_4.render('1000h +', True, self.gui.colour_2)),615,406)
+			if waypoint_eta.hour == '1000':
+				wta = ('1000h +', 615)
 			else:
-				#Positions and draws the WTA info
-				ext = self.calc_size(self.route.waypoint_eta['hour'])
-				self.gui.txt_out((self.gui.font_4.render(str(self.route.waypoint_eta['hour']) + 'h' + ' : ' + self.route.waypoint_eta['min'] + 'm', True, self.gui.colour_2)),565 + ext,406)
-			#Draw crosstrack angle if available
-			if self.route.waypoint_xte[1] != '':
-				self.xtaline()
-
-	def xtaline(self):
+				#Positions the WTA info
+				ext = self.calc_size(waypoint_eta.hour)
+				wta = (str(waypoint_eta.hour) + 'h' + ' : ' + waypoint_eta.min + 'm', 565 + ext)
+			#Crosstrack angle if available
+			if waypoint_xte.side != '':
+				xta = (xte_angle.position, tuple(xte_angle.line), tuple(xte_angle.opposite))
+		self.gui.panel('wpt', (251,370,298,95), wpt, self.destination_wpt)
+		self.gui.panel('xte', (551,20,249,65), xte, self.destination_xte)
+		self.gui.panel('xta', (551,105,249,183), xta, self.xtaline)
+		self.gui.panel('rta', (551,308,249,68), rta, self.destination_rta)
+		self.gui.panel('wta', (551,396,249,69), wta, self.destination_wta)
+
+	def destination_wpt(self, value):
+		'''Draws the waypoint distance and bearing.
+		
+		Keyword arguments:
+		value -- the distance text, its position, the bearing text, and its position
+		
+		'''
+		self.gui.txt_out(self.gui.text(self.gui.font_4, value[0], self.gui.colour_2),value[1],418)
+		self.gui.txt_out(self.gui.text(self.gui.font_4, value[2], self.gui.colour_2),value[3],378)
+
+	def destination_xte(self, value):
+		'''Draws the crosstrack error text.
+		
+		Keyword arguments:
+		value -- the text, and its horizontal position
+		
+		'''
+		self.gui.txt_out(self.gui.text(self.gui.font_4, value[0], self.gui.colour_2),value[1],30)
+
+	def destination_wta(self, value):
+		'''Draws the WTA text.
+		
+		Keyword arguments:
+		value -- the text, and its horizontal position
+		
+		'''
+		self.gui.txt_out(self.gui.text(self.gui.font_4, value[0], self.gui.colour_2),value[1],406)
+
+	def destination_rta(self, value):
+		'''Draws the RTA text.'''
+		self.gui.txt_out(self.gui.text(self.gui.font_2, value, self.gui.colour_2),600,325)
+
+	def xtaline(self, value):
+		'''Draws the crosstrack angle.
+		
+		Keyword arguments:
+		value -- the angle base position, and the two angle line ends
+		
+		'''
 		pygame.draw.polygon(self.gui.screen, self.gui.colour_2, [(675,240),(669,260),(681,260)],1)
-		pygame.draw.circle(self.gui.screen, self.gui.colour_2, (self.route.xte_angle[1][0],self.route.xte_angle[1][1]), 4)
+		pygame.draw.circle(self.gui.screen, self.gui.colour_2, (value[1][0],value[1][1]), 4)
 		#Standard measurement lines
-		pygame.draw.lines(self.gui.screen, self.gui.colour_2, False, [(self.route.xte_angle[0],240),(self.route.xte_angle[0],170)], 1)
-		pygame.draw.lines(self.gui.screen, self.gui.colour_2, False, [(675,170),(self.route.xte_angle[0],170)], 1)
-		pygame.draw.lines(self.gui.screen, self.gui.colour_2, False, [(675,240),(self.route.xte_angle[0],170)], 1)
+		pygame.draw.lines(self.gui.screen, self.gui.colour_2, False, [(value[0],240),(value[0],170)], 1)
+		pygame.draw.lines(self.gui.screen, self.gui.colour_2, False, [(675,170),(value[0],170)], 1)
+		pygame.draw.lines(self.gui.screen, self.gui.colour_2, False, [(675,240),(value[0],170)], 1)
 		#Angle lines
-		pygame.draw.lines(self.gui.screen, self.gui.colour_2, False, [(self.route.xte_angle[0],170),(self.route.xte_angle[1][0],self.route.xte_angle[1][1])], 3)
-		pygame.draw.lines(self.gui.screen, self.gui.colour_2, False, [(self.route.xte_angle[0],170),(self.route.xte_angle[3][0],self.route.xte_angle[3][1])], 3)
+		pygame.draw.lines(self.gui.screen, self.gui.colour_2, False, [(value[0],170),(value[1][0],value[1][1])], 3)
+		pygame.draw.lines(self.gui.screen, self.gui.colour_2, False, [(value[0],170),(value[2][0],value[2][1])], 3)
 
 
 class ROUTE():
 
-	def __init__(self, cache, alarm):
+	def __init__(self, scheduler, alarm):
 		self.gpx_route           = None
 		#Routing switch
 		self.mode                = False
-		#The location of route files
+		#The location of route files, and the route file to follow
 		self.location            = None
+		self.file                = None
 		#Lat, lon, name, distance, and bearing of current route waypoint
-		self.waypoint_info       = {'lat': 0, 'lon': 0, 'name': '', 'distance': 0, 'bearing': 0}
+		self.waypoint_info       = WAYPOINT(0, 0, '', 0, 0)
 		#Calculated distance and bearing to current waypoint
-		self.waypoint_calc       = {'distance': 0, 'bearing': 0}
+		self.waypoint_calc       = COURSE(0, 0)
 		#Hour and minutes to current waypoint
-		self.waypoint_eta        = {'hour': '', 'min': ''}
+		self.waypoint_eta        = ETA('', '')
 		#Current crosstrack error for waypoint
-		self.waypoint_xte        = [0,'']
+		self.waypoint_xte        = XTE(0, '')
 		#The total distance of current route
 		self.total_distance      = None
 		#The estimated date of arrival for total route
 		self.total_eta           = None
 		self.xte_alarm           = 10
-		self.xte_angle           = [0,[0,0],0,[0,0]]
-		self.cache               = cache
+		self.xte_angle           = ANGLE(0, (0,0), 0, (0,0))
+		#Number of seconds between each ETA and crosstrack update - 0 updates on every fix
+		self.eta_secs            = 4
+		self.xte_secs            = 0
+		#The scheduler jobs running while routing is enabled
+		self.jobs                = []
+		self.scheduler           = scheduler
 		self.alarm               = alarm
 		self.haversine           = geomath.haversine
 		self.calc_line           = geomath.calc_line
 
 	def switch(self):
-		'''Checks whether Route Mode is enabled, and starts a routing, arrival and crosstrack thread if so.'''
+		'''Checks whether Route Mode is enabled, and schedules the waypoint, crosstrack and arrival jobs if so.'''
 		if self.mode == False:
 			self.mode = True
 			self.gpx_route = GPX(self.location)
-			self.gpx_route.route_start('ride somewhere.gpx')
-			thread.start_new_thread(self.position, ())
-			thread.start_new_thread(self.arrival, ())
-			thread.start_new_thread(self.crosstrack, ())
+			self.gpx_route.route_start(self.file)
+			#Gets the next route position
+			self.get(0)
+			#Run in this order on any fix they are all due on
+			self.jobs = [self.scheduler.add('waypoint', self.position), self.scheduler.add('xte', self.crosstrack, self.xte_secs), self.scheduler.add('eta', self.arrival, self.eta_secs)]
 		else:
 			self.mode = False
+			for job in self.jobs:
+				self.scheduler.remove(job)
+			self.jobs = []
 
-	def position(self):
-		'''Used to keep track of current position in relation to current route - run as thread.'''
-		#Gets the next route position
-		self.get(0)
-		#Run while routing is enabled
-		while self.mode == True:
-			#Calculates distance between current position, and destination point
-			waypoint_info = self.haversine(self.cache.gps['lat'],self.cache.gps['lon'],self.waypoint_info['lat'],self.waypoint_info['lon'])
-			self.waypoint_calc = {'distance': waypoint_info[0], 'bearing': waypoint_info[1]}
-			#Calculates total route distance
-			self.total_distance = self.waypoint_calc['distance'] + self.gpx_route.route_distance
-			#Close to the destination - get the next point
-			if self.waypoint_calc['distance'] < 0.02:
-				self.get(0)
-			time.sleep(1)
-
-	def arrival(self):
-		'''Calculates the estimated arrival time based on current speed - run as thread.'''
-		#Loops until routing is turned off
-		while self.mode == True:
-			speed = round(self.cache.gps['speed'],2)
-			#Make sure we do not divide by zero
-			if speed > 0:
-				time_current = datetime.datetime.now()
-				#Determine time required for whole route
-				time_total = self.total_distance / speed
-				time_total_min, time_total_hour = math.modf(time_total)
-				time_total_min = round(time_total_min*60)
-				#Create a date/time object for ETA
-				time_total = time_current + datetime.timedelta(hours=time_total_hour, minutes=time_total_min)
-				self.total_eta = time_total.strftime("%Y-%m-%d %H:%M")
-				#Determine time required for next point in route
-				time_point = self.waypoint_calc['distance'] / speed
-				time_point_min, time_point_hour = math.modf(time_point)
-				time_point_min = round(time_point_min*60)
-				#If time is too large to display properly
-				if time_point_hour > 1000:
-					self.waypoint_eta['hour'] = '1000'
-				else:
-					#Add a 0 if minutes are less then 10
-					if time_point_min < 10:
-						time_point_min = '0' + str(time_point_min)
-					#Remove decimal points
-					self.waypoint_eta['hour'] = int(str(time_point_hour).replace('.0',''))
-					self.waypoint_eta['min'] = str(time_point_min).replace('.0','')
-				time.sleep(4)
-			#Do not estimate times if speed is 0
-			else:
-				self.total_eta = '           --'
-				self.waypoint_eta['hour'] = '--'
-				self.waypoint_eta['min'] = '--'
-
-	def crosstrack(self):
-		'''Calculates the crosstrack error for the current destination - run as thread.'''
-		#Loops until routing is turned off
-		while self.mode == True:
-			#Make sure this is not the first point in the route (no standard bearing)
-			if self.gpx_route.route_points[0][0] != self.waypoint_info['lat']:
-				#Gets haversine info of last route point
-				hav_start = self.haversine(self.gpx_route.route_points[self.gpx_route.route_position - 1][0], self.gpx_route.route_points[self.gpx_route.route_position - 1][1], self.cache.gps['lat'], self.cache.gps['lon'])
-				#Crosstrack calculation
-				self.waypoint_xte[0] = math.asin(math.sin(hav_start[0]/3443.92)*math.sin(hav_start[1]-self.gpx_route.route_points[self.gpx_route.route_position - 1][4]))*3443.92
-				#Negative is left of course - making positive again
-				if self.waypoint_xte[0] < 0:
-					self.waypoint_xte[0] = self.waypoint_xte[0]*(-1)
-					self.waypoint_xte[1] = 'L'
-				#Right of course
-				elif self.waypoint_xte[0] > 0:
-					self.waypoint_xte[1] ='R'
-				#Creates a crosstrack angle
-				self.angle()
-				#Checks for XTE alarm status
-				if self.waypoint_xte[0] >= self.xte_alarm:
-					self.alarm.xte = True
-				elif self.waypoint_xte[0] < self.xte_alarm:
-					self.alarm.xte = False
-			#No current standard bearing
+	def position(self, fix):
+		'''Keeps track of current position in relation to current route.
+		
+		Keyword arguments:
+		fix -- the latest gps fix
+		
+		'''
+		#Calculates distance between current position, and destination point
+		waypoint_info = self.waypoint_info
+		calc = COURSE(*self.haversine(fix.lat,fix.lon,waypoint_info.lat,waypoint_info.lon)[0:2])
+		self.waypoint_calc = calc
+		#Calculates total route distance
+		self.total_distance = calc.distance + self.gpx_route.route_distance
+		#Close to the destination - get the next point
+		if calc.distance < 0.02:
+			self.get(0)
+
+	def arrival(self, fix):
+		'''Calculates the estimated arrival time based on current speed.
+		
+		Keyword arguments:
+		fix -- the latest gps fix
+		
+		'''
+		speed = round(fix.speed,2)
+		#Make sure we do not divide by zero
+		if speed > 0:
+			time_current = datetime.datetime.now()
+			#Determine time required for whole route
+			time_total = self.total_distance / speed
+			time_total_min, time_total_hour = math.modf(time_total)
+			time_total_min = round(time_total_min*60)
+			#Create a date/time object for ETA
+			time_total = time_current + datetime.timedelta(hours=time_total_hour, minutes=time_total_min)
+			self.total_eta = time_total.strftime("%Y-%m-%d %H:%M")
+			#Determine time required for next point in route
+			time_point = self.waypoint_calc.distance / speed
+			time_point_min, time_point_hour = math.modf(time_point)
+			time_point_min = round(time_point_min*60)
+			#If time is too large to display properly
+			if time_point_hour > 1000:
+				self.waypoint_eta = ETA('1000', self.waypoint_eta.min)
 			else:
+				#Add a 0 if minutes are less then 10
+				if time_point_min < 10:
+					time_point_min = '0' + str(time_point_min)
+				#Remove decimal points
+				self.waypoint_eta = ETA(int(str(time_point_hour).replace('.0','')), str(time_point_min).replace('.0',''))
+		#Do not estimate times if speed is 0
+		else:
+			self.total_eta = '           --'
+			self.waypoint_eta = ETA('--', '--')
+
+	def crosstrack(self, fix):
+		'''Calculates the crosstrack error for the current destination.
+		
+		Keyword arguments:
+		fix -- the latest gps fix
+		
+		'''
+		#Make sure this is not the first point in the route (no standard bearing)
+		if self.gpx_route.route_position > 0:
+			#Crosstrack calculation against the precalculated leg
+			distance = self.gpx_route.route_xte(fix.lat, fix.lon)
+			side = self.waypoint_xte.side
+			#Negative is left of course - making positive again
+			if distance < 0:
+				distance = distance*(-1)
+				side = 'L'
+			#Right of course
+			elif distance > 0:
+				side ='R'
+			xte = XTE(distance, side)
+			#Creates a crosstrack angle, before the error it goes with is shown
+			self.angle(fix, xte)
+			self.waypoint_xte = xte
+			#Checks for XTE alarm status
+			if xte.distance >= self.xte_alarm:
+				self.alarm.xte = True
+			elif xte.distance < self.xte_alarm:
 				self.alarm.xte = False
-				self.waypoint_xte[0] = '    --'
-				self.waypoint_xte[1] =''
-			time.sleep(1)
+		#No current standard bearing
+		else:
+			self.alarm.xte = False
+			self.waypoint_xte = XTE('    --', '')
 
-	def angle(self):
-		'''Calculates the crosstrack angle numbers for the interface.'''
+	def angle(self, fix, xte):
+		'''Calculates the crosstrack angle numbers for the interface.
+		
+		Keyword arguments:
+		fix -- the latest gps fix
+		xte -- the crosstrack error for the fix
+		
+		'''
 		#Determines the positioning of the xte angle, based on xte distance
-		if self.waypoint_xte[0] < 5:
-			xte_lineadd = int(round(self.waypoint_xte[0]*10))
+		if xte.distance < 5:
+			xte_lineadd = int(round(xte.distance*10))
 		else:
 			xte_lineadd = 50
 		#Adds/subs the above to the base position
-		if self.waypoint_xte[1] == 'L':
-			self.xte_angle[0] = 675 + xte_lineadd
-		elif self.waypoint_xte[1] == 'R':
-			self.xte_angle[0] = 675 - xte_lineadd
+		position = self.xte_angle.position
+		if xte.side == 'L':
+			position = 675 + xte_lineadd
+		elif xte.side == 'R':
+			position = 675 - xte_lineadd
 		#Determines how far away, in degrees, the current track is from the waypoint track
-		self.xte_angle[2] = self.gpx_route.route_points[self.gpx_route.route_position - 1][4] - self.cache.gps['track']
-		self.xte_angle[2] = round((self.xte_angle[2] + 180) % 360 - 180)
+		degrees = self.gpx_route.route_points[self.gpx_route.route_position - 1][4] - fix.track
+		degrees = round((degrees + 180) % 360 - 180)
 		#Negative is left, positive is right
-		if self.xte_angle[2] < 0:
-			xte_calc = 360 + self.xte_angle[2]
-		elif self.xte_angle[2] > 0:
-			xte_calc = 0 + self.xte_angle[2]
+		if degrees < 0:
+			xte_calc = 360 + degrees
+		elif degrees > 0:
+			xte_calc = 0 + degrees
 		else:
 			xte_calc = 0
 		xte_calc_opposite = (xte_calc + 180) % 360
-		self.xte_angle[1] = self.calc_line(xte_calc,40,self.xte_angle[0],170)
-		self.xte_angle[3] = self.calc_line(xte_calc_opposite,40,self.xte_angle[0],170)
+		self.xte_angle = ANGLE(position, self.calc_line(xte_calc,40,position,170), degrees, self.calc_line(xte_calc_opposite,40,position,170))
 
 	def get(self,pos):
 		'''Grabs the next or last waypoint info.
@@ -348,87 +473,112 @@ class ROUTE():
 		
 		'''
 		data = self.gpx_route.route_get(pos)
-		self.waypoint_info = {'lat': data[0], 'lon': data[1], 'name': data[2], 'distance': data[3], 'bearing': data[4]}
+		self.waypoint_info = WAYPOINT(data[0], data[1], data[2], data[3], data[4])
 
 
 class TRACK():
 
-	def __init__(self, cache):
+	def __init__(self, scheduler):
 		#Tracking switch
 		self.mode                = False
 		#The location of track files
 		self.location            = None
-		#Holds track point info for future file output
-		self.route               = []
-		#Number of seconds between each track point. Number of points between each track file output
+		#Number of seconds between each track point. Number of points between each journal fsync
 		self.save_info           = [10,6]
-		#The max size of a track file
+		#The max size of a track file, and when to fsync it (never, flush or close)
 		self.maxsize             = None
-		self.gpx_track           = None
+		self.fsync               = 'close'
+		#Every point is appended to the journal as it is taken, and turned into gpx when tracking stops
+		self.journal             = None
+		self.name                = None
+		#The thread turning the last journal into track files, kept off the screen thread
+		self.export              = None
+		#Distance travelled, and the number of seconds between each point it is measured from
 		self.distance_total      = 0
 		self.distance_track      = True
-		self.cache               = cache
+		self.distance_secs       = 2
+		self.distance_point      = None
+		#The scheduler, and the jobs taking track points and adding up distance
+		self.scheduler           = scheduler
+		self.job                 = None
+		self.distance_job        = None
 
 	def switch(self):
-		'''Checks whether Track Mode is enabled, and starts a tracking thread if so.'''
+		'''Checks whether Track Mode is enabled, and schedules taking track points if so.'''
 		if self.mode == False:
 			self.mode = True
-			self.gpx_track = GPX(self.location)
-			self.gpx_track.track_start()
-			thread.start_new_thread(self.start, ())
+			self.name = str(datetime.datetime.now().strftime('%Y-%m-%d %H:%M')) + '.trk'
+			#Only flush fsyncs every few points - close leaves it to the end
+			if self.fsync == 'flush':
+				sync = self.save_info[1]
+			else:
+				sync = None
+			self.journal = journal.JOURNAL(self.location + self.name, sync)
+			self.job = self.scheduler.add('track', self.start, self.save_info[0])
 		else:
 			self.mode = False
 			self.off()
 
-	def start(self):
-		'''Used as a thread to save tracking info for future file output.'''
-		x = 0
-		#Loop that keeps track of time, and saves track info based on this time
-		while self.mode == True:
-			self.route.append([self.cache.gps['lat'], self.cache.gps['lon'], self.cache.gps['utc']])
-			x = x + 1
-			if x > self.save_info[1]:
-				self.make()
-				#If the file hits the maximum size, start a new one
-				if self.gpx_track.track_size > self.maxsize and self.track == True:
-					self.gpx_track.track_close()
-					self.gpx_track.track_size = 0
-					self.gpx_track.track_start()
-				self.route = []
-				x = 0
-			time.sleep(self.save_info[0])
+	def start(self, fix):
+		'''Saves a track point to the journal - scheduled once every track_secs.
+		
+		Keyword arguments:
+		fix -- the latest gps fix
+		
+		'''
+		journal_file = self.journal
+		if journal_file:
+			journal_file.append(fix.utc, fix.lat, fix.lon, fix.speed, fix.track)
 
 	def off(self):
-		'''Cleans up and closes the current track file open.'''
-		if self.gpx_track:
-			if self.route:
-				self.make()
-			#Cleans and closes track variables and files
-			self.gpx_track.track_close()
-			self.gpx_track = None
-			self.route = []
-
-	def make(self):
-		'''Outputs the track info to the current track file.'''
-		#Runs through each track point for output
-		for point in self.route:
-			self.gpx_track.track_point(point[0], point[1], 0, point[2])
-
-	def distance(self):
+		'''Closes the current journal, and outputs it to track files.'''
+		self.scheduler.remove(self.job)
+		self.job = None
+		if self.journal:
+			journal_file = self.journal
+			self.journal = None
+			journal_file.close(self.fsync != 'never')
+			#Not a daemon, so quitting waits for the track files to be finished
+			self.export = threading.Thread(None, self.make, None, (journal_file.path,))
+			self.export.start()
+
+	def make(self, path):
+		'''Outputs a track journal to track files, starting a new file whenever one is full.
+		
+		Keyword arguments:
+		path -- the location of the journal file
+		
+		'''
+		gpx_track = GPX(self.location)
+		gpx_track.track_maxsize = self.maxsize
+		gpx_track.track_fsync = self.fsync
+		gpx_track.track_start()
 		x = 0
-		while self.distance_track == True:
-			if x != 0:
-				current_distance = geomath.haversine(self.cache.gps['lat'], self.cache.gps['lon'], last_point[0], last_point[1])
-				print current_distance[0]
-				self.distance_total = self.distance_total + current_distance[0]
-				print self.distance_total
-			last_point = [self.cache.gps['lat'], self.cache.gps['lon']]
-			print last_point
+		for point in journal.read(path):
+			gpx_track.track_point(point[1], point[2], 0, journal.isotime(point[0]))
 			x = x + 1
-			time.sleep(2)
+			#Keeps the readied points to a modest size for long journals
+			if x % 1000 == 0:
+				gpx_track.track_flush()
+		gpx_track.track_close()
+
+	def distance(self, fix):
+		'''Adds up the distance travelled between fixes - scheduled once every distance_secs.
+		
+		Keyword arguments:
+		fix -- the latest gps fix
+		
+		'''
+		if self.distance_point:
+			current_distance = geomath.haversine(fix.lat, fix.lon, self.distance_point[0], self.distance_point[1])
+			self.distance_total = self.distance_total + current_distance[0]
+		self.distance_point = [fix.lat, fix.lon]
 
 	def distance_start(self):
-		thread.start_new_thread(self.distance, ())
+		'''Starts adding up the distance travelled.'''
+		if self.distance_track == True and self.distance_job is None:
+			self.distance_point = None
+			self.distance_job = self.scheduler.add('distance', self.distance, self.distance_secs)
 
 class ALARM():
 
@@ -457,20 +607,44 @@ class GPX():
 		self.route_position = -1
 		self.route_points = []
 		self.route_distance = 0
-		self.route_five = []
+		#Distance from each route point to the end of the route
+		self.route_remaining = []
+		#Great circle unit normal of each route leg, for crosstrack error
+		self.route_normals = []
+		#Waypoints and track points read from GPX files
+		self.waypoints = []
+		self.track_points = []
+		#Seconds taken, and number of points found, by the last GPX file read
+		self.load_time = 0
+		self.load_count = 0
 		self.track_size = 0
+		#Rendered track points waiting for the next flush, and points in the current file
+		self.track_buffer = []
+		self.track_count = 0
+		#The size in bytes a track file may not pass, and when to fsync it (never, flush or close)
+		self.track_maxsize = None
+		self.track_fsync = 'close'
 		self.unit_measure = None
 		self.haversine = geomath.haversine
+		self.haversine_legs = geomath.haversine_legs
 
 	def track_start(self):
 		'''Creates a new track file for future use.'''
-		self.gpx_file = str(datetime.datetime.now().strftime('%Y-%m-%d %H:%M')) + '.gpx'
-		out = '<?xml version="1.0" encoding="UTF-8" standalone="no" ?>\n<gpx>\n\t<trk>\n\t\t<name>NAVSTAT TRACK</name>\n\t\t<trkseg>\n'
-		self.gpx_doc = open(self.gpx_location + self.gpx_file, 'a')
-		self.track_out(out)
+		name = str(datetime.datetime.now().strftime('%Y-%m-%d %H:%M'))
+		self.gpx_file = name + '.gpx'
+		#A file rotated within the same minute gets a numbered name
+		x = 1
+		while os.path.exists(self.gpx_location + self.gpx_file):
+			x = x + 1
+			self.gpx_file = name + ' (' + str(x) + ').gpx'
+		#Unbuffered, so each flush of points is a single write
+		self.gpx_doc = open(self.gpx_location + self.gpx_file, 'wb', 0)
+		self.track_size = 0
+		self.track_count = 0
+		self.track_out(journal.TRACK_HEADER)
 
 	def track_point(self,lat,lon,ele,tme):
-		'''Readies a track point to be outputted to the track file.
+		'''Readies a track point to be outputted to the track file on the next flush.
 		
 		Keyword arguments:
 		lat -- the latitude to output
@@ -479,8 +653,29 @@ class GPX():
 		tme -- the time to output
 		
 		'''
-		out = '\t\t\t<trkpt lat="' + str(lat) + '" lon="' + str(lon) + '">\n' + '\t\t\t\t<ele>' + str(ele) + '</ele>\n' + '\t\t\t\t<time>' + str(tme) + '</time>\n\t\t\t</trkpt>\n'
-		self.track_out(out)
+		self.track_buffer.append(journal.TRACK_POINT % (lat, lon, ele, tme))
+
+	def track_flush(self):
+		'''Outputs every readied track point in one write, starting a new file before one would pass track_maxsize.'''
+		points = self.track_buffer
+		self.track_buffer = []
+		out = []
+		size = self.track_size
+		for point in points:
+			#The point and the closing tags would pass the maximum size - a file always holds at least one point
+			if self.track_maxsize and self.track_count and size + len(point) + len(journal.TRACK_FOOTER) > self.track_maxsize:
+				self.track_out(''.join(out))
+				self.track_close()
+				self.track_start()
+				out = []
+				size = self.track_size
+			out.append(point)
+			size = size + len(point)
+			self.track_count = self.track_count + 1
+		if out:
+			self.track_out(''.join(out))
+		if self.track_fsync == 'flush':
+			os.fsync(self.gpx_doc.fileno())
 
 	def track_out(self, out):
 		'''Outputs track text to the track gpx file.
@@ -490,14 +685,67 @@ class GPX():
 		
 		'''
 		self.gpx_doc.write(out)
-		self.track_size = self.track_size + sys.getsizeof(out)
+		self.track_size = self.track_size + len(out)
 
 	def track_close(self):
-		'''Closes the current track gpx file.'''
-		out = '\t\t</trkseg>\n\t</trk>\n</gpx>'
-		self.track_out(out)
+		'''Outputs any readied points, then closes the current track gpx file.'''
+		self.track_flush()
+		self.track_out(journal.TRACK_FOOTER)
+		if self.track_fsync != 'never':
+			os.fsync(self.gpx_doc.fileno())
 		self.gpx_doc.close()
 
+	def points(self,gpx_file,tags):
+		'''Streams the points of a GPX file as [lat, lon, name, time] lists, clearing parsed elements as it goes.
+		
+		Keyword arguments:
+		gpx_file -- the GPX file to open
+		tags -- the point tags to return, without namespace (rtept, wpt, trkpt)
+		
+		'''
+		start = time.time()
+		self.gpx_file = gpx_file
+		self.load_count = 0
+		gpx_doc = open(self.gpx_location + gpx_file, 'rb')
+		#Elements from the root down to the one being parsed
+		parents = []
+		#Number of wanted points currently open
+		open_points = 0
+		try:
+			for event, elem in ElementTree.iterparse(gpx_doc, ('start', 'end')):
+				#Ignores any namespace, such as the GPX 1.1 or OpenCPN ones
+				tag = elem.tag.rsplit('}', 1)[-1]
+				if event == 'start':
+					parents.append(elem)
+					if tag in tags:
+						open_points = open_points + 1
+					continue
+				parents.pop()
+				if tag in tags:
+					open_points = open_points - 1
+					point = [float(elem.get('lat')), float(elem.get('lon')), '', '']
+					for child in elem:
+						child_tag = child.tag.rsplit('}', 1)[-1]
+						if child_tag == 'name':
+							point[2] = (child.text or '').strip()
+						elif child_tag == 'time':
+							point[3] = (child.text or '').strip()
+					self.load_count = self.load_count + 1
+					yield point
+				#Finished elements are dropped, unless a point still needs them
+				if open_points == 0:
+					elem.clear()
+					#Later siblings may already be attached, so the element is not always the last child
+					if parents:
+						parents[-1].remove(elem)
+		finally:
+			gpx_doc.close()
+			self.load_time = time.time() - start
+
+	def report(self):
+		'''Returns a line with the file last read, the points found in it and the time it took.'''
+		return '%-12s %8d points %8.1f ms read - %s' % ('gpx load', self.load_count, self.load_time * 1000, self.gpx_file)
+
 	def route_start(self,gpx_file):
 		'''Reads the entire GPX route file, and creates a list from it.
 		
@@ -505,39 +753,46 @@ class GPX():
 		gpx_file -- the GPX route file to open
 		
 		'''
-		lat_lon = [0,0,'',0,0]
-		#Open the gpx route file
-		self.gpx_doc = open(self.gpx_location + gpx_file, 'r')
-		self.gpx_file = gpx_file
-		#Create a local version of functions
-		route_append = self.route_points.append
-		haversine = self.haversine
-		con = 0
-		#Run through each line of the route file
-		for line in self.gpx_doc:
-			line = line.lstrip()
-			#Extract route point lat/long
-			if line[1:6] == 'rtept':
-				line = line.split('"')
-				lat_lon[0] = float(line[1])
-				lat_lon[1] = float(line[3])
-				con = 1
-			#Extract route point name
-			elif line[1:5] == 'name' and con == 1:
-				line = line.split('name>')
-				lat_lon[2] = line[1][:-2]
-				#As long as its not the first point
-				if self.route_points:
-					#Calculate the distance from the last point, to this point
-					haversine_info = haversine(self.route_points[-1][0],self.route_points[-1][1],lat_lon[0],lat_lon[1])
-					#Place distance in last point info
-					self.route_points[-1][3] = haversine_info[0]
-					self.route_points[-1][4] = haversine_info[1]
-					#Add to the total distance
-					self.route_distance = haversine_info[0] + self.route_distance
-				route_append([lat_lon[0],lat_lon[1],lat_lon[2],0,0])
-				con = 0
-		self.gpx_doc.close()
+		self.route_points = [[point[0],point[1],point[2],0,0] for point in self.points(gpx_file, ('rtept',))]
+		#Calculates the distance and bearing of every leg in one call
+		distances, bearings = self.haversine_legs([point[0] for point in self.route_points], [point[1] for point in self.route_points])
+		for x in range(len(distances)):
+			#Place distance in the leg's first point info
+			self.route_points[x][3] = float(distances[x])
+			self.route_points[x][4] = float(bearings[x])
+		self.route_build()
+
+	def waypoint_start(self,gpx_file):
+		'''Reads the waypoints of a GPX file as [lat, lon, name] lists.
+		
+		Keyword arguments:
+		gpx_file -- the GPX file to open
+		
+		'''
+		self.waypoints = [point[0:3] for point in self.points(gpx_file, ('wpt',))]
+
+	def track_read(self,gpx_file):
+		'''Reads the track points of a GPX file as [lat, lon, time] lists.
+		
+		Keyword arguments:
+		gpx_file -- the GPX track file to open
+		
+		'''
+		self.track_points = [[point[0],point[1],point[3]] for point in self.points(gpx_file, ('trkpt',))]
+
+	def route_build(self):
+		'''Precalculates the remaining distance from each route point, and the geometry of each leg.'''
+		#Sums the leg distances from the end of the route backwards
+		self.route_remaining = [0] * len(self.route_points)
+		for x in range(len(self.route_points) - 2, -1, -1):
+			self.route_remaining[x] = self.route_remaining[x + 1] + self.route_points[x][3]
+		#The total distance
+		self.route_distance = self.route_remaining[0] if self.route_remaining else 0
+		#The normal of the great circle through each leg
+		self.route_normals = []
+		vectors = [geomath.unit_vector(point[0], point[1]) for point in self.route_points]
+		for x in range(len(vectors) - 1):
+			self.route_normals.append(geomath.unit_normal(vectors[x], vectors[x + 1]))
 
 	def route_get(self, mode):
 		'''Returns the next or last point in the route list.
@@ -561,13 +816,22 @@ class GPX():
 		return self.route_points[self.route_position]
 
 	def route_calc(self,mode):
-		'''Calculates the distance between the next route position, and all points after.'''
-		#Removes the current route point from calculation
-		x = self.route_position + 1
-		self.route_distance = 0
-		#The total number of remaining route points (-1 because of 0 list start)
-		length = len(self.route_points) - 1
-		#Adds the distance info
-		while x < length:
-			self.route_distance = self.route_distance + self.route_points[x][3]
-			x += 1
\ No newline at end of file
+		'''Looks up the distance from the current route position to the end of the route.'''
+		self.route_distance = self.route_remaining[self.route_position]
+
+	def route_xte(self,lat,lon):
+		'''Returns the crosstrack error from the leg ending at the current route position, negative to the left of course.
+		
+		Keyword arguments:
+		lat -- the current latitude
+		lon -- the current longitude
+		
+		'''
+		normal = self.route_normals[self.route_position - 1]
+		#A leg between two identical points has no course to be off
+		if normal is None:
+			return 0
+		position = geomath.unit_vector(lat, lon)
+		#The normal points to the left of the direction of travel
+		dot = normal[0]*position[0] + normal[1]*position[1] + normal[2]*position[2]
+		return -math.asin(max(-1.0, min(1.0, dot))) * geomath.RADIUS
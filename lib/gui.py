@@ -1,6 +1,7 @@
 import pygame
 import time
 import datetime
+import collections
 
 class GUI():
 
@@ -11,10 +12,10 @@ class GUI():
 		self.version             = None
 		#Pixel size of the interface
 		self.size                = [0,0]
-		#Frame rate of the program
-		self.frame_rate          = 29
 		self.screen              = None
 		self.clock               = pygame.time.Clock()
+		#Paces frames between the maximum and minimum frame rate
+		self.frames              = FRAMES(self.clock)
 		#Switches for night and mini mode
 		self.night               = False
 		self.mini                = False
@@ -31,6 +32,17 @@ class GUI():
 		self.font_2              = pygame.font.Font(None, 30)
 		self.font_3              = pygame.font.Font(None, 25)
 		self.font_4              = pygame.font.Font(None, 50)
+		#Rendered text surfaces keyed by font, text and colour, least recently used first
+		self.text_cache          = collections.OrderedDict()
+		self.text_cache_size     = 256
+		#Rendered static graphics for each screen, keyed by screen, colour scheme and size
+		self.layers              = {}
+		self.layer_key           = None
+		self.layer_current       = None
+		#Value last drawn in each panel, the parts of the screen redrawn this frame, and whether all of it was
+		self.panels              = {}
+		self.dirty               = []
+		self.full                = True
 		pygame.display.set_caption("NAVSTAT")
 
 	def night_mode(self):
@@ -65,29 +77,124 @@ class GUI():
 		pygame.display.update()
 		time.sleep(2)
 
-	def menu(self):
-		'''Draws the menu interface common between all functions.'''
-		#Clears with background color
-		self.screen.fill(self.colour_1)
+	def menu(self, background=None):
+		'''Draws the menu interface common between all functions.
+		
+		Keyword arguments:
+		background -- a function drawing the static graphics of the current screen, if it has any
+		
+		'''
+		#Clears with the menu and static screen graphics, rendered once for each colour scheme
+		self.layer(background)
 		#Display current time
-		self.txt_out((self.font_2.render(datetime.datetime.now().strftime('%Y-%m-%d %H:%M'), True, self.colour_2)),323,472)
+		self.panel('clock', (251,467,299,33), datetime.datetime.now().strftime('%Y-%m-%d %H:%M'), self.clock_out)
+
+	def clock_out(self, clock):
+		'''Draws the current time.'''
+		self.txt_out(self.text(self.font_2, clock, self.colour_2),323,472)
+
+	def menu_background(self):
+		'''Draws the static graphics of the menu interface.'''
+		self.screen.fill(self.colour_1)
 		pygame.draw.rect(self.screen, self.colour_2, (0,500,800,30))
 		pygame.draw.lines(self.screen, self.colour_2, False, [(0,465),(800,465)], 2)
 		#Draw the various screen display options
-		self.txt_out(self.font_3.render('GPS', True, self.colour_1),100,510)
-		self.txt_out(self.font_3.render('MAP', True, self.colour_1),200,510)
-		self.txt_out(self.font_3.render('AIS', True, self.colour_1),300,510)
-		self.txt_out(self.font_3.render('ENG', True, self.colour_1),400,510)
-		self.txt_out(self.font_3.render('OFF', True, self.colour_1),500,510)
+		self.txt_out(self.text(self.font_3, 'GPS', self.colour_1),100,510)
+		self.txt_out(self.text(self.font_3, 'MAP', self.colour_1),200,510)
+		self.txt_out(self.text(self.font_3, 'AIS', self.colour_1),300,510)
+		self.txt_out(self.text(self.font_3, 'ENG', self.colour_1),400,510)
+		self.txt_out(self.text(self.font_3, 'OFF', self.colour_1),500,510)
 		pygame.draw.rect(self.screen, self.colour_1, (68,500,100,10))
 		#Monitors GPS status and displays problems
-		#if self.cache.gps['status'] == 'A':
+		#if self.cache.gps.status == 'A':
 			#pygame.draw.circle(self.ui_screen, self.colour_1, (30,515), 10)
 		#else:
 			#pygame.draw.circle(self.ui_screen, self.colour_1, (30,515), 10,1)
 		#if self.alarm.status == True:
 			#self.txt_out(self.font_3.render('!!!!', True, self.colour_1),770,510)
 
+	def layer(self, background=None):
+		'''Draws the static graphics of a screen when it changes, rendering them only the first time for each colour scheme and size.
+		
+		Keyword arguments:
+		background -- a function drawing the static graphics of the screen, on top of the menu
+		
+		'''
+		size = self.screen.get_size()
+		key = (background, self.colour_1, self.colour_2, size)
+		layer = self.layers.get(key)
+		if layer is None:
+			layer = pygame.Surface(size).convert()
+			#Points the drawing functions at the layer while it is rendered
+			screen = self.screen
+			self.screen = layer
+			try:
+				self.menu_background()
+				if background:
+					background()
+			finally:
+				self.screen = screen
+			self.layers[key] = layer
+		#A different screen, colour scheme or size redraws everything
+		if key != self.layer_key:
+			self.layer_key = key
+			self.layer_current = layer
+			self.invalidate()
+		if self.full:
+			self.screen.blit(layer, (0,0))
+
+	def panel(self, name, rect, value, draw):
+		'''Redraws a part of the screen, only when the value it shows has changed.
+		
+		Keyword arguments:
+		name -- the name of the panel
+		rect -- the part of the screen the panel covers
+		value -- everything the panel shows, or None for nothing
+		draw -- the function called with the value to draw it
+		
+		'''
+		if self.full or self.panels.get(name) != value:
+			self.panels[name] = value
+			#Clears back to the static graphics under the panel
+			if not self.full:
+				self.screen.blit(self.layer_current, rect, rect)
+				self.dirty.append(rect)
+			if value is not None:
+				draw(value)
+
+	def invalidate(self):
+		'''Redraws the whole screen on the next frame.'''
+		self.full = True
+		self.panels = {}
+
+	def update(self):
+		'''Shows every part of the screen redrawn this frame.'''
+		if self.full:
+			pygame.display.update()
+		elif self.dirty:
+			pygame.display.update(self.dirty)
+		self.full = False
+		self.dirty = []
+
+	def text(self, font, text, colour):
+		'''Returns rendered text, reusing the surface if it was rendered recently.
+		
+		Keyword arguments:
+		font -- the font to render with
+		text -- the text to render
+		colour -- the colour to render in
+		
+		'''
+		key = (font, text, colour)
+		surface = self.text_cache.pop(key, None)
+		if surface is None:
+			surface = font.render(text, True, colour)
+			#Drops the least recently used text
+			if len(self.text_cache) >= self.text_cache_size:
+				self.text_cache.popitem(False)
+		self.text_cache[key] = surface
+		return surface
+
 	def txt_out(self,text, x, y):
 		'''Gets pygame text ready to be outputted on screen.
 		
@@ -97,4 +204,86 @@ class GUI():
 		y -- the vertical position of the text
 		
 		'''
-		self.screen.blit(text, [x,y])
\ No newline at end of file
+		self.screen.blit(text, [x,y])
+
+
+#Posted when a new gps fix arrives, and on a timer at the minimum frame rate
+FIX_EVENT = pygame.USEREVENT
+TIMER_EVENT = pygame.USEREVENT + 1
+
+class FRAMES():
+
+	def __init__(self, clock, max_rate=29, min_rate=1):
+		'''Readies a frame scheduler that sleeps until there is something new to draw.
+		
+		Keyword arguments:
+		clock -- the pygame clock used to cap the frame rate
+		max_rate -- the most frames drawn each second
+		min_rate -- the fewest frames drawn each second, with nothing new to draw
+		
+		'''
+		self.clock = clock
+		self.max_rate = max_rate
+		self.min_rate = min_rate
+		#Whether a fix event is already waiting to be handled
+		self.pending = False
+		#Averages of seconds between frames, spent drawing, and spent waiting
+		self.frame_time = 0.0
+		self.render_time = 0.0
+		self.idle_time = 0.0
+		self.count = 0
+		self.last = None
+		self.woke = None
+		#Seconds held back by the maximum frame rate after the last frame
+		self.held = 0.0
+
+	def start(self):
+		'''Starts the timer that keeps the minimum frame rate.'''
+		if self.min_rate:
+			pygame.time.set_timer(TIMER_EVENT, int(1000 / self.min_rate))
+
+	def fix(self, fix=None):
+		'''Wakes the frame loop for a new gps fix - safe to call from any thread.
+		
+		Keyword arguments:
+		fix -- the new fix, unused
+		
+		'''
+		#Fixes arriving faster than frames are drawn are handled as one
+		if not self.pending:
+			self.pending = True
+			try:
+				pygame.event.post(pygame.event.Event(FIX_EVENT))
+			except pygame.error:
+				self.pending = False
+
+	def wait(self):
+		'''Sleeps until a fix, input or the minimum frame rate timer arrives, and returns every waiting event.'''
+		start = time.time()
+		events = [pygame.event.wait()]
+		#Cleared before the queue is emptied, so a fix arriving after it always posts another event
+		self.pending = False
+		events.extend(pygame.event.get())
+		self.woke = time.time()
+		self.average('idle_time', self.woke - start + self.held)
+		if self.last is not None:
+			self.average('frame_time', self.woke - self.last)
+		self.last = self.woke
+		return events
+
+	def done(self):
+		'''Records the time spent drawing the frame, and holds to the maximum frame rate.'''
+		if self.woke is not None:
+			self.average('render_time', time.time() - self.woke)
+		self.count = self.count + 1
+		start = time.time()
+		self.clock.tick(self.max_rate)
+		self.held = time.time() - start
+
+	def average(self, name, value):
+		'''Moves a running average towards a new measurement.'''
+		setattr(self, name, getattr(self, name) * 0.9 + value * 0.1)
+
+	def report(self):
+		'''Returns the measured frame, render and idle times.'''
+		return '%d frames, %.1f ms frame, %.1f ms render, %.1f ms idle' % (self.count, self.frame_time * 1000, self.render_time * 1000, self.idle_time * 1000)
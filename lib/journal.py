@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+#-*- coding: utf-8 -*-
+'''Append-only track journal, and its GPX and GeoJSON output.
+
+A journal can be turned into a track file from the command line:
+python journal.py <journal.trk> [gpx|geojson] [output]
+
+'''
+
+import os
+import sys
+import time
+import struct
+import calendar
+import threading
+from conversion import isotime
+
+#Marks the start of a journal file
+MAGIC = 'NAVTRK1\n'
+#Time in epoch seconds, lat, lon, speed and track of a single point
+RECORD = struct.Struct('<dddff')
+
+#Text around and for each track point in a track gpx file
+TRACK_HEADER = '<?xml version="1.0" encoding="UTF-8" standalone="no" ?>\n<gpx>\n\t<trk>\n\t\t<name>NAVSTAT TRACK</name>\n\t\t<trkseg>\n'
+TRACK_POINT = '\t\t\t<trkpt lat="%s" lon="%s">\n\t\t\t\t<ele>%s</ele>\n\t\t\t\t<time>%s</time>\n\t\t\t</trkpt>\n'
+TRACK_FOOTER = '\t\t</trkseg>\n\t</trk>\n</gpx>'
+
+
+class JOURNAL():
+
+	def __init__(self, path, sync=None):
+		'''Opens a track journal for appending, creating it if needed and dropping any point cut short at its end.
+		
+		Keyword arguments:
+		path -- the location of the journal file
+		sync -- the number of points between each fsync, or None to only fsync on close
+		
+		'''
+		self.path = path
+		self.sync = sync
+		self.count = 0
+		#Points are taken on the tracking thread, while closing happens on the main thread
+		self.lock = threading.Lock()
+		#O_APPEND makes each point a single write at the end of the file
+		self.fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0644)
+		size = os.fstat(self.fd).st_size
+		if size < len(MAGIC):
+			os.ftruncate(self.fd, 0)
+			os.write(self.fd, MAGIC)
+		elif (size - len(MAGIC)) % RECORD.size:
+			#A point cut short when the journal was last open - later points would be misaligned after it
+			os.ftruncate(self.fd, size - (size - len(MAGIC)) % RECORD.size)
+
+	def append(self, utc, lat, lon, speed, track):
+		'''Writes a single point to the end of the journal.
+		
+		Keyword arguments:
+		utc -- the time of the point, in epoch seconds or as YYYY-MM-DDTHH:MM:SSZ
+		lat -- the latitude of the point
+		lon -- the longitude of the point
+		speed -- the speed over ground at the point
+		track -- the track over ground at the point
+		
+		'''
+		record = RECORD.pack(epoch(utc), lat, lon, speed, track)
+		with self.lock:
+			if self.fd is None:
+				return
+			os.write(self.fd, record)
+			self.count = self.count + 1
+			if self.sync and self.count % self.sync == 0:
+				os.fsync(self.fd)
+
+	def close(self, sync=True):
+		'''Closes the journal.
+		
+		Keyword arguments:
+		sync -- whether to fsync the journal before closing
+		
+		'''
+		with self.lock:
+			if self.fd is not None:
+				if sync:
+					os.fsync(self.fd)
+				os.close(self.fd)
+				self.fd = None
+
+def epoch(utc):
+	'''Returns a time in epoch seconds, or the current time if it can not be read.'''
+	if isinstance(utc, (int, long, float)) and utc:
+		return utc
+	try:
+		return calendar.timegm(time.strptime(utc, '%Y-%m-%dT%H:%M:%SZ'))
+	except (TypeError, ValueError):
+		return time.time()
+
+def read(path, chunk=4096):
+	'''Yields each point in a journal as (time, lat, lon, speed, track).
+	
+	A point cut short by a crash or power cut is ignored.
+	
+	Keyword arguments:
+	path -- the location of the journal file
+	chunk -- the number of points read at once
+	
+	'''
+	journal = open(path, 'rb')
+	try:
+		if journal.read(len(MAGIC)) != MAGIC:
+			raise ValueError('%s is not a track journal' % path)
+		while True:
+			data = journal.read(RECORD.size * chunk)
+			for x in xrange(0, len(data) - RECORD.size + 1, RECORD.size):
+				yield RECORD.unpack_from(data, x)
+			if len(data) < RECORD.size * chunk:
+				break
+	finally:
+		journal.close()
+
+def gpx(path, out):
+	'''Writes a journal out as a single track gpx file.
+	
+	Keyword arguments:
+	path -- the location of the journal file
+	out -- the file to write to
+	
+	'''
+	out.write(TRACK_HEADER)
+	for point in read(path):
+		out.write(TRACK_POINT % (point[1], point[2], 0, isotime(point[0])))
+	out.write(TRACK_FOOTER)
+
+def geojson(path, out):
+	'''Writes a journal out as a GeoJSON LineString, with the time, speed and track of each point.
+	
+	Keyword arguments:
+	path -- the location of the journal file
+	out -- the file to write to
+	
+	'''
+	#Each list is streamed from its own pass over the journal
+	out.write('{"type": "Feature", "geometry": {"type": "LineString", "coordinates": [')
+	stream(out, ('[%r, %r]' % (point[2], point[1]) for point in read(path)))
+	out.write(']}, "properties": {"name": "NAVSTAT TRACK", "coordTimes": [')
+	stream(out, ('"%s"' % isotime(point[0]) for point in read(path)))
+	out.write('], "speeds": [')
+	stream(out, ('%s' % round(point[3], 2) for point in read(path)))
+	out.write('], "tracks": [')
+	stream(out, ('%s' % round(point[4], 2) for point in read(path)))
+	out.write(']}}\n')
+
+def stream(out, items):
+	'''Writes comma separated items, without holding them all at once.'''
+	first = True
+	for item in items:
+		if not first:
+			out.write(', ')
+		out.write(item)
+		first = False
+
+if __name__ == '__main__':
+	if len(sys.argv) < 2:
+		print __doc__
+		sys.exit(1)
+	form = sys.argv[2] if len(sys.argv) > 2 else 'gpx'
+	if len(sys.argv) > 3:
+		output = open(sys.argv[3], 'wb')
+	else:
+		output = sys.stdout
+	if form == 'geojson':
+		geojson(sys.argv[1], output)
+	else:
+		gpx(sys.argv[1], output)
+	output.close()
@@ -1,24 +1,29 @@
 #!/usr/bin/env python
 #-*- coding: utf-8 -*-
 
-import re
+import time
 import serial
-import binascii
 import ais
+import fleet
+import checksum
+import bus
+import sentences
 from threading import Thread
 
 
 class NMEA0183():
 
 
-	def __init__(self, location, baud_rate, timeout):
+	def __init__(self, location, baud_rate, timeout, fix_bus=None, vessels=None, stage=None):
 		'''Initiates variables and opens serial connection.
 		
 		Keyword arguments:
 		location -- the location of the serial connection
 		baud_rate -- the baud rate of the connection
 		timeout -- the timeout of the connection
-		type -- the type of connection.'GPS'
+		fix_bus -- the BUS every new gps fix is published to
+		vessels -- the FLEET AIS targets are added to, kept across connections
+		stage -- the DECODER whole AIS payloads are handed to, or None to decode them on this thread
 		
 		'''
 		self.exit = False
@@ -28,13 +33,29 @@ class NMEA0183():
 		self.serial_dev = None
 		self.serial_data = None
 		self.ais_data = None
+		self.bus = fix_bus
+		#Records every raw sentence read from the serial connection with the time it was read, if set
+		self.recorder = None
+		#Sentences with a correct checksum that could not be decoded
+		self.errors = 0
+		#Joins multi-sentence AIS messages
+		self.ais_reassembler = ais.REASSEMBLER(fast=True)
+		#Every AIS target heard, keyed by MMSI
+		if vessels is None:
+			vessels = fleet.FLEET()
+		self.fleet = vessels
+		self.stage = stage
 
-		#Ready the GPS variables
-		self.data_gps = {'lat': float(0.0), 'lon': float(0.0), 'speed': float(0.0), 'track': float(0.0), 'utc': '0.0', 'status': 'A'}
+		#The last fix decoded
+		self.fix = bus.FIX(0.0, 0.0, 0.0, 0.0, 0, 'A')
+		#The latest sentence of each registered type, its fields converted only when read
+		self.latest = {}
+		#Called with each sentence of a type as it arrives
+		self.handlers = {'RMC': self.gps}
 
 	def read(self):
 		'''Creates a thread to read serial connection data.'''
-		self.serial_dev = serial.Serial(self.location, self.baud_rate, self.timeout)
+		self.serial_dev = serial.Serial(self.location, self.baud_rate, timeout=self.timeout)
 		serial_thread = Thread(None,self.read_thread,None,())
 		serial_thread.start()
 
@@ -43,33 +64,77 @@ class NMEA0183():
 
 	def read_thread(self):
 		'''The thread used to read incoming serial data.'''
-		dat_new = ''
-		dat_old = ''
+		framer = FRAMER()
 		#Loops until the connection is broken, or is instructed to quit
 		try:
 			while self.is_open():
 				#Instructed to quit
 				if self.exit: 
 					break
-				if dat_new: 
-					dat_old = dat_new
-					dat_new = ''
-				dat_old = dat_old + self.buffer()
-				if re.search("\r\n", dat_old):
-					try:
-						self.serial_data, dat_new = dat_old.split("\r\n")
-					except:
-						pass
-					if self.checksum(self.serial_data):
-						#Incoming serial data is GPS related
-						if self.serial_data[0:3] == '$GP':
-							self.gps()
-						#Incoming serial data is AIS related
-						elif self.serial_data[0:3] == '!AI':
-							self.ais_data = telegramparser(self.serial_data)
-					dat_old = ''
+				#Handles every complete sentence held in this read
+				data = framer.feed(self.buffer())
+				#Recorded with the time of the read, ahead of decoding
+				if self.recorder:
+					now = time.time()
+					for sentence in data:
+						self.recorder.write(sentence, now)
+				for self.serial_data in data:
+					self.decode()
 		except:
 			self.quit()
+		#Frees the device for the next connection
+		try:
+			self.serial_dev.close()
+		except:
+			pass
+
+	def read_mux(self, mux):
+		'''Creates a thread to decode the sentences of several sources.
+		
+		Keyword arguments:
+		mux -- the MUX the sources are read into
+		
+		'''
+		mux_thread = Thread(None,self.mux_thread,None,(mux,))
+		mux_thread.daemon = True
+		mux_thread.start()
+
+	def mux_thread(self, mux):
+		'''The thread used to decode sentences taken from a MUX.'''
+		try:
+			while not self.exit:
+				item = mux.get()
+				#The sources were stopped
+				if item is None:
+					break
+				self.serial_data = item[1]
+				self.decode()
+				mux.done(item)
+		finally:
+			#Lets the connection manager start another decoder on the same MUX
+			self.quit()
+
+	def decode(self):
+		'''Decodes the current sentence, counting one that can not be decoded rather than stopping on it.'''
+		try:
+			self.sentence()
+		except Exception:
+			self.errors = self.errors + 1
+
+	def sentence(self):
+		'''Decodes the current sentence, if its checksum is correct.'''
+		if self.checksum(self.serial_data):
+			#Incoming serial data is AIS related
+			if self.serial_data[0:3] == '!AI':
+				self.ais()
+			#Incoming serial data is any other NMEA sentence, from any talker
+			else:
+				data = sentences.decode(self.serial_data)
+				if data is not None:
+					self.latest[data.kind] = data
+					handler = self.handlers.get(data.kind)
+					if handler:
+						handler(data)
 
 	def is_open(self):
 		'''Checks whether the serial connection is still open.'''
@@ -89,79 +154,123 @@ class NMEA0183():
 		data -- the NMEA sentence to create
 		
 		'''
-		csum = 0
-		i = 0
-		# Remove ! or $ and *xx in the sentence
-		data = data[1:data.rfind('*')]
-		while (i < len(data)):
-			input = binascii.b2a_hex(data[i])
-			input = int(input,16)
-			#xor
-			csum = csum ^ input
-			i += 1
-		return csum
+		return checksum.makechecksum(data)
 
 	def checksum(self,data):
-		'''Initiates variables and opens serial connection.
+		'''Compares the checksum of a NMEA sentence with the one it supplies.
 		
 		Keyword arguments:
 		data -- the NMEA sentence to check
 		
 		'''
-		try:
-			# Create an integer of the two characters after the *, to the right
-			supplied_csum = int(data[data.rfind('*')+1:data.rfind('*')+3], 16)
-		except:
-			return ''
-		# Create the checksum
-		csum = self.makechecksum(data)
-		# Compare and return
-		if csum == supplied_csum:
-			return True
-		else:
-			return False
-
-	def gps(self):
-		'''Deconstructs NMEA gps readings.'''
-		if self.serial_data[3:6] == 'RMC':
-			self.serial_data = self.serial_data.split(',')
-			self.data_gps['utc'] = self.gps_nmea2utc()
-			self.data_gps['status'] = self.serial_data[2]
-			self.data_gps['lat'] = self.gps_nmea2dec(0)
-			self.data_gps['lon'] = self.gps_nmea2dec(1)
-			self.data_gps['speed'] = float(self.serial_data[7])
-			self.data_gps['track'] = float(self.serial_data[8])
-
-	def gps_nmea2dec(self,type):
-		'''Converts NMEA lat/long format to decimal format.
+		return checksum.checksum(data)
+
+	def gps(self, data):
+		'''Deconstructs NMEA gps readings.
 		
 		Keyword arguments:
-		type -- tells whether it is a lat or long. 0=lat,1=long
+		data -- the RMC SENTENCE
 		
 		'''
-		#Represents the difference in list position between lat/long
-		x = type*2
-		#Converts NMEA format to decimal format
-		data = float(self.serial_data[3+x][0:2+type]) + float(self.serial_data[3+x][2+type:9+type])/60
-		#Adds negative value based on N/S, W/E
-		if self.serial_data[4+x] == 'S': data = data*(-1)
-		elif self.serial_data[4+x] == 'W': data = data*(-1)
-		return data
-
-	def gps_nmea2utc(self):
-		'''Converts NMEA utc format to more standardized format.'''
-		time = self.serial_data[1][0:2] + ':' + self.serial_data[1][2:4] + ':' + self.serial_data[1][4:6]
-		date = '20' + self.serial_data[9][4:6] + '-' + self.serial_data[9][2:4] + '-' + self.serial_data[9][0:2]
-		return date + 'T' + time + 'Z'
+		last = self.fix
+		#Fields left empty without a fix keep their last value
+		self.fix = bus.FIX(known(data.lat, last.lat), known(data.lon, last.lon), known(data.speed, last.speed), known(data.track, last.track), known(data.utc, last.utc), known(data.status, last.status))
+		#Hands the new fix to everything waiting for one
+		if self.bus:
+			self.bus.publish(self.fix)
+
+	def ais(self):
+		'''Decodes NMEA ais sentences, once every fragment of a message has arrived.'''
+		#Only joined here - the stage decodes it, so reading is never held up
+		if self.stage:
+			payload = self.ais_reassembler.join(self.serial_data)
+			if payload:
+				self.stage.put(payload)
+			return
+		data = self.ais_reassembler.feed(self.serial_data)
+		if data:
+			self.ais_data = data
+			self.fleet.update(data)
 
 	def quit(self):
 		'''Enables quiting the serial connection.'''
 		self.exit = True
 
+def known(value, last):
+	'''Returns a decoded value, or the last one if it was left empty.'''
+	if value is None:
+		return last
+	return value
+
+class FRAMER():
+
+	def __init__(self, maxsize=4096):
+		'''Readies an incremental sentence framer for raw serial data.
+		
+		Keyword arguments:
+		maxsize -- the largest number of unterminated bytes held before resyncing
+		
+		'''
+		self.maxsize = maxsize
+		#Holds the bytes of any partial sentence between reads
+		self.data = bytearray()
+
+	def feed(self, data):
+		'''Adds newly read data and returns every complete sentence it finishes.
+		
+		Keyword arguments:
+		data -- the raw bytes read from the connection
+		
+		'''
+		sentences = []
+		buf = self.data
+		buf.extend(data)
+		view = memoryview(buf)
+		start = 0
+		end = buf.find('\n')
+		#Runs through each line terminator in the buffer
+		while end != -1:
+			sentence = view[start:end].tobytes().rstrip('\r')
+			#Drops any noise ahead of the sentence start character
+			first = self.begin(sentence)
+			if first != -1:
+				sentences.append(sentence[first:])
+			start = end + 1
+			end = buf.find('\n', start)
+		#The view must be dropped before the buffer can be resized
+		del view
+		#Keeps only the unterminated tail for the next read
+		if start:
+			del buf[:start]
+		#A runaway line without terminators - resync on the last sentence start
+		if len(buf) > self.maxsize:
+			last = max(buf.rfind('$'), buf.rfind('!'))
+			if last > 0:
+				del buf[:last]
+			else:
+				del buf[:]
+		return sentences
+
+	def begin(self, sentence):
+		'''Returns the position of the sentence start character, or -1 if there is none.
+		
+		Keyword arguments:
+		sentence -- the line to search
+		
+		'''
+		if sentence[0:1] == '$' or sentence[0:1] == '!':
+			return 0
+		first = sentence.find('$')
+		other = sentence.find('!')
+		if first == -1 or (other != -1 and other < first):
+			return other
+		return first
+
 class CACHE():
 
 	def __init__(self):
-		self.gps = {'lat': 0, 'lon': 0, 'speed': 0, 'track': 0, 'utc': 0, 'status': ''}
+		#The latest FIX - replaced whole, so a reader always sees the fields of a single fix
+		self.gps = bus.EMPTY
 
 	def cache_gps(self,lat,lon,speed,track,utc,status):
 		'''Used to store a common gps data sequence for future access.
@@ -171,13 +280,21 @@ class CACHE():
 		lon - the current longitude
 		speed - the current speed
 		track - the current track
-		utc - the current utc
+		utc - the current utc, in epoch seconds
 		status - the current gps status
 		
 		'''
-		self.gps['lat'] = lat
-		self.gps['lon'] = lon
-		self.gps['speed'] = speed
-		self.gps['track'] = track
-		self.gps['utc'] = utc
-		self.gps['status'] = status
\ No newline at end of file
+		self.gps = bus.FIX(lat, lon, speed, track, utc, status)
+
+	def cache_fix(self,fix):
+		'''Stores a gps fix published on the fix bus.
+		
+		Keyword arguments:
+		fix - the published FIX
+		
+		'''
+		self.gps = fix
+
+	def clear(self):
+		'''Forgets the latest fix.'''
+		self.gps = bus.EMPTY
\ No newline at end of file
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+#-*- coding: utf-8 -*-
+'''Replays a recorded NMEA log through the decoders and navigation jobs, for load testing.
+
+A log is recorded by setting nmea_record in navstat.config, and replayed from the lib directory as:
+python replay.py <log> [speed] [route location] [route file]
+
+A speed of 1 replays in real time, 10 at ten times the recorded rate, and 0 as fast as possible.
+
+'''
+
+import sys
+import time
+import bus
+import fleet
+import nmea
+import scheduler
+import sources
+import decoder
+
+
+def replay(location, speed=0, maxsize=1000, route=None, block=False, ais_processes=None):
+	'''Replays a log, and returns the sentences read and decoded, the time taken, the sentences dropped, decode latencies and the job report.
+	
+	Keyword arguments:
+	location -- the location of the log written by a RECORDER
+	speed -- how many times faster than recorded to replay, or 0 for as fast as possible
+	maxsize -- the most sentences waiting to be decoded before more are dropped
+	route -- the location and file of a gpx route to navigate while replaying, or None
+	block -- whether to wait for the decoder rather than drop sentences, to find how fast it can go
+	ais_processes -- the number of processes decoding AIS messages through a DECODER, 0 for its thread, or None to decode them with the sentences
+	
+	'''
+	fix_bus = bus.BUS()
+	jobs = scheduler.SCHEDULER(fix_bus)
+	vessels = fleet.FLEET()
+	#A recording has no duplicates left in it, so none are looked for
+	mux = sources.MUX(maxsize, 0)
+	stage = None
+	if ais_processes is not None:
+		stage = decoder.DECODER(vessels.update, ais_processes)
+		stage.start()
+	connection = nmea.NMEA0183(None, None, 1, fix_bus, vessels, stage)
+	if route:
+		#gps needs pygame, so it is only imported when a route is navigated
+		import gps
+		navigation = gps.ROUTE(jobs, gps.ALARM())
+		navigation.location, navigation.file = route
+		navigation.switch()
+	jobs.start()
+	connection.read_mux(mux)
+	source = sources.REPLAY(location, speed, block)
+	start = time.time()
+	mux.add(source)
+	#Waits for the log to end, and for every sentence queued to be decoded
+	while not source.done or mux.decoded < source.count - source.duplicates - source.dropped or (stage and not stage.idle()):
+		time.sleep(0.01)
+	seconds = time.time() - start
+	mux.stop()
+	jobs.stop()
+	if stage:
+		stage.stop()
+	latencies = sorted(mux.latencies)
+	return {'sentences': source.count, 'decoded': mux.decoded, 'seconds': seconds, 'dropped': source.dropped, 'errors': connection.errors, 'vessels': len(vessels.vessels),
+		'latency': [(fraction, percentile(latencies, fraction)) for fraction in (0.5, 0.9, 0.99, 1.0)], 'jobs': (stage.report() if stage else []) + jobs.report()}
+
+def percentile(values, fraction):
+	'''Returns the value a fraction of the sorted values are at or below, or 0 if there are none.
+	
+	Keyword arguments:
+	values -- the values, sorted
+	fraction -- the fraction, from 0 to 1
+	
+	'''
+	if not values:
+		return 0
+	return values[int(round(fraction * (len(values) - 1)))]
+
+def report(results):
+	'''Returns the lines describing the results of a replay.'''
+	lines = ['%-40s %12d sentences in %.2f s' % ('replayed', results['sentences'], results['seconds'])]
+	lines.append('%-40s %12.0f sentences/s' % ('decoded', results['decoded'] / max(results['seconds'], 1e-6)))
+	lines.append('%-40s %12d sentences' % ('dropped', results['dropped']))
+	lines.append('%-40s %12d sentences' % ('could not be decoded', results['errors']))
+	lines.append('%-40s %12d vessels' % ('ais targets', results['vessels']))
+	for fraction, latency in results['latency']:
+		lines.append('%-40s %12.3f ms' % ('decode latency p%g' % (fraction * 100), latency * 1000))
+	return lines + results['jobs']
+
+if __name__ == '__main__':
+	if len(sys.argv) < 2:
+		print __doc__
+		sys.exit(1)
+	speed = float(sys.argv[2]) if len(sys.argv) > 2 else 0
+	route = (sys.argv[3], sys.argv[4]) if len(sys.argv) > 4 else None
+	for line in report(replay(sys.argv[1], speed, route=route)):
+		print line
@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+#-*- coding: utf-8 -*-
+
+import sys
+import time
+import heapq
+import threading
+import traceback
+
+
+class JOB():
+
+	def __init__(self, name, function, interval, budget, order):
+		'''Readies a navigation job to be run by the scheduler.
+		
+		Keyword arguments:
+		name -- the name the job is reported under
+		function -- the function to call with each fix the job is due on
+		interval -- the number of seconds between each run, or 0 to run on every fix
+		budget -- the number of seconds of wall time a single run is expected to take, including any time other threads hold it up
+		order -- jobs due on the same fix are run in this order
+		
+		'''
+		self.name = name
+		self.function = function
+		self.interval = interval
+		self.budget = budget
+		self.order = order
+		self.active = True
+		#Time the job is next due
+		self.deadline = 0
+		#Number of runs, seconds of wall time spent running, the longest run, runs over budget, and runs that failed
+		self.runs = 0
+		self.spent = 0.0
+		self.worst = 0.0
+		self.over = 0
+		self.errors = 0
+		#The last exception raised by a run, or None
+		self.error = None
+
+class SCHEDULER():
+
+	def __init__(self, bus, budget=0.05):
+		'''Readies a scheduler that runs navigation jobs as fixes arrive on the fix bus.
+		
+		Keyword arguments:
+		bus -- the BUS fixes are published to
+		budget -- the number of seconds of wall time a single job run is expected to take, unless given
+		
+		'''
+		self.bus = bus
+		self.budget = budget
+		self.running = False
+		#Jobs waiting for their deadline, as [deadline, order, job], and every job added
+		self.heap = []
+		self.all = []
+		self.order = 0
+		self.lock = threading.Lock()
+
+	def add(self, name, function, interval=0, budget=None):
+		'''Adds a job, due on the next fix, and returns it.
+		
+		Keyword arguments:
+		name -- the name the job is reported under
+		function -- the function to call with each fix the job is due on
+		interval -- the number of seconds between each run, or 0 to run on every fix
+		budget -- the number of seconds of wall time a single run is expected to take
+		
+		'''
+		if budget is None:
+			budget = self.budget
+		with self.lock:
+			self.order = self.order + 1
+			job = JOB(name, function, interval, budget, self.order)
+			heapq.heappush(self.heap, [job.deadline, job.order, job])
+			self.all.append(job)
+		return job
+
+	def remove(self, job):
+		'''Stops a job from running again.
+		
+		Keyword arguments:
+		job -- the JOB returned when it was added
+		
+		'''
+		if job:
+			#Dropped from the heap the next time it comes due
+			job.active = False
+			with self.lock:
+				if job in self.all:
+					self.all.remove(job)
+
+	def start(self):
+		'''Starts the thread that runs the jobs.'''
+		if not self.running:
+			self.running = True
+			thread = threading.Thread(None, self.run, None, ())
+			thread.daemon = True
+			thread.start()
+
+	def stop(self):
+		'''Stops the thread that runs the jobs.'''
+		self.running = False
+		self.bus.wake()
+
+	def run(self):
+		'''Waits for each new fix and runs the jobs due on it - run as thread.'''
+		sequence = 0
+		#Sleeps until a fix arrives - with no fixes, nothing is run at all
+		while self.running:
+			sequence, fix = self.bus.wait(sequence)
+			if fix and self.running:
+				self.tick(fix, time.time())
+
+	def tick(self, fix, now):
+		'''Runs every job due by the given time.
+		
+		Keyword arguments:
+		fix -- the fix the jobs are run with
+		now -- the current time in seconds
+		
+		'''
+		due = []
+		with self.lock:
+			while self.heap and self.heap[0][0] <= now:
+				job = heapq.heappop(self.heap)[2]
+				if job.active:
+					due.append(job)
+		#Jobs due on the same fix run in the order they were added
+		due.sort(key=lambda job: job.order)
+		for job in due:
+			#Wall time - a job held up by the reader and decoder threads is charged for the wait
+			start = time.time()
+			#A failing job must not stop the others - it is counted, logged and run again when next due
+			try:
+				job.function(fix)
+			except Exception:
+				job.errors = job.errors + 1
+				self.failed(job)
+			spent = time.time() - start
+			job.runs = job.runs + 1
+			job.spent = job.spent + spent
+			if spent > job.worst:
+				job.worst = spent
+			if spent > job.budget:
+				job.over = job.over + 1
+			#Keeps an even cadence, unless the job has fallen a whole interval behind
+			job.deadline = job.deadline + job.interval
+			if job.deadline <= now:
+				job.deadline = now + job.interval
+			if job.active:
+				with self.lock:
+					heapq.heappush(self.heap, [job.deadline, job.order, job])
+
+	def failed(self, job):
+		'''Logs the exception a job raised, unless it is the same as the last one - call from an except block.
+		
+		Keyword arguments:
+		job -- the JOB that failed
+		
+		'''
+		error = traceback.format_exc()
+		if error != job.error:
+			job.error = error
+			sys.stderr.write('Job %s failed:\n%s' % (job.name, error))
+
+	def jobs(self):
+		'''Returns every active job, in the order they were added.'''
+		with self.lock:
+			return [job for job in self.all if job.active]
+
+	def report(self):
+		'''Returns a line for each active job with its runs, wall time spent, runs over budget and failed runs.'''
+		lines = []
+		for job in self.jobs():
+			if job.runs:
+				mean = job.spent / job.runs
+			else:
+				mean = 0
+			lines.append('%-12s %8d runs %8.3f ms mean %8.3f ms worst %6d over %.1f ms wall budget %6d errors' % (job.name, job.runs, mean * 1000, job.worst * 1000, job.over, job.budget * 1000, job.errors))
+		return lines
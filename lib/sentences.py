@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+#-*- coding: utf-8 -*-
+'''NMEA0183 sentence decoders, matched on the sentence type whatever the talker.
+
+Fields are only split and converted the first time they are read, so a sentence
+nothing reads costs no more than its framing and checksum. Times are converted to
+whole seconds - conversion.clock and conversion.isotime format them for showing.
+
+'''
+
+import conversion
+
+
+#The fields of each registered sentence type, by name, as (index, convert)
+DECODERS = {}
+
+
+class SENTENCE():
+
+	def __init__(self, raw, talker, kind, fields):
+		'''Holds a single sentence, converting each field the first time it is read.
+		
+		Keyword arguments:
+		raw -- the sentence, with its checksum checked
+		talker -- the talker ID, like GP, GN, GL or II
+		kind -- the sentence type, like RMC or GGA
+		fields -- the registered fields of the sentence type
+		
+		'''
+		self.raw = raw
+		self.talker = talker
+		self.kind = kind
+		self.fields = fields
+		#The raw fields, split on first use
+		self.data = None
+
+	def __getattr__(self, name):
+		#Only called for fields not converted yet
+		try:
+			index, convert = self.fields[name]
+		except KeyError:
+			raise AttributeError(name)
+		value = convert(self.split(), index)
+		#Later reads find the converted value without calling this again
+		setattr(self, name, value)
+		return value
+
+	def split(self):
+		'''Returns the raw fields, without the checksum - the address is field 0.'''
+		if self.data is None:
+			end = self.raw.rfind('*')
+			if end == -1:
+				end = len(self.raw)
+			self.data = self.raw[:end].split(',')
+		return self.data
+
+	def values(self):
+		'''Returns every field of the sentence converted, by name.'''
+		return dict((name, getattr(self, name)) for name in self.fields)
+
+def register(kind, fields):
+	'''Registers the fields of a sentence type, replacing any earlier ones.
+	
+	Keyword arguments:
+	kind -- the sentence type, like RMC, without the talker ID
+	fields -- (name, index, convert) for each field, where convert(data, index) converts it from the raw fields
+	
+	'''
+	DECODERS[kind] = dict((name, (index, convert)) for name, index, convert in fields)
+
+def decode(sentence):
+	'''Returns a SENTENCE for a sentence of a registered type, or None.
+	
+	Keyword arguments:
+	sentence -- the sentence, with its checksum checked
+	
+	'''
+	if sentence[0:1] != '$':
+		return None
+	address = sentence[1:sentence.find(',')]
+	#Proprietary sentences have a manufacturer code in place of the talker
+	if address[0:1] == 'P' or len(address) < 4:
+		return None
+	kind = address[-3:]
+	fields = DECODERS.get(kind)
+	if fields is None:
+		return None
+	return SENTENCE(sentence, address[:-3], kind, fields)
+
+def field(data, index):
+	'''Returns a raw field, or '' if the sentence is too short to have it.'''
+	if index < len(data):
+		return data[index]
+	return ''
+
+def text(data, index):
+	'''Converts a text field, or returns None if it is empty.'''
+	return field(data, index) or None
+
+def number(data, index):
+	'''Converts a decimal field, or returns None if it is empty.'''
+	value = field(data, index)
+	if value:
+		return float(value)
+	return None
+
+def integer(data, index):
+	'''Converts a whole number field, or returns None if it is empty.'''
+	value = field(data, index)
+	if value:
+		return int(value)
+	return None
+
+def signed(data, index):
+	'''Converts a decimal field followed by its direction, negative when S, W or L, or returns None if it is empty.'''
+	value = number(data, index)
+	if value is not None and field(data, index + 1) in ('S', 'W', 'L'):
+		return -value
+	return value
+
+def position(data, index):
+	'''Converts a ddmm.mmmm or dddmm.mmmm field followed by its hemisphere to decimal degrees, or returns None if it is empty.'''
+	return conversion.degrees(field(data, index), field(data, index + 1))
+
+def clock(data, index):
+	'''Converts a hhmmss.ss field to whole seconds since midnight, or returns None if it is empty.'''
+	return conversion.seconds(field(data, index))
+
+def utc(date):
+	'''Returns a converter for a hhmmss.ss field, combined with the ddmmyy field at the given index, to whole epoch seconds.'''
+	def convert(data, index):
+		return conversion.epoch(field(data, index), field(data, date))
+	return convert
+
+def prns(data, index):
+	'''Converts the twelve satellite number fields of a GSA sentence to a list, leaving out the empty ones.'''
+	return [int(value) for value in data[index:index + 12] if value]
+
+def satellites(data, index):
+	'''Converts the satellite groups of a GSV sentence to a list of (prn, elevation, azimuth, snr).'''
+	found = []
+	for x in xrange(index, len(data) - 3, 4):
+		if data[x]:
+			found.append((int(data[x]), integer(data, x + 1), integer(data, x + 2), integer(data, x + 3)))
+	return found
+
+#Recommended minimum navigation information
+register('RMC', [('utc', 1, utc(9)), ('time', 1, clock), ('status', 2, text), ('lat', 3, position), ('lon', 5, position), ('speed', 7, number), ('track', 8, number), ('variation', 10, signed), ('mode', 12, text)])
+#Fix data
+register('GGA', [('time', 1, clock), ('lat', 2, position), ('lon', 4, position), ('quality', 6, integer), ('satellites', 7, integer), ('hdop', 8, number), ('altitude', 9, number), ('separation', 11, number), ('age', 13, number), ('station', 14, text)])
+#Geographic position
+register('GLL', [('lat', 1, position), ('lon', 3, position), ('time', 5, clock), ('status', 6, text), ('mode', 7, text)])
+#Track and speed over ground
+register('VTG', [('track', 1, number), ('track_magnetic', 3, number), ('speed', 5, number), ('speed_kmh', 7, number), ('mode', 9, text)])
+#True heading
+register('HDT', [('heading', 1, number)])
+#Magnetic heading, deviation and variation
+register('HDG', [('heading', 1, number), ('deviation', 2, signed), ('variation', 4, signed)])
+#Depth below transducer
+register('DBT', [('feet', 1, number), ('metres', 3, number), ('fathoms', 5, number)])
+#Depth, with the transducer offset
+register('DPT', [('metres', 1, number), ('offset', 2, number), ('range', 3, number)])
+#Wind speed and angle
+register('MWV', [('angle', 1, number), ('reference', 2, text), ('speed', 3, number), ('unit', 4, text), ('status', 5, text)])
+#Crosstrack error, negative to steer left
+register('XTE', [('status', 1, text), ('cycle', 2, text), ('xte', 3, signed), ('unit', 5, text), ('mode', 6, text)])
+#Autopilot sentence B
+register('APB', [('status', 1, text), ('cycle', 2, text), ('xte', 3, signed), ('unit', 5, text), ('arrived', 6, text), ('passed', 7, text), ('bearing_origin', 8, number), ('bearing_origin_ref', 9, text), ('destination', 10, text), ('bearing', 11, number), ('bearing_ref', 12, text), ('heading', 13, number), ('heading_ref', 14, text), ('mode', 15, text)])
+#Recommended minimum navigation information to a waypoint, the crosstrack error negative to steer left
+register('RMB', [('status', 1, text), ('xte', 2, signed), ('origin', 4, text), ('destination', 5, text), ('lat', 6, position), ('lon', 8, position), ('range', 10, number), ('bearing', 11, number), ('velocity', 12, number), ('arrived', 13, text), ('mode', 14, text)])
+#Dilution of precision and active satellites
+register('GSA', [('selection', 1, text), ('fix', 2, integer), ('prns', 3, prns), ('pdop', 15, number), ('hdop', 16, number), ('vdop', 17, number)])
+#Satellites in view, up to four to a sentence
+register('GSV', [('messages', 1, integer), ('message', 2, integer), ('visible', 3, integer), ('satellites', 4, satellites)])
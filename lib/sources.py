@@ -0,0 +1,462 @@
+#!/usr/bin/env python
+#-*- coding: utf-8 -*-
+
+import time
+import Queue
+import socket
+import threading
+import collections
+import serial
+import nmea
+
+
+class SOURCE():
+
+	def __init__(self, name, block=False, backoff=1, backoff_max=60):
+		'''Readies a sentence source, read on its own thread into a MUX.
+		
+		Keyword arguments:
+		name -- the name the source is reported under
+		block -- whether to wait for room in the queue rather than drop sentences
+		backoff -- the number of seconds waited after the first failed attempt, doubled after each one after
+		backoff_max -- the most seconds waited between attempts
+		
+		'''
+		self.name = name
+		self.block = block
+		self.backoff = backoff
+		self.backoff_max = backoff_max
+		self.running = False
+		self.connected = False
+		#Whether the source is finished for good, like a file read to its end
+		self.done = False
+		#Sentences read, repeated from another source, and dropped with the queue full
+		self.count = 0
+		self.duplicates = 0
+		self.dropped = 0
+		self.mux = None
+
+	def start(self, mux):
+		'''Starts reading the source into a MUX.
+		
+		Keyword arguments:
+		mux -- the MUX to put each sentence in
+		
+		'''
+		self.mux = mux
+		self.running = True
+		thread = threading.Thread(None, self.run, None, ())
+		thread.daemon = True
+		thread.start()
+
+	def stop(self):
+		'''Stops reading the source.'''
+		self.running = False
+
+	def run(self):
+		'''Reads the source, reopening it with backoff when it fails - run as thread.'''
+		framer = nmea.FRAMER()
+		attempts = 0
+		while self.running and not self.done:
+			try:
+				self.open()
+				self.connected = True
+				while self.running:
+					data = self.read()
+					#The source has ended
+					if data is None:
+						break
+					if data:
+						attempts = 0
+						for sentence in framer.feed(data):
+							self.mux.put(self, sentence)
+			except (IOError, OSError, ValueError):
+				pass
+			self.connected = False
+			self.close()
+			if self.running and not self.done:
+				attempts = attempts + 1
+				self.wait(min(self.backoff * 2 ** (attempts - 1), self.backoff_max))
+
+	def wait(self, seconds):
+		'''Waits before reopening the source, ending early when stopped.'''
+		end = time.time() + seconds
+		while self.running and time.time() < end:
+			time.sleep(max(0, min(0.5, end - time.time())))
+
+	def open(self):
+		'''Opens the source.'''
+		raise NotImplementedError
+
+	def read(self):
+		'''Returns the data read, an empty string if there was none before the timeout, or None when the source has ended.'''
+		raise NotImplementedError
+
+	def close(self):
+		'''Closes the source.'''
+		pass
+
+class SERIAL(SOURCE):
+
+	def __init__(self, location, baud_rate, timeout=1):
+		'''Readies a serial device as a sentence source.
+		
+		Keyword arguments:
+		location -- the location of the serial connection
+		baud_rate -- the baud rate of the connection
+		timeout -- the timeout of the connection
+		
+		'''
+		SOURCE.__init__(self, 'serial:' + location)
+		self.location = location
+		self.baud_rate = baud_rate
+		self.timeout = timeout
+		self.serial_dev = None
+
+	def open(self):
+		self.serial_dev = serial.Serial(self.location, self.baud_rate, timeout=self.timeout)
+
+	def read(self):
+		#Reads everything waiting, rather than a line at a time
+		data = self.serial_dev.read(1)
+		x = self.serial_dev.inWaiting()
+		if x:
+			data = data + self.serial_dev.read(x)
+		return data
+
+	def close(self):
+		if self.serial_dev:
+			try:
+				self.serial_dev.close()
+			except (IOError, OSError, ValueError):
+				pass
+			self.serial_dev = None
+
+class TCP(SOURCE):
+
+	def __init__(self, host, port, timeout=1):
+		'''Readies a TCP server, like a chartplotter or multiplexer, as a sentence source.
+		
+		Keyword arguments:
+		host -- the host to connect to
+		port -- the port to connect to
+		timeout -- the number of seconds each read waits
+		
+		'''
+		SOURCE.__init__(self, 'tcp:%s:%d' % (host, port))
+		self.host = host
+		self.port = port
+		self.timeout = timeout
+		self.sock = None
+
+	def open(self):
+		self.sock = socket.create_connection((self.host, self.port), 10)
+		self.sock.settimeout(self.timeout)
+
+	def read(self):
+		try:
+			data = self.sock.recv(4096)
+		except socket.timeout:
+			return ''
+		#The server closed the connection
+		if not data:
+			return None
+		return data
+
+	def close(self):
+		if self.sock:
+			self.sock.close()
+			self.sock = None
+
+class UDP(SOURCE):
+
+	def __init__(self, port, host='', timeout=1):
+		'''Readies a UDP port, like a chartplotter broadcast, as a sentence source.
+		
+		Keyword arguments:
+		port -- the port to listen on
+		host -- the address to listen on, or all of them
+		timeout -- the number of seconds each read waits
+		
+		'''
+		SOURCE.__init__(self, 'udp:%d' % port)
+		self.host = host
+		self.port = port
+		self.timeout = timeout
+		self.sock = None
+
+	def open(self):
+		self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+		self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+		self.sock.bind((self.host, self.port))
+		self.sock.settimeout(self.timeout)
+
+	def read(self):
+		try:
+			data = self.sock.recv(65535)
+		except socket.timeout:
+			return ''
+		#Each datagram holds whole sentences, but the last may not be terminated
+		if data and not data.endswith('\n'):
+			data = data + '\n'
+		return data
+
+	def close(self):
+		if self.sock:
+			self.sock.close()
+			self.sock = None
+
+class FILE(SOURCE):
+
+	def __init__(self, location):
+		'''Readies a file of logged sentences as a sentence source, read once and never dropped.
+		
+		Keyword arguments:
+		location -- the location of the file
+		
+		'''
+		SOURCE.__init__(self, 'file:' + location, True)
+		self.location = location
+		self.file = None
+
+	def open(self):
+		self.file = open(self.location, 'rb')
+
+	def read(self):
+		data = self.file.read(4096)
+		if not data:
+			self.done = True
+			return None
+		return data
+
+	def close(self):
+		if self.file:
+			self.file.close()
+			self.file = None
+
+class REPLAY(SOURCE):
+
+	def __init__(self, location, speed=1.0, block=False):
+		'''Readies a recorded log as a sentence source, replayed with its original timing or faster.
+		
+		Keyword arguments:
+		location -- the location of the log written by a RECORDER
+		speed -- how many times faster than recorded to replay, or 0 for as fast as possible
+		block -- whether to wait for room in the queue rather than drop sentences
+		
+		'''
+		SOURCE.__init__(self, 'replay:' + location, block)
+		self.location = location
+		self.speed = speed
+		self.file = None
+		#Recorded time of the first sentence, and when it was replayed
+		self.first = None
+		self.started = None
+
+	def open(self):
+		self.file = open(self.location, 'rb')
+		self.first = None
+		self.started = time.time()
+
+	def read(self):
+		if self.speed:
+			lines = [self.file.readline()]
+		else:
+			#Nothing to wait for, so many lines are handled at once
+			lines = self.file.readlines(65536)
+		if not lines or not lines[0]:
+			self.done = True
+			return None
+		data = []
+		for line in lines:
+			stamp, _, sentence = line.partition(' ')
+			try:
+				stamp = float(stamp)
+			except ValueError:
+				#A log without times is replayed as fast as possible
+				data.append(line)
+				continue
+			data.append(sentence)
+			if self.speed:
+				if self.first is None:
+					self.first = stamp
+				#Waits until the sentence is due, at the replay speed
+				delay = (stamp - self.first) / self.speed - (time.time() - self.started)
+				if delay > 0:
+					time.sleep(delay)
+		return ''.join(data)
+
+	def close(self):
+		if self.file:
+			self.file.close()
+			self.file = None
+
+class RECORDER():
+
+	def __init__(self, location):
+		'''Opens a log to record every raw sentence in, with the time it was read.
+		
+		Keyword arguments:
+		location -- the location of the log, added to if it exists
+		
+		'''
+		self.location = location
+		self.file = open(location, 'ab')
+		self.lock = threading.Lock()
+
+	def write(self, sentence, read=None):
+		'''Records a sentence with the time it was read.
+		
+		Keyword arguments:
+		sentence -- the raw sentence read
+		read -- the time the sentence was read, or None for the current time
+		
+		'''
+		if read is None:
+			read = time.time()
+		with self.lock:
+			if self.file:
+				self.file.write('%.3f %s\n' % (read, sentence))
+
+	def close(self):
+		'''Closes the log.'''
+		with self.lock:
+			if self.file:
+				self.file.close()
+				self.file = None
+
+class MUX():
+
+	def __init__(self, maxsize=1000, window=1.0, remember=256):
+		'''Readies a bounded queue that merges the sentences of several sources.
+		
+		Keyword arguments:
+		maxsize -- the most sentences waiting to be decoded
+		window -- the number of seconds a sentence counts as a duplicate of one seen before
+		remember -- the most recent sentences kept for finding duplicates
+		
+		'''
+		self.queue = Queue.Queue(maxsize)
+		self.window = window
+		self.remember = remember
+		self.sources = []
+		#Recent sentences with the name of the source that sent each and when, oldest first
+		self.recent = collections.OrderedDict()
+		self.lock = threading.Lock()
+		#Source counts when rates were last measured
+		self.last = {}
+		self.last_time = time.time()
+		#Seconds between queueing and decoding for recent sentences, and the number decoded
+		self.latencies = collections.deque(maxlen=100000)
+		self.decoded = 0
+		#The RECORDER every sentence queued or dropped is written to, with the time it was read, if set
+		self.recorder = None
+
+	def add(self, source):
+		'''Adds a source and starts reading it.
+		
+		Keyword arguments:
+		source -- the SOURCE to read
+		
+		'''
+		self.sources.append(source)
+		source.start(self)
+
+	def stop(self):
+		'''Stops every source, and wakes whatever is waiting on the queue.'''
+		for source in self.sources:
+			source.stop()
+		try:
+			self.queue.put(None, True, 1)
+		except Queue.Full:
+			pass
+
+	def connected(self):
+		'''Checks whether any source is open.'''
+		for source in self.sources:
+			if source.connected:
+				return True
+		return False
+
+	def put(self, source, sentence):
+		'''Queues a sentence, unless another source sent it just before.
+		
+		Keyword arguments:
+		source -- the SOURCE the sentence was read from
+		sentence -- the sentence read
+		
+		'''
+		now = time.time()
+		source.count = source.count + 1
+		with self.lock:
+			#Forgets sentences older than the window
+			while self.recent:
+				oldest, seen = next(self.recent.iteritems())
+				if now - seen[1] <= self.window and len(self.recent) < self.remember:
+					break
+				del self.recent[oldest]
+			seen = self.recent.get(sentence)
+			if seen:
+				#A source repeating its own sentence, like GSA at 10 Hz, is not a duplicate
+				if seen[0] != source.name:
+					source.duplicates = source.duplicates + 1
+					return
+				#Moved to the end, as it is now the newest
+				del self.recent[sentence]
+			self.recent[sentence] = (source.name, now)
+		#Recorded as it was read, so a replay has the input timing rather than the decoding timing
+		if self.recorder:
+			self.recorder.write(sentence, now)
+		try:
+			self.queue.put((source.name, sentence, now), source.block)
+		except Queue.Full:
+			source.dropped = source.dropped + 1
+
+	def get(self):
+		'''Waits for the next sentence, and returns its source name, the sentence and when it was queued, or None once stopped.'''
+		return self.queue.get()
+
+	def done(self, item):
+		'''Records that a sentence taken with get() has been decoded.
+		
+		Keyword arguments:
+		item -- the item returned by get()
+		
+		'''
+		self.latencies.append(time.time() - item[2])
+		self.decoded = self.decoded + 1
+
+	def rates(self):
+		'''Returns each source name with its sentences per second since the last call, duplicates and drops.'''
+		now = time.time()
+		elapsed = max(now - self.last_time, 1e-6)
+		rates = []
+		for source in self.sources:
+			rates.append((source.name, (source.count - self.last.get(source.name, 0)) / elapsed, source.duplicates, source.dropped))
+			self.last[source.name] = source.count
+		self.last_time = now
+		return rates
+
+def parse(spec):
+	'''Returns the source for a setting like serial:/dev/ttyUSB0:4800, tcp:host:port, udp:port, file:path or replay:path:speed.
+	
+	Keyword arguments:
+	spec -- the source setting
+	
+	'''
+	kind, _, rest = spec.strip().partition(':')
+	if kind == 'serial':
+		location, _, baud_rate = rest.rpartition(':')
+		return SERIAL(location, int(baud_rate))
+	elif kind == 'tcp':
+		host, _, port = rest.rpartition(':')
+		return TCP(host, int(port))
+	elif kind == 'udp':
+		host, _, port = rest.rpartition(':')
+		return UDP(int(port), host)
+	elif kind == 'file':
+		return FILE(rest)
+	elif kind == 'replay':
+		location, _, speed = rest.rpartition(':')
+		return REPLAY(location, float(speed))
+	raise ValueError('Unknown source: ' + spec)
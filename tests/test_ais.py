@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+#-*- coding: utf-8 -*-
+'''Tests joining multi-sentence AIVDM messages through a REASSEMBLER.
+
+Run from the NAVSTAT directory as:
+python -m unittest discover tests
+
+'''
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import lib.ais as ais
+
+
+#A class A position report, split into two fragments below
+PAYLOAD = '13P7ee@000wqsc:M5aeVrb0@0`5E'
+
+
+def fragment(count, number, sequence, channel, payload, talker='!AIVDM'):
+	'''Returns one fragment of a multi-sentence message - the reassembler expects the checksum to have been checked already.'''
+	return '%s,%d,%d,%s,%s,%s,0*00' % (talker, count, number, sequence, channel, payload)
+
+class REASSEMBLERTEST(unittest.TestCase):
+
+	def setUp(self):
+		self.reassembler = ais.REASSEMBLER()
+
+	def test_in_order(self):
+		self.assertEqual(self.reassembler.join(fragment(3, 1, '1', 'A', 'abc'), 0), None)
+		self.assertEqual(self.reassembler.join(fragment(3, 2, '1', 'A', 'def'), 0), None)
+		self.assertEqual(self.reassembler.join(fragment(3, 3, '1', 'A', 'ghi'), 0), 'abcdefghi')
+		self.assertEqual(len(self.reassembler.partial), 0)
+		self.assertEqual(self.reassembler.dropped, 0)
+
+	def test_feed_decodes(self):
+		self.assertEqual(self.reassembler.feed(fragment(2, 1, '5', 'B', PAYLOAD[:14]), 0), None)
+		decoded = self.reassembler.feed(fragment(2, 2, '5', 'B', PAYLOAD[14:]), 0)
+		expected = ais.payloadparser(PAYLOAD)
+		#Decoded messages are stamped with the time they were decoded
+		del decoded['time'], expected['time']
+		self.assertEqual(decoded, expected)
+
+	def test_out_of_order(self):
+		#A later fragment with no first one is ignored
+		self.assertEqual(self.reassembler.join(fragment(2, 2, '1', 'A', 'def'), 0), None)
+		self.assertEqual(len(self.reassembler.partial), 0)
+		#A skipped fragment drops the message, and the one after it is not joined on
+		self.reassembler.join(fragment(3, 1, '1', 'A', 'abc'), 0)
+		self.assertEqual(self.reassembler.join(fragment(3, 3, '1', 'A', 'ghi'), 0), None)
+		self.assertEqual(self.reassembler.join(fragment(3, 2, '1', 'A', 'def'), 0), None)
+		self.assertEqual(len(self.reassembler.partial), 0)
+		self.assertEqual(self.reassembler.dropped, 1)
+		#A new first fragment restarts the message
+		self.reassembler.join(fragment(2, 1, '2', 'A', 'old'), 0)
+		self.reassembler.join(fragment(2, 1, '2', 'A', 'abc'), 0)
+		self.assertEqual(self.reassembler.join(fragment(2, 2, '2', 'A', 'def'), 0), 'abcdef')
+		self.assertEqual(self.reassembler.dropped, 2)
+
+	def test_timeout(self):
+		self.reassembler.join(fragment(2, 1, '1', 'A', 'abc'), 100)
+		self.reassembler.join(fragment(2, 1, '2', 'A', 'xyz'), 105)
+		#Ten seconds on, the first message is still held
+		self.assertEqual(self.reassembler.join(fragment(2, 2, '1', 'A', 'def'), 110), 'abcdef')
+		self.reassembler.join(fragment(2, 1, '3', 'A', 'abc'), 111)
+		#Past the timeout, the second is dropped before its last fragment arrives
+		self.assertEqual(self.reassembler.join(fragment(2, 2, '2', 'A', 'uvw'), 115.5), None)
+		self.assertEqual(self.reassembler.dropped, 1)
+		self.assertEqual(list(self.reassembler.partial), [('3', 'A')])
+
+	def test_maxsize(self):
+		self.reassembler = ais.REASSEMBLER(maxsize=3)
+		for sequence in '01234':
+			self.reassembler.join(fragment(2, 1, sequence, 'A', 'abc' + sequence), 0)
+		#Only the newest three are held, the oldest were dropped
+		self.assertEqual(list(self.reassembler.partial), [('2', 'A'), ('3', 'A'), ('4', 'A')])
+		self.assertEqual(self.reassembler.dropped, 2)
+		self.assertEqual(self.reassembler.join(fragment(2, 2, '0', 'A', 'def'), 0), None)
+		self.assertEqual(self.reassembler.join(fragment(2, 2, '4', 'A', 'def'), 0), 'abc4def')
+
+	def test_channels(self):
+		#The same sequence id on both channels makes two messages
+		self.reassembler.join(fragment(2, 1, '1', 'A', 'abc'), 0)
+		self.reassembler.join(fragment(2, 1, '1', 'B', 'uvw'), 0)
+		self.reassembler.join(fragment(3, 1, '2', 'A', 'ghi'), 0)
+		self.assertEqual(self.reassembler.join(fragment(2, 2, '1', 'B', 'xyz'), 0), 'uvwxyz')
+		self.assertEqual(self.reassembler.join(fragment(3, 2, '2', 'A', 'jkl'), 0), None)
+		self.assertEqual(self.reassembler.join(fragment(2, 2, '1', 'A', 'def'), 0), 'abcdef')
+		self.assertEqual(self.reassembler.join(fragment(3, 3, '2', 'A', 'mno'), 0), 'ghijklmno')
+		self.assertEqual(self.reassembler.dropped, 0)
+
+	def test_own_ship(self):
+		#Own ship AIVDO reports are skipped, single or in fragments
+		self.assertEqual(self.reassembler.join(fragment(1, 1, '', '', PAYLOAD, '!AIVDO'), 0), None)
+		self.assertEqual(self.reassembler.feed(fragment(1, 1, '', '', PAYLOAD, '!AIVDO'), 0), None)
+		self.assertEqual(self.reassembler.join(fragment(2, 1, '1', 'A', 'abc', '!AIVDO'), 0), None)
+		self.assertEqual(len(self.reassembler.partial), 0)
+		#And do not take the place of a target's fragment
+		self.reassembler.join(fragment(2, 1, '1', 'A', 'abc'), 0)
+		self.assertEqual(self.reassembler.join(fragment(2, 2, '1', 'A', 'xyz', '!AIVDO'), 0), None)
+		self.assertEqual(self.reassembler.join(fragment(2, 2, '1', 'A', 'def'), 0), 'abcdef')
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+#-*- coding: utf-8 -*-
+'''Tests reading back a track journal cut short in the middle of a point.
+
+Run from the NAVSTAT directory as:
+python -m unittest discover tests
+
+'''
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import lib.journal as journal
+
+
+#Speeds and tracks are stored as single precision floats, so these are exact
+POINTS = [(1356998400 + x, 49.0 + x * 0.001, -123.0 - x * 0.001, 5.5, 270.0) for x in xrange(5)]
+
+
+class TORNTEST(unittest.TestCase):
+
+	def setUp(self):
+		self.folder = tempfile.mkdtemp()
+		self.path = os.path.join(self.folder, 'track.trk')
+		track = journal.JOURNAL(self.path)
+		for point in POINTS:
+			track.append(*point)
+		track.close()
+		#Cut the last point off part way through, as a power cut would
+		self.size = os.path.getsize(self.path)
+		self.assertEqual(self.size, len(journal.MAGIC) + len(POINTS) * journal.RECORD.size)
+		torn = open(self.path, 'r+b')
+		torn.truncate(self.size - journal.RECORD.size / 2)
+		torn.close()
+
+	def tearDown(self):
+		shutil.rmtree(self.folder)
+
+	def test_read(self):
+		#The earlier points come back whole, and the partial one is dropped
+		self.assertEqual(list(journal.read(self.path)), POINTS[:-1])
+		#Including when the partial point starts a new read
+		self.assertEqual(list(journal.read(self.path, chunk=2)), POINTS[:-1])
+
+	def test_reopen(self):
+		#Opening the journal again cuts off the partial point, so the next one lines up
+		track = journal.JOURNAL(self.path)
+		track.append(*POINTS[-1])
+		track.close()
+		self.assertEqual(os.path.getsize(self.path), self.size)
+		self.assertEqual(list(journal.read(self.path)), POINTS)
+
+if __name__ == '__main__':
+	unittest.main()
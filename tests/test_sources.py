@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+#-*- coding: utf-8 -*-
+'''Tests merging local UDP, TCP and serial sources through a MUX.
+
+Run from the NAVSTAT directory as:
+python -m unittest discover tests
+
+'''
+
+import os
+import sys
+import time
+import Queue
+import socket
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import lib.sources as sources
+
+
+GSA = '$GPGSA,A,3,04,05,,09,12,,,24,,,,,2.5,1.3,2.1*39'
+HDT = '$GPHDT,274.07,T*03'
+DBT = '$SDDBT,8.1,f,2.4,M,1.3,F*0B'
+
+
+def free_port():
+	'''Returns a local port nothing is listening on.'''
+	sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+	sock.bind(('127.0.0.1', 0))
+	port = sock.getsockname()[1]
+	sock.close()
+	return port
+
+def wait(check, seconds=5):
+	'''Waits until check() is true, and returns whether it became true in time.'''
+	end = time.time() + seconds
+	while time.time() < end:
+		if check():
+			return True
+		time.sleep(0.01)
+	return False
+
+class MUXTEST(unittest.TestCase):
+
+	def setUp(self):
+		#A TCP server standing in for a chartplotter, and a UDP port standing in for a broadcast
+		self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+		self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+		self.server.bind(('127.0.0.1', 0))
+		self.server.listen(1)
+		self.sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+		self.udp_port = free_port()
+		self.mux = sources.MUX(window=5)
+		self.tcp = sources.TCP('127.0.0.1', self.server.getsockname()[1], 0.05)
+		self.udp = sources.UDP(self.udp_port, '127.0.0.1', 0.05)
+		self.mux.add(self.tcp)
+		self.mux.add(self.udp)
+		self.client = self.server.accept()[0]
+		self.assertTrue(wait(lambda: self.tcp.connected and self.udp.connected))
+
+	def tearDown(self):
+		self.mux.stop()
+		self.client.close()
+		self.server.close()
+		self.sender.close()
+
+	def send_tcp(self, *sentences):
+		self.client.sendall(''.join(sentence + '\r\n' for sentence in sentences))
+
+	def send_udp(self, *sentences):
+		self.sender.sendto('\r\n'.join(sentences), ('127.0.0.1', self.udp_port))
+
+	def received(self, count):
+		'''Returns the source name and sentence of the next count queued sentences.'''
+		items = []
+		for x in xrange(count):
+			item = self.mux.queue.get(True, 5)
+			items.append((item[0], item[1]))
+		return items
+
+	def nothing_more(self):
+		'''Checks that nothing else was queued.'''
+		time.sleep(0.2)
+		self.assertRaises(Queue.Empty, self.mux.queue.get_nowait)
+
+	def test_merge(self):
+		self.send_tcp(HDT)
+		self.assertEqual(self.received(1), [(self.tcp.name, HDT)])
+		self.send_udp(DBT)
+		self.assertEqual(self.received(1), [(self.udp.name, DBT)])
+		self.nothing_more()
+
+	def test_duplicate_from_another_source(self):
+		self.send_tcp(GSA)
+		self.assertEqual(self.received(1), [(self.tcp.name, GSA)])
+		self.send_udp(GSA)
+		self.assertTrue(wait(lambda: self.udp.duplicates == 1))
+		self.nothing_more()
+		self.assertEqual(self.tcp.duplicates, 0)
+
+	def test_repeat_from_same_source(self):
+		self.send_tcp(GSA, GSA)
+		self.assertEqual(self.received(2), [(self.tcp.name, GSA), (self.tcp.name, GSA)])
+		self.assertEqual(self.tcp.duplicates, 0)
+		#Still a duplicate when another source sends it after the repeat
+		self.send_udp(GSA)
+		self.assertTrue(wait(lambda: self.udp.duplicates == 1))
+		self.nothing_more()
+
+	def test_rates(self):
+		self.mux.rates()
+		self.send_tcp(HDT, DBT, GSA)
+		self.send_udp(HDT)
+		self.received(3)
+		self.assertTrue(wait(lambda: self.udp.count == 1))
+		rates = dict((name, (rate, duplicates, dropped)) for name, rate, duplicates, dropped in self.mux.rates())
+		self.assertEqual(sorted(rates), sorted([self.tcp.name, self.udp.name]))
+		self.assertTrue(rates[self.tcp.name][0] > 0)
+		self.assertEqual(rates[self.udp.name][1:], (1, 0))
+		#Rates only count what was read since the last call
+		self.assertEqual(self.mux.rates()[0][1], 0)
+
+class FAKESERIAL():
+	# Stands in for serial.Serial, keeping the arguments it was opened with
+
+	opened = []
+
+	def __init__(self, *args, **kwargs):
+		self.args = args
+		self.kwargs = kwargs
+		self.data = [HDT + '\r\n']
+		FAKESERIAL.opened.append(self)
+
+	def read(self, size=1):
+		if self.data:
+			return self.data.pop(0)
+		time.sleep(0.01)
+		return ''
+
+	def inWaiting(self):
+		return 0
+
+	def close(self):
+		pass
+
+class SERIALTEST(unittest.TestCase):
+
+	def setUp(self):
+		self.serial = sources.serial
+		sources.serial = type('serial', (), {'Serial': FAKESERIAL})
+		FAKESERIAL.opened = []
+		self.mux = sources.MUX()
+
+	def tearDown(self):
+		self.mux.stop()
+		sources.serial = self.serial
+
+	def test_open(self):
+		source = sources.parse('serial:/dev/ttyUSB0:4800')
+		self.mux.add(source)
+		item = self.mux.queue.get(True, 5)
+		self.assertEqual((item[0], item[1]), (source.name, HDT))
+		self.assertTrue(source.connected)
+		self.assertEqual(len(FAKESERIAL.opened), 1)
+		#The timeout must go by name - the third positional argument is the byte size
+		self.assertEqual(FAKESERIAL.opened[0].args, ('/dev/ttyUSB0', 4800))
+		self.assertEqual(FAKESERIAL.opened[0].kwargs, {'timeout': 1})
+
+if __name__ == '__main__':
+	unittest.main()